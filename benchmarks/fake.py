@@ -0,0 +1,402 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Stand-ins of the pyrogram objects, and a scratch directory to run the plugins in without a bot token
+# Call init_workdir before importing plugins, glovar reads config.ini and makes its directories in the working directory
+
+import logging
+import sys
+from base64 import urlsafe_b64encode
+from binascii import crc32
+from configparser import RawConfigParser
+from contextlib import redirect_stdout
+from importlib import import_module
+from itertools import count
+from os import chdir, urandom
+from os.path import abspath, basename, dirname, join
+from queue import Queue
+from random import random, uniform
+from tempfile import mkdtemp
+from threading import Lock, Thread
+from time import perf_counter, sleep, time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from pyrogram import CallbackQueryHandler, Client as BaseClient, MessageHandler
+from pyrogram.client.handlers.handler import Handler
+from pyrogram.errors import FloodWait, UsernameNotOccupied
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+root = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, root)
+
+
+class Object:
+    # A plain object with the given attributes, the missing ones are the defaults of the class
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name: str) -> None:
+        # The optional fields of the pyrogram types are None
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        return None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.__dict__.items())})"
+
+
+class Chat(Object):
+    id: int = 0
+    type: str = "supergroup"
+    title: str = ""
+    username: Optional[str] = None
+    restrictions: Optional[list] = None
+
+
+class Document(Object):
+    file_id: str = ""
+    file_ref: str = ""
+    file_name: str = ""
+    file_size: int = 0
+
+
+class User(Object):
+    id: int = 0
+    is_self: bool = False
+    is_bot: bool = False
+    first_name: str = ""
+    last_name: Optional[str] = None
+    username: Optional[str] = None
+
+
+class Message(Object):
+    message_id: int = 0
+    chat: Optional[Chat] = None
+    from_user: Optional[User] = None
+    date: int = 0
+    text: Optional[str] = None
+    caption: Optional[str] = None
+    document: Optional[Document] = None
+    reply_markup: Optional[object] = None
+    reply_to_message: Optional["Message"] = None
+    forward_from: Optional[User] = None
+    forward_from_chat: Optional[Chat] = None
+    forward_date: Optional[int] = None
+
+
+class CallbackQuery(Object):
+    id: str = ""
+    from_user: Optional[User] = None
+    message: Optional[Message] = None
+    data: str = ""
+
+
+class Client(BaseClient):
+    # The client calls made by plugins.functions.telegram, the sent messages and files are kept in memory,
+    # each call takes the latency, and raises FloodWait at the flood rate
+    # It is a pyrogram client without a session, so the Telegram calls are keyed by chat as in a real bot
+
+    # The type of the updates that each type of the handlers accepts
+    handler_types = {
+        CallbackQueryHandler: CallbackQuery,
+        MessageHandler: Message
+    }
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0, flood_secs: int = 1,
+                 workers: int = 4):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.flood_secs = flood_secs
+        self.workers = workers
+        self.lock = Lock()
+        self.counter = count(1)
+        self.me = User(id=int(urandom(3).hex(), 16), is_self=True, is_bot=True, first_name="MANAGE")
+        self.files: Dict[str, bytes] = {}
+        self.messages: Dict[Tuple[int, int], Message] = {}
+        self.groups: Dict[int, list] = {}
+        self.updates: Queue = Queue()
+        self.threads: List[Thread] = []
+        self.status: Dict[str, Union[float, int]] = {
+            "calls": 0,
+            "call_time": 0.0,
+            "floods": 0,
+            "updates": 0,
+            "handled": 0,
+            "handling": 0,
+            "failed": 0
+        }
+        self.calls: Dict[str, int] = {}
+
+    def add_document(self, path: str) -> Document:
+        # Make a document of a local file
+        with open(path, "rb") as f:
+            return self.add_file(f.read(), basename(path))
+
+    def add_file(self, content: bytes, name: str = "") -> Document:
+        # Make a document of some bytes, download_media writes them
+        with self.lock:
+            file_id = f"file-{next(self.counter)}"
+            self.files[file_id] = content
+
+        return Document(file_id=file_id, file_ref="", file_name=name or file_id, file_size=len(content))
+
+    def add_handlers(self, modules: List[str]) -> int:
+        # Add the handlers of the plugin modules, as the plugins of pyrogram do
+        number = 0
+
+        for module in modules:
+            for target in vars(import_module(module)).values():
+                handler, group = getattr(target, "handler", (None, None))
+
+                if not isinstance(handler, Handler):
+                    continue
+
+                self.groups.setdefault(group, []).append(handler)
+                number += 1
+
+        self.groups = dict(sorted(self.groups.items()))
+
+        return number
+
+    def add_message(self, chat_id: int, chat_type: str = "supergroup", **kwargs) -> Message:
+        # Make a message in a chat, as if it was sent by someone else
+        with self.lock:
+            mid = next(self.counter)
+            message = self.messages[(chat_id, mid)] = Message(message_id=mid, chat=Chat(id=chat_id, type=chat_type),
+                                                              date=int(time()), outgoing=False, **kwargs)
+
+        return message
+
+    def answer_callback_query(self, callback_query_id: str, text: str = None, show_alert: bool = None) -> bool:
+        self.call("answer_callback_query")
+        return True
+
+    def call(self, name: str) -> None:
+        # Count a call, wait for the latency, raise FloodWait at the flood rate
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.status["calls"] += 1
+
+        secs = self.latency + (self.jitter and uniform(0, self.jitter))
+        secs > 0 and sleep(secs)
+
+        with self.lock:
+            self.status["call_time"] += secs
+
+            if self.flood_rate and random() < self.flood_rate:
+                self.status["floods"] += 1
+                raise FloodWait(self.flood_secs)
+
+    def delete_messages(self, chat_id: int, message_ids: Union[int, Iterable[int]]) -> bool:
+        self.call("delete_messages")
+
+        with self.lock:
+            for mid in ([message_ids] if isinstance(message_ids, int) else message_ids):
+                self.messages.pop((chat_id, mid), None)
+
+        return True
+
+    def dispatch(self, update: Union[CallbackQuery, Message]) -> bool:
+        # Put an update in the queue of the update workers
+        with self.lock:
+            self.start()
+            self.status["updates"] += 1
+
+        self.updates.put(update)
+
+        return True
+
+    def download_media(self, message: str, file_ref: str = None, file_name: str = "") -> Optional[str]:
+        self.call("download_media")
+        content = self.files.get(message)
+
+        if content is None:
+            return None
+
+        with open(file_name, "wb") as f:
+            f.write(content)
+
+        return file_name
+
+    def edit_message(self, chat_id: int, message_id: int, **kwargs) -> Message:
+        # Edit a message, the unknown message is made
+        with self.lock:
+            message = self.messages.get((chat_id, message_id))
+
+            if message is None:
+                message = self.messages[(chat_id, message_id)] = Message(message_id=message_id,
+                                                                         chat=Chat(id=chat_id), from_user=self.me)
+
+            message.__dict__.update(kwargs, edit_date=int(time()))
+
+        return message
+
+    def edit_message_reply_markup(self, chat_id: int, message_id: int, reply_markup: object = None) -> Message:
+        self.call("edit_message_reply_markup")
+        return self.edit_message(chat_id, message_id, reply_markup=reply_markup)
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str, parse_mode: str = None,
+                          disable_web_page_preview: bool = None, reply_markup: object = None) -> Message:
+        self.call("edit_message_text")
+        return self.edit_message(chat_id, message_id, text=text, reply_markup=reply_markup)
+
+    def get_chat(self, chat_id: Union[int, str]) -> Chat:
+        self.call("get_chat")
+
+        if isinstance(chat_id, str):
+            return Chat(id=-1000000000000 - crc32(chat_id.encode()), type="channel", username=chat_id)
+
+        return Chat(id=chat_id, type=chat_id < 0 and "supergroup" or "private")
+
+    def get_messages(self, chat_id: int, message_ids: Union[int, Iterable[int]]) -> Union[Message, List[Message]]:
+        self.call("get_messages")
+
+        with self.lock:
+            if isinstance(message_ids, int):
+                return self.messages.get((chat_id, message_ids), Message(message_id=message_ids, empty=True))
+
+            return [self.messages.get((chat_id, mid), Message(message_id=mid, empty=True)) for mid in message_ids]
+
+    def get_status(self) -> Dict[str, Union[float, int]]:
+        # Get a copy of the status
+        with self.lock:
+            result = dict(self.status)
+            result["queued"] = self.updates.qsize()
+
+        return result
+
+    def resolve_peer(self, peer_id: Union[int, str]) -> object:
+        self.call("resolve_peer")
+        raise UsernameNotOccupied
+
+    def send_document(self, chat_id: int, document: str, file_ref: str = None, caption: str = "",
+                      parse_mode: str = None, reply_to_message_id: int = None, reply_markup: object = None) -> Message:
+        self.call("send_document")
+        return self.add_message(chat_id, from_user=self.me, document=self.add_document(document), caption=caption,
+                                reply_markup=reply_markup,
+                                reply_to_message=self.messages.get((chat_id, reply_to_message_id)))
+
+    def send_message(self, chat_id: int, text: str, parse_mode: str = None, disable_web_page_preview: bool = None,
+                     reply_to_message_id: int = None, reply_markup: object = None) -> Message:
+        self.call("send_message")
+        return self.add_message(chat_id, from_user=self.me, text=text, reply_markup=reply_markup,
+                                reply_to_message=self.messages.get((chat_id, reply_to_message_id)))
+
+    def start(self) -> None:
+        # Start the update workers on first use, call it with the lock held
+        if self.threads:
+            return
+
+        for i in range(self.workers):
+            self.threads.append(Thread(target=self.update_worker, name=f"UpdateWorker#{i + 1}", daemon=True))
+            self.threads[-1].start()
+
+    def update_worker(self) -> None:
+        # Run the first handler that accepts the update in each group, as the dispatcher of pyrogram does
+        while True:
+            update = self.updates.get()
+
+            with self.lock:
+                self.status["handling"] += 1
+
+            for group in self.groups.values():
+                for handler in group:
+                    try:
+                        if not (isinstance(update, self.handler_types.get(type(handler), type(None)))
+                                and handler.check(update)):
+                            continue
+                    except Exception as e:
+                        logger.warning(f"Update worker check error: {e}", exc_info=True)
+                        continue
+
+                    try:
+                        handler.callback(self, update)
+                    except Exception as e:
+                        logger.warning(f"Update worker {handler.callback.__name__} error: {e}", exc_info=True)
+
+                        with self.lock:
+                            self.status["failed"] += 1
+
+                    break
+
+            with self.lock:
+                update.handled = perf_counter()
+                self.status["handling"] -= 1
+                self.status["handled"] += 1
+
+            self.updates.task_done()
+
+
+def init_config(path: str, options: Dict[str, Dict[str, str]] = None) -> bool:
+    # Write a config.ini from config.ini.example, the expunged values are replaced with fake ones
+    config = RawConfigParser()
+    config.read(join(root, "config.ini.example"), encoding="utf-8")
+    ids = count(1)
+
+    for section in config.sections():
+        for name, value in config.items(section):
+            if value != "[DATA EXPUNGED]":
+                continue
+
+            if name.endswith("_channel_id") or name.endswith("_group_id"):
+                value = f"-100{1000000000 + next(ids)}"
+            elif name.endswith("_id"):
+                value = str(1000000 + next(ids))
+            elif name == "bot_token":
+                value = "123456:fake"
+            elif name == "key":
+                value = urlsafe_b64encode(urandom(32)).decode("utf-8")
+            else:
+                value = urandom(8).hex()
+
+            config.set(section, name, value)
+
+    for section, values in (options or {}).items():
+        for name, value in values.items():
+            config.set(section, name, str(value))
+
+    with open(path, "w", encoding="utf-8") as f:
+        config.write(f)
+
+    return True
+
+
+def init_workdir(options: Dict[str, Dict[str, str]] = None) -> str:
+    # Make a scratch working directory with a config.ini and change to it
+    path = mkdtemp(prefix="manage-")
+    init_config(join(path, "config.ini"), options)
+    chdir(path)
+
+    return path
+
+
+def load_plugins(modules: List[str]) -> bool:
+    # Import the modules and load the data, the copyright text of glovar does not go to stdout
+    with redirect_stdout(sys.stderr):
+        for module in modules:
+            __import__(module)
+
+        from plugins import glovar
+        glovar.load_all()
+
+    return True
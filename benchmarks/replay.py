@@ -0,0 +1,266 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Replay of a capture of the exchange channel, the messages go through process_data of the fake client again
+# The capture is data/exchange.capture of a bot with capture = True, each record is a pickled tuple of
+# (time, text, file id or None) for a message, or (file id, document bytes) for a document downloaded by the bot,
+# the documents are decrypted with the [encrypt] section of --config. A capture larger than capture_limit is moved
+# to data/exchange.capture.old, give both in order to replay the whole of them
+# Run it in the directory of config.ini:
+# python benchmarks/replay.py data/exchange.capture.old data/exchange.capture --speed 10 > result.json
+
+import json
+import sys
+from argparse import ArgumentParser
+from configparser import RawConfigParser
+from os.path import abspath, dirname, exists
+from pickle import load
+from shutil import rmtree
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from fake import Client, Message, init_workdir, load_plugins
+from storm import is_idle
+
+
+class TimedLock:
+    # A lock that records how often and how long its callers wait for it
+
+    def __init__(self):
+        self.lock = Lock()
+        self.status: Dict[str, Union[float, int]] = {
+            "acquired": 0,
+            "contended": 0,
+            "wait": 0.0,
+            "wait_max": 0.0
+        }
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        # The status is changed while the lock is held
+        if self.lock.acquire(False):
+            self.status["acquired"] += 1
+            return True
+
+        if not blocking:
+            return False
+
+        start = perf_counter()
+
+        if not self.lock.acquire(True, timeout):
+            return False
+
+        wait = perf_counter() - start
+        self.status["acquired"] += 1
+        self.status["contended"] += 1
+        self.status["wait"] += wait
+        self.status["wait_max"] = max(self.status["wait_max"], wait)
+
+        return True
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+    def release(self) -> None:
+        self.lock.release()
+
+
+def get_percentiles(values: List[float]) -> Dict[str, float]:
+    # Get the percentiles of some seconds, in milliseconds
+    if not values:
+        return {}
+
+    values = sorted(values)
+    result = {f"p{p}": values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 for p in (50, 90, 99, 99.9)}
+    result["max"] = values[-1] * 1000
+    result["mean"] = sum(values) / len(values) * 1000
+
+    return result
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Replay a capture of the exchange channel against the fake client, print JSON")
+    parser.add_argument("capture", nargs="+", help="paths of the capture files, the older first")
+    parser.add_argument("--speed", type=float, default=1.0, help="times of the captured speed, 0 for no waits")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first messages")
+    parser.add_argument("--config", default="config.ini", help="config.ini whose [encrypt] made the documents")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of each client call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random seconds added to the latency")
+    parser.add_argument("--flood", type=float, default=0.0, help="rate of the client calls raising FloodWait")
+    parser.add_argument("--flood-secs", type=int, default=3, help="seconds of each FloodWait")
+    parser.add_argument("--workers", type=int, default=4, help="update workers of the client")
+    parser.add_argument("--unlimited", action="store_true", help="raise the rate limits of the limiter")
+    parser.add_argument("--drain", type=float, default=60.0, help="seconds to wait for the backlog after the replay")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    # The scratch config decrypts what the captured bot encrypted
+    captures = [abspath(capture) for capture in args.capture]
+    options = {"custom": {"storage": args.storage}}
+
+    if exists(args.config):
+        config = RawConfigParser()
+        config.read(args.config, encoding="utf-8")
+        options["encrypt"] = dict(config["encrypt"])
+
+    if args.unlimited:
+        options["custom"].update(rate_burst=1000000, rate_chat=1000000, rate_global=1000000)
+
+    path = init_workdir(options)
+    load_plugins(["plugins.glovar"])
+
+    from plugins import glovar
+    from plugins.functions import receive
+
+    config = RawConfigParser()
+    config.read("config.ini")
+    client = Client(args.latency, args.jitter, args.flood, args.flood_secs, args.workers)
+    client.add_handlers([f"{config['plugins']['root']}.{module}" for module in config["plugins"]["include"].split()])
+
+    # Record when the last exchange data of each message is received
+    finished: Dict[int, float] = {}
+    finished_lock = Lock()
+    receive_data = receive.receive_data
+
+    def receive_data_timed(the_client: Client, message: Message, *others: Any) -> bool:
+        try:
+            return receive_data(the_client, message, *others)
+        finally:
+            with finished_lock:
+                finished[message.message_id] = perf_counter()
+
+    receive.receive_data = receive_data_timed
+
+    # Record the waits of the global locks
+    for name in glovar.locks:
+        glovar.locks[name] = TimedLock()
+
+    # Feed the messages at the captured pace
+    sent: List[Tuple[Message, float, float]] = []
+    documents = 0
+    size = 0
+    first = None
+    last = None
+    start = perf_counter()
+
+    # Only the offsets of the documents are kept, the bytes are read again when their messages are fed
+    offsets: Dict[str, Tuple[str, int]] = {}
+
+    for capture in captures:
+        for offset, record in read_capture(capture):
+            len(record) == 2 and offsets.setdefault(record[0], (capture, offset))
+
+    for now, text, file_id in (record for capture in captures
+                               for _, record in read_capture(capture) if len(record) == 3):
+        if args.limit and len(sent) >= args.limit:
+            break
+
+        first = now if first is None else first
+        last = now
+        due = start + (now - first) / args.speed if args.speed else perf_counter()
+        delay = due - perf_counter()
+        delay > 0 and sleep(delay)
+
+        document = read_document(*offsets[file_id]) if file_id in offsets else None
+
+        if document is None:
+            message = client.add_message(glovar.exchange_channel_id, "channel", text=text)
+        else:
+            message = client.add_message(glovar.exchange_channel_id, "channel", caption=text,
+                                         document=client.add_file(document))
+            documents += 1
+            size += len(document)
+
+        dispatched = perf_counter()
+        client.dispatch(message)
+        sent.append((message, dispatched, dispatched - due))
+
+    fed = perf_counter() - start
+
+    while not is_idle(client) and perf_counter() - start - fed < args.drain:
+        sleep(0.01)
+
+    done = perf_counter() - start
+
+    # The end to end latency lasts until the last exchange data of the message is received
+    handled = [(message, dispatched) for message, dispatched, _ in sent if message.handled]
+    results = {
+        "version": glovar.version,
+        "args": vars(args),
+        "summary": {
+            "messages": len(sent),
+            "handled": len(handled),
+            "documents": documents,
+            "bytes": size,
+            "drained": is_idle(client),
+            "seconds_captured": (last - first) if sent else 0.0,
+            "seconds_feed": fed,
+            "seconds": done,
+            "throughput": len(handled) / done if done else 0.0
+        },
+        "latency_ms": {
+            "end_to_end": get_percentiles([max(message.handled, finished.get(message.message_id, 0.0)) - dispatched
+                                           for message, dispatched in handled]),
+            "handler": get_percentiles([message.handled - dispatched for message, dispatched in handled]),
+            "feed_lag": get_percentiles([max(lag, 0.0) for _, _, lag in sent])
+        },
+        "locks": {name: lock.status for name, lock in glovar.locks.items()},
+        "client": client.get_status(),
+        "calls": client.calls,
+        "limiter": glovar.limiter.get_status(),
+        "pool": glovar.pool.get_status()
+    }
+
+    print(json.dumps(results, indent=4, default=str))
+
+    args.keep or rmtree(path, True)
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, tuple]]:
+    # Read the records of a capture one by one with their offsets, the torn record at the end is dropped
+    with open(path, "rb") as f:
+        while True:
+            try:
+                offset = f.tell()
+                yield offset, load(f)
+            except EOFError:
+                return
+            except Exception as e:
+                print(f"Read capture {path} error: {e}", file=sys.stderr)
+                return
+
+
+def read_document(path: str, offset: int) -> bytes:
+    # Read the bytes of a document record at its offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+
+        return load(f)[1]
+
+
+if __name__ == "__main__":
+    main()
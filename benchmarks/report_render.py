@@ -0,0 +1,78 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark of rendering the evidence report with the joined labels against the per-call lang() lookups
+# Run it in the directory of config.ini: python benchmarks/report_render.py
+
+import sys
+from os.path import abspath, dirname
+from time import perf_counter
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from plugins import glovar
+from plugins.functions.channel import get_evidence_text
+from plugins.functions.etc import code, lang
+
+
+def get_evidence_text_lang(record: dict, status: str, reason: str = None) -> str:
+    # The old implementation, each line looks up the label and the colon again
+    text = (f"{lang('project')}{lang('colon')}{code(glovar.sender)}\n"
+            f"{lang('project_origin')}{lang('colon')}{code(record['origin'] or record['project'])}\n"
+            f"{lang('status')}{lang('colon')}{code(status)}\n")
+
+    if reason:
+        text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+
+    text += (f"{lang('user_id')}{lang('colon')}{code(record['uid'])}\n"
+             f"{lang('level')}{lang('colon')}{code(record['level'])}\n"
+             f"{lang('rule')}{lang('colon')}{code(record['rule'])}\n")
+
+    for field in ["type", "game", "lang", "length", "freq", "score", "bio", "name", "from", "contact", "more"]:
+        if record[field]:
+            text += f"{lang(glovar.report_fields[field])}{lang('colon')}{code(record[field])}\n"
+
+    return text
+
+
+def main() -> None:
+    record = {field: "" for field in glovar.report_fields}
+    record.update(project="NOSPAM", uid="12345678", level="ban", rule="global", type="text", score="3.5",
+                  name="spam bot", more="extra info")
+
+    assert get_evidence_text(record, "status", "reason") == get_evidence_text_lang(record, "status", "reason")
+
+    # Run the functions in turns, so both of them see the same load of the machine
+    number = 2000
+    results = {"lang": [], "labels": []}
+
+    for _ in range(50):
+        for name, func in [("lang", get_evidence_text_lang), ("labels", get_evidence_text)]:
+            start = perf_counter()
+
+            for _ in range(number):
+                func(record, "status", "reason")
+
+            results[name].append(perf_counter() - start)
+
+    for name, times in results.items():
+        print(f"{name}: {number / min(times):.0f} reports per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Load test of an exchange channel storm, the handlers and the timers of main.py run against the fake client
+# Run it anywhere, it works in a scratch directory: python benchmarks/storm.py --rate 500 --latency 0.05 --flood 0.01
+
+import json
+import sys
+from argparse import ArgumentParser
+from configparser import RawConfigParser
+from os.path import abspath, dirname
+from random import choices, randint
+from shutil import rmtree
+from threading import Event, Thread, active_count
+from time import perf_counter, sleep
+from typing import Dict, List, Union
+
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from fake import Client, init_workdir, load_plugins
+
+Sample = Dict[str, Union[float, int]]
+
+# The exchange data of the storm, and the bots that send them
+kinds: Dict[str, tuple] = {
+    "score": ("NOSPAM", "update", "score"),
+    "bad": ("NOSPAM", "add", "bad"),
+    "watch": ("WATCH", "add", "watch"),
+    "leave": ("CAPTCHA", "leave", "request"),
+    "join": ("USER", "join", "info")
+}
+
+
+def get_data(kind: str, watch_until: List[str]) -> dict:
+    # Get the data of an exchange message
+    uid = randint(100000000, 100100000)
+    gid = -1001000000000 - randint(0, 1000)
+
+    if kind == "score":
+        return {"id": uid, "score": float(randint(0, 5))}
+    elif kind == "bad":
+        return {"id": uid, "type": "user"}
+    elif kind == "watch":
+        return {"id": uid, "type": choices(["ban", "delete"])[0], "until": choices(watch_until)[0]}
+    elif kind == "leave":
+        return {"group_id": gid, "group_name": "Group", "group_link": "", "reason": "permissions"}
+
+    return {"group_id": gid, "group_name": "Group", "group_link": ""}
+
+
+def get_sample(client: Client, start: float) -> Sample:
+    # Get the status of the queues and the threads
+    from plugins import glovar
+
+    client_status = client.get_status()
+    pool_status = glovar.pool.get_status()
+
+    with glovar.locks["shard"]:
+        shard_queued = sum(status["queued"] for status in glovar.shard_status.values())
+
+    return {
+        "time": round(perf_counter() - start, 3),
+        "threads": active_count(),
+        "updates": client_status["updates"],
+        "handled": client_status["handled"],
+        "updates_queued": client_status["queued"],
+        "pool_queued": pool_status["queued"],
+        "pool_busy": pool_status["busy"],
+        "shard_queued": shard_queued,
+        "calls": client_status["calls"],
+        "floods": client_status["floods"]
+    }
+
+
+def is_idle(client: Client) -> bool:
+    # Check if all the updates and the tasks they submitted are done
+    from plugins import glovar
+
+    client_status = client.get_status()
+    pool_status = glovar.pool.get_status()
+
+    return (client_status["handled"] == client_status["updates"]
+            and not pool_status["queued"] and not pool_status["busy"])
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Run an exchange channel storm against the fake client, print JSON")
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of the storm")
+    parser.add_argument("--rate", type=float, default=200.0, help="exchange messages per second, 0 for no limit")
+    parser.add_argument("--mix", default="score=70,bad=15,watch=10,leave=3,join=2", help="weights of the kinds")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds of each client call")
+    parser.add_argument("--jitter", type=float, default=0.05, help="random seconds added to the latency")
+    parser.add_argument("--flood", type=float, default=0.0, help="rate of the client calls raising FloodWait")
+    parser.add_argument("--flood-secs", type=int, default=3, help="seconds of each FloodWait")
+    parser.add_argument("--workers", type=int, default=4, help="update workers of the client")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between the samples")
+    parser.add_argument("--drain", type=float, default=60.0, help="seconds to wait for the backlog after the storm")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    mix = {kind: float(weight) for kind, weight in (pair.split("=") for pair in args.mix.split(","))}
+    path = init_workdir({"custom": {"storage": args.storage}})
+    load_plugins(["plugins.glovar"])
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from plugins import glovar
+    from plugins.functions.etc import crypt_str, get_now
+    from plugins.functions.file import save_all
+    from plugins.functions.timers import expire_records, interval_min_01, update_status
+
+    # The handlers of the plugins in config.ini
+    config = RawConfigParser()
+    config.read("config.ini")
+    client = Client(args.latency, args.jitter, args.flood, args.flood_secs, args.workers)
+    handlers = client.add_handlers([f"{config['plugins']['root']}.{module}"
+                                    for module in config["plugins"]["include"].split()])
+
+    # The timers of main.py, the interval jobs do not depend on the local timezone
+    update_status(client, "online")
+    expire_records(client)
+    scheduler = BackgroundScheduler(job_defaults={"misfire_grace_time": 60}, timezone="UTC")
+    scheduler.add_job(save_all, "interval", seconds=glovar.save_interval)
+    scheduler.add_job(interval_min_01, "interval", minutes=1)
+    scheduler.start()
+
+    # The encrypted deadlines of the watches
+    watch_until = [crypt_str("encrypt", str(get_now() + i * 3600), glovar.key) for i in range(1, 25)]
+
+    # Sample the status until the backlog is done
+    start = perf_counter()
+    samples = []
+    stop = Event()
+    sampler = Thread(target=sample_thread, args=(client, start, args.interval, samples, stop), daemon=True)
+    sampler.start()
+
+    sent = 0
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    while perf_counter() - start < args.seconds:
+        kind = choices(names, weights)[0]
+        sender, action, action_type = kinds[kind]
+        text = json.dumps({
+            "from": sender,
+            "to": [glovar.sender],
+            "action": action,
+            "type": action_type,
+            "data": get_data(kind, watch_until)
+        })
+        client.dispatch(client.add_message(glovar.exchange_channel_id, "channel", text=text))
+        sent += 1
+
+        if args.rate:
+            delay = start + sent / args.rate - perf_counter()
+            delay > 0 and sleep(delay)
+
+    fed = perf_counter() - start
+
+    while not is_idle(client) and perf_counter() - start - fed < args.drain:
+        sleep(0.01)
+
+    done = perf_counter() - start
+    stop.set()
+    sampler.join()
+    scheduler.shutdown(wait=False)
+    save_all()
+
+    client_status = client.get_status()
+    results = {
+        "version": glovar.version,
+        "args": vars(args),
+        "handlers": handlers,
+        "summary": {
+            "sent": sent,
+            "handled": client_status["handled"],
+            "failed": client_status["failed"],
+            "drained": is_idle(client),
+            "seconds_feed": fed,
+            "seconds": done,
+            "throughput": client_status["handled"] / done,
+            "threads_max": max(sample["threads"] for sample in samples),
+            "updates_queued_max": max(sample["updates_queued"] for sample in samples),
+            "pool_queued_max": max(sample["pool_queued"] for sample in samples),
+            "shard_queued_max": max(sample["shard_queued"] for sample in samples),
+            "shard_lag_max": max((status["lag_max"] for status in glovar.shard_status.values()), default=0.0)
+        },
+        "client": client_status,
+        "calls": client.calls,
+        "limiter": glovar.limiter.get_status(),
+        "pool": glovar.pool.get_status(),
+        "save": glovar.save_status,
+        "samples": samples
+    }
+
+    print(json.dumps(results, indent=4, default=str))
+
+    args.keep or rmtree(path, True)
+
+
+def sample_thread(client: Client, start: float, interval: float, samples: List[Sample], stop: Event) -> None:
+    # Take the samples until it is stopped
+    while True:
+        samples.append(get_sample(client, start))
+
+        if stop.wait(interval):
+            samples.append(get_sample(client, start))
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmarks of the hot paths against the fake client, the results are printed as JSON
+# Run it anywhere, it works in a scratch directory: python benchmarks/suite.py [--storage sqlite] > result.json
+
+import json
+import sys
+from argparse import ArgumentParser
+from os.path import abspath, dirname, exists, getsize
+from platform import python_version
+from shutil import rmtree
+from time import perf_counter, sleep, time
+from typing import Callable, Dict, List, Union
+
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from fake import Client, User, init_workdir, load_plugins
+
+Result = Dict[str, Union[float, int, str]]
+
+
+def bench_check_subject(client: Client, number: int) -> Result:
+    # Render the check result of a user with scores
+    from plugins import glovar
+    from plugins.functions.user import check_subject
+
+    uid = 12345678
+    glovar.user_ids[uid] = dict(glovar.default_user_status, nospam=2.5, lang=0.5)
+    message = client.add_message(glovar.manage_group_id, from_user=User(id=1), text=f"/check {uid}")
+
+    return measure(lambda: check_subject(client, message), number)
+
+
+def bench_file_data(client: Client, sizes: List[int]) -> List[Result]:
+    # Download, decrypt and unpack the backup files of some id sets
+    from plugins import glovar
+    from plugins.functions.file import encrypt_data, get_new_path
+    from plugins.functions.receive import receive_file_data
+
+    results = []
+
+    for size in sizes:
+        path = get_new_path()
+        encrypt_data(set(range(size)), path, True)
+        message = client.add_message(glovar.exchange_channel_id, "channel", document=client.add_document(path))
+        assert len(receive_file_data(client, message)) == size
+
+        result = measure(lambda: receive_file_data(client, message), 1, 3)
+        result.update(ids=size, bytes=getsize(path))
+        results.append(result)
+
+    return results
+
+
+def bench_list_page(sizes: List[int]) -> List[Result]:
+    # Get the last page of some lists
+    from plugins import glovar
+    from plugins.functions.etc import get_list_page
+
+    results = []
+
+    for size in sizes:
+        the_list = list(range(size))
+        page = -(-size // glovar.per_page)
+        result = measure(lambda: get_list_page(the_list, "list", "bad", page), 1000)
+        result.update(size=size)
+        results.append(result)
+
+    return results
+
+
+def bench_process_data(client: Client, number: int) -> Result:
+    # Dispatch score updates from the exchange channel, until the shards have received all of them
+    from plugins import glovar
+    from plugins.handlers.message import process_data
+
+    messages = [
+        client.add_message(glovar.exchange_channel_id, text=json.dumps({
+            "from": "NOSPAM",
+            "to": [glovar.sender],
+            "action": "update",
+            "type": "score",
+            "data": {"id": 20000000 + i % 1000, "score": float(i % 5)}
+        }))
+        for i in range(number)
+    ]
+
+    start = perf_counter()
+
+    for message in messages:
+        process_data(client, message)
+
+    wait_pool()
+    seconds = perf_counter() - start
+
+    return {
+        "number": number,
+        "seconds": seconds,
+        "us": seconds / number * 1e6,
+        "ops": number / seconds,
+        "lag_max": max(status["lag_max"] for status in glovar.shard_status.values()),
+        "queued_max": glovar.pool.get_status()["queued_max"]
+    }
+
+
+def bench_report_record(client: Client, number: int) -> Result:
+    # Parse a report message
+    from plugins import glovar
+    from plugins.functions.etc import get_report_record
+
+    labels = ["project", "project_origin", "status", "user_id", "level", "rule", "message_type",
+              "message_lang", "message_len", "user_score", "user_name", "more"]
+    text = "\n".join(f"{glovar.labels[label]}value {i}" for i, label in enumerate(labels))
+    message = client.add_message(glovar.logging_channel_id, text=text)
+
+    return measure(lambda: get_report_record(message), number)
+
+
+def bench_save_thread(sizes: List[int]) -> List[Result]:
+    # Save the scores of more and more users
+    from plugins import glovar
+    from plugins.functions.file import save_thread
+
+    results = []
+    uid = 1000000000
+    path = "data/database.db" if glovar.storage == "sqlite" else "data/user_ids"
+
+    for size in sizes:
+        while len(glovar.user_ids) < size:
+            uid += 1
+            glovar.user_ids[uid] = dict(glovar.default_user_status, nospam=float(uid % 5))
+
+        start = perf_counter()
+        assert save_thread("user_ids")
+        seconds = perf_counter() - start
+
+        results.append({
+            "users": len(glovar.user_ids),
+            "seconds": seconds,
+            "bytes": exists(path) and getsize(path)
+        })
+
+    return results
+
+
+def bench_user_score(number: int) -> Result:
+    # Update the scores, each update is written to the journal, then save them
+    from plugins.functions.file import save_all
+    from plugins.functions.receive import receive_user_score
+
+    data = [{"id": 30000000 + i % 10000, "score": float(i % 5)} for i in range(number)]
+    start = perf_counter()
+
+    for d in data:
+        receive_user_score("NOSPAM", d)
+
+    seconds = perf_counter() - start
+    start = perf_counter()
+    save_all()
+
+    return {
+        "number": number,
+        "seconds": seconds,
+        "us": seconds / number * 1e6,
+        "ops": number / seconds,
+        "save_all": perf_counter() - start
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the hot paths of MANAGE, print the results as JSON")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--number", type=int, default=10000, help="calls of each function")
+    parser.add_argument("--users", default="10000,100000,1000000", help="user counts of save_thread")
+    parser.add_argument("--ids", default="1000,10000,100000,1000000", help="id counts of receive_file_data")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    # The limiter would measure the rate limits instead of the code
+    path = init_workdir({
+        "custom": {
+            "rate_burst": 1000000,
+            "rate_chat": 1000000,
+            "rate_global": 1000000,
+            "storage": args.storage
+        }
+    })
+    load_plugins(["plugins.glovar", "plugins.handlers.message"])
+
+    from plugins import glovar
+
+    client = Client()
+    results = {
+        "version": glovar.version,
+        "python": python_version(),
+        "storage": args.storage,
+        "time": int(time()),
+        "results": {
+            "get_report_record": bench_report_record(client, args.number),
+            "get_list_page": bench_list_page([100, 10000, 1000000]),
+            "check_subject": bench_check_subject(client, args.number // 10),
+            "receive_user_score": bench_user_score(args.number),
+            "process_data": bench_process_data(client, args.number),
+            "receive_file_data": bench_file_data(client, [int(i) for i in args.ids.split(",")]),
+            "save_thread": bench_save_thread([int(i) for i in args.users.split(",")])
+        }
+    }
+
+    print(json.dumps(results, indent=4))
+
+    args.keep or rmtree(path, True)
+
+
+def measure(target: Callable, number: int, repeat: int = 5) -> Result:
+    # Run the target some times in each round, get the best round
+    best = min(measure_round(target, number) for _ in range(repeat))
+
+    return {
+        "number": number,
+        "seconds": best,
+        "us": best / number * 1e6,
+        "ops": number / best
+    }
+
+
+def measure_round(target: Callable, number: int) -> float:
+    # Get the seconds of running the target some times
+    start = perf_counter()
+
+    for _ in range(number):
+        target()
+
+    return perf_counter() - start
+
+
+def wait_pool() -> bool:
+    # Wait until the pool has run all the submitted tasks
+    from plugins import glovar
+
+    while True:
+        status = glovar.pool.get_status()
+
+        if not status["queued"] and not status["busy"]:
+            return True
+
+        sleep(0.001)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,11 +26,17 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from pyrogram import Client
 
 from plugins import glovar
-from plugins.functions.timers import backup_files, interval_hour_01, reset_data, update_status
+from plugins.functions.channel import share_batch_all
+from plugins.functions.etc import thread
+from plugins.functions.file import save_all
+from plugins.functions.timers import backup_files, expire_records, interval_min_01, reset_data, update_status
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
+# Load data in the background, the handlers wait for the data they need
+thread(glovar.load_all, ())
+
 # Config session
 app = Client(
     session_name="bot",
@@ -41,16 +47,30 @@ app.start()
 # Send online status
 update_status(app, "online")
 
+# Expire the records at their deadlines
+expire_records(app)
+
 # Timer
 scheduler = BackgroundScheduler(job_defaults={"misfire_grace_time": 60})
-scheduler.add_job(interval_hour_01, "interval", [app], hours=1)
+scheduler.add_job(save_all, "interval", seconds=glovar.save_interval)
+scheduler.add_job(interval_min_01, "interval", minutes=1)
 scheduler.add_job(update_status, "cron", [app, "awake"], minute=randint(30, 34), second=randint(0, 59))
 scheduler.add_job(backup_files, "cron", [app], hour=20)
 scheduler.add_job(reset_data, "cron", [app], day=glovar.date_reset, hour=22)
 scheduler.start()
 
+# Serve the metrics on the local port
+glovar.metrics_port and glovar.recorder.serve(glovar.metrics_port)
+
 # Hold
 app.idle()
 
+# Send the batched data
+share_batch_all(app)
+
 # Stop
 app.stop()
+scheduler.shutdown()
+
+# Save changed data
+save_all()
@@ -0,0 +1,89 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module is imported by glovar, so it must not import glovar or pyrogram
+
+import logging
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Any, Dict, Hashable, Tuple
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+
+class Cache:
+    # A LRU cache whose entries expire after some seconds
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.lock = Lock()
+        self.data: Dict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.status: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evicted": 0,
+            "invalidated": 0
+        }
+
+    def discard(self, key: Hashable) -> None:
+        # Invalidate an entry
+        with self.lock:
+            if self.data.pop(key, None) is not None:
+                self.status["invalidated"] += 1
+
+    def get(self, key: Hashable) -> Any:
+        # Get an entry, None if it is missing or expired
+        with self.lock:
+            entry = self.data.get(key)
+
+            if entry is None:
+                self.status["misses"] += 1
+                return None
+
+            if entry[0] <= time():
+                self.data.pop(key)
+                self.status["expired"] += 1
+                self.status["misses"] += 1
+                return None
+
+            self.data.move_to_end(key)
+            self.status["hits"] += 1
+
+            return entry[1]
+
+    def get_status(self) -> Dict[str, int]:
+        # Get a copy of the status
+        with self.lock:
+            result = dict(self.status)
+            result["size"] = len(self.data)
+
+        return result
+
+    def set(self, key: Hashable, value: Any) -> None:
+        # Set an entry, the least recently used entries are evicted
+        with self.lock:
+            self.data[key] = (time() + self.ttl, value)
+            self.data.move_to_end(key)
+
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+                self.status["evicted"] += 1
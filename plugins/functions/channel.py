@@ -18,15 +18,15 @@
 
 import logging
 from json import dumps
-from typing import List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 from pyrogram import Client, Message
 from pyrogram.errors import FloodWait
 
 from .. import glovar
-from .etc import (code, code_block, delay, general_link, get_report_record, lang, mention_id, message_link,
+from .etc import (code, code_block, delay, general_link, get_now, get_report_record, lang, mention_id, message_link,
                   thread, wait_flood)
-from .file import crypt_file, delete_file, get_new_path
+from .file import crypt_file, delete_file, encrypt_data, get_new_path, journal_read, journal_rotate, save
 from .telegram import edit_message_text, send_document, send_message
 
 # Enable logging
@@ -41,49 +41,11 @@ def edit_evidence(client: Client, message: Message, record: dict, status: str,
         cid = message.chat.id
         mid = message.message_id
 
-        text = (f"{lang('project')}{lang('colon')}{code(glovar.sender)}\n"
-                f"{lang('project_origin')}{lang('colon')}{code(record['origin'] or record['project'])}\n"
-                f"{lang('status')}{lang('colon')}{code(status)}\n")
+        text = get_evidence_text(record, status, reason)
 
-        if reason:
-            text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
-
-        text += (f"{lang('user_id')}{lang('colon')}{code(record['uid'])}\n"
-                 f"{lang('level')}{lang('colon')}{code(record['level'])}\n"
-                 f"{lang('rule')}{lang('colon')}{code(record['rule'])}\n")
-
-        if record["type"]:
-            text += f"{lang('message_type')}{lang('colon')}{code(record['type'])}\n"
-
-        if record["game"]:
-            text += f"{lang('message_game')}{lang('colon')}{code(record['game'])}\n"
-
-        if record["lang"]:
-            text += f"{lang('message_lang')}{lang('colon')}{code(record['lang'])}\n"
-
-        if record["length"]:
-            text += f"{lang('message_len')}{lang('colon')}{code(record['length'])}\n"
-
-        if record["freq"]:
-            text += f"{lang('message_freq')}{lang('colon')}{code(record['freq'])}\n"
-
-        if record["score"]:
-            text += f"{lang('user_score')}{lang('colon')}{code(record['score'])}\n"
-
-        if record["bio"]:
-            text += f"{lang('user_bio')}{lang('colon')}{code(record['bio'])}\n"
-
-        if record["name"]:
-            text += f"{lang('user_name')}{lang('colon')}{code(record['name'])}\n"
-
-        if record["from"]:
-            text += f"{lang('from_name')}{lang('colon')}{code(record['from'])}\n"
-
-        if record["contact"]:
-            text += f"{lang('contact')}{lang('colon')}{code(record['contact'])}\n"
-
-        if record["more"]:
-            text += f"{lang('more')}{lang('colon')}{code(record['more'])}\n"
+        # The message is left as it is if the text can not be generated
+        if not text:
+            return False
 
         if delay_secs:
             delay(delay_secs, edit_message_text, [client, cid, mid, text])
@@ -110,9 +72,9 @@ def exchange_to_hide(client: Client) -> bool:
         )
 
         # Send debug message
-        text = (f"{lang('project')}{lang('colon')}{code(glovar.sender)}\n"
-                f"{lang('issue')}{lang('colon')}{code(lang('exchange_invalid'))}\n"
-                f"{lang('auto_fix')}{lang('colon')}{code(lang('protocol_1'))}\n")
+        text = (f"{glovar.labels['project']}{code(glovar.sender)}\n"
+                f"{glovar.labels['issue']}{code(lang('exchange_invalid'))}\n"
+                f"{glovar.labels['auto_fix']}{code(lang('protocol_1'))}\n")
         thread(send_message, (client, glovar.critical_channel_id, text))
 
         return True
@@ -147,13 +109,13 @@ def forward_evidence(client: Client, message: Message) -> Optional[Union[bool, M
     try:
         # Basic information
         uid = message.from_user.id
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
-                f"{lang('time_send')}{lang('colon')}{code(message.date)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(uid)}\n"
+                f"{glovar.labels['time_send']}{code(message.date)}\n")
 
         if message.contact or message.location or message.venue or message.video_note or message.voice:
-            text += f"{lang('more')}{lang('colon')}{code(lang('privacy'))}\n"
+            text += f"{glovar.labels['more']}{code(lang('privacy'))}\n"
         elif message.game or message.service:
-            text += f"{lang('more')}{lang('colon')}{code(lang('cannot_forward'))}\n"
+            text += f"{glovar.labels['more']}{code(lang('cannot_forward'))}\n"
 
         # DO NOT try to forward these types of message
         if (message.contact
@@ -171,13 +133,14 @@ def forward_evidence(client: Client, message: Message) -> Optional[Union[bool, M
         while flood_wait:
             flood_wait = False
             try:
+                glovar.limiter.wait(glovar.manage_channel_id)
                 result = message.forward(
                     chat_id=glovar.manage_channel_id,
                     disable_notification=True
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, glovar.manage_channel_id)
             except Exception as e:
                 logger.warning(f"Forward evidence message error: {e}", exc_info=True)
                 return False
@@ -191,6 +154,33 @@ def forward_evidence(client: Client, message: Message) -> Optional[Union[bool, M
     return result
 
 
+def get_evidence_text(record: dict, status: str, reason: str = None) -> Optional[str]:
+    # Get the evidence report's text
+    result = None
+    try:
+        labels = glovar.labels
+        text = (f"{labels['project']}{code(glovar.sender)}\n"
+                f"{labels['project_origin']}{code(record['origin'] or record['project'])}\n"
+                f"{labels['status']}{code(status)}\n")
+
+        if reason:
+            text += f"{labels['reason']}{code(reason)}\n"
+
+        text += (f"{labels['user_id']}{code(record['uid'])}\n"
+                 f"{labels['level']}{code(record['level'])}\n"
+                 f"{labels['rule']}{code(record['rule'])}\n")
+
+        for field, label in glovar.evidence_fields:
+            if record[field]:
+                text += f"{label}{code(record[field])}\n"
+
+        result = text
+    except Exception as e:
+        logger.warning(f"Get evidence text error: {e}", exc_info=True)
+
+    return result
+
+
 def send_error(client: Client, message: Message, project: str, aid: int, action: str, level: str, rule: str,
                reason: str = None) -> Optional[Union[bool, Message]]:
     # Send the error record message
@@ -198,14 +188,14 @@ def send_error(client: Client, message: Message, project: str, aid: int, action:
 
     try:
         # Text prefix
-        text = (f"{lang('project_origin')}{lang('colon')}{code(project)}\n"
-                f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(action)}\n"
-                f"{lang('error_level')}{lang('colon')}{code(level)}\n"
-                f"{lang('error_rule')}{lang('colon')}{code(rule)}\n")
+        text = (f"{glovar.labels['project_origin']}{code(project)}\n"
+                f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(action)}\n"
+                f"{glovar.labels['error_level']}{code(level)}\n"
+                f"{glovar.labels['error_rule']}{code(rule)}\n")
 
         if reason:
-            text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+            text += f"{glovar.labels['reason']}{code(reason)}\n"
 
         # Get record
         record = get_report_record(message)
@@ -214,12 +204,12 @@ def send_error(client: Client, message: Message, project: str, aid: int, action:
         if lang("name") in rule or lang("nick") in rule:
             for key in record:
                 if key == "name" and record.get(key):
-                    text += f"{lang('user_name')}{lang('colon')}{code(record[key])}\n"
+                    text += f"{glovar.labels['user_name']}{code(record[key])}\n"
                 elif key == "name" and record.get(key):
-                    text += f"{lang('from_name')}{lang('colon')}{code(record[key])}\n"
+                    text += f"{glovar.labels['from_name']}{code(record[key])}\n"
             return send_message(client, glovar.error_channel_id, text)
         elif lang("bio") in rule:
-            text += f"{lang('user_bio')}{lang('colon')}{code(record['bio'])}\n"
+            text += f"{glovar.labels['user_bio']}{code(record['bio'])}\n"
             return send_message(client, glovar.error_channel_id, text)
 
         # Get the evidence message
@@ -230,10 +220,11 @@ def send_error(client: Client, message: Message, project: str, aid: int, action:
         while flood_wait:
             flood_wait = False
             try:
+                glovar.limiter.wait(glovar.error_channel_id)
                 result = message.forward(glovar.error_channel_id)
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, glovar.error_channel_id)
             except Exception as e:
                 logger.info(f"Forward error message error: {e}", exc_info=True)
                 return False
@@ -250,27 +241,27 @@ def send_debug(client: Client, aid: int, action: str, project: str = None, the_t
                the_id: int = None, em: Message = None, err_m: Message = None, reason: str = None) -> bool:
     # Send the debug message
     try:
-        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(action)}\n")
+        text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(action)}\n")
 
         if project:
-            text += f"{lang('project_target')}{lang('colon')}{code(project)}\n"
+            text += f"{glovar.labels['project_target']}{code(project)}\n"
 
         if the_type:
-            text += f"{lang(f'type_{the_type}')}{lang('colon')}{code(lang(f'time_{the_type}'))}\n"
+            text += f"{glovar.labels[f'type_{the_type}']}{code(lang(f'time_{the_type}'))}\n"
 
         if the_id:
-            text += f"{lang((lambda x: 'user_id' if x else 'channel_id')(the_id > 0))}{lang('colon')}{code(the_id)}\n"
+            text += f"{glovar.labels['user_id' if the_id > 0 else 'channel_id']}{code(the_id)}\n"
 
         if em:
-            text += f"{lang('record_origin')}{lang('colon')}{general_link(em.message_id, message_link(em))}\n"
+            text += f"{glovar.labels['record_origin']}{general_link(em.message_id, message_link(em))}\n"
 
         if err_m:
-            text += f"{lang('record_error')}{lang('colon')}{general_link(err_m.message_id, message_link(err_m))}\n"
+            text += f"{glovar.labels['record_error']}{general_link(err_m.message_id, message_link(err_m))}\n"
 
         if reason:
-            text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+            text += f"{glovar.labels['reason']}{code(reason)}\n"
 
         thread(send_message, (client, glovar.debug_channel_id, text))
 
@@ -302,13 +293,165 @@ def share_bad_channel(client: Client, cid: int) -> bool:
     return False
 
 
+def share_backup(client: Client, file: str) -> bool:
+    # Share a file to BACKUP, the journaled files are shared as the changes since a full base of every few days
+    try:
+        # Basic data
+        now = get_now()
+        status = glovar.backups.get(file, {})
+        delta = file in glovar.delta_list
+        full = not delta or not status.get("base") or now - status.get("time", 0) >= glovar.backup_base * 86400
+
+        # The changes made after this are shared next time
+        if delta and not journal_rotate(file, "delta"):
+            return False
+
+        if full:
+            action_type = "data"
+            data = file
+            content = eval(f"glovar.{file}")
+        else:
+            action_type = "delta"
+            data = {
+                "file": file,
+                "base": status["base"],
+                "deltas": status["deltas"]
+            }
+            content = journal_read(f"data/{file}.delta.old")
+
+        # Nothing changed
+        if not content and not full:
+            return delete_file(f"data/{file}.delta.old")
+
+        text = format_data(
+            sender=glovar.sender,
+            receivers=["BACKUP"],
+            action="backup",
+            action_type=action_type,
+            data=data
+        )
+        file_path = get_new_path()
+
+        if not encrypt_data(content, file_path, True):
+            delete_file(file_path)
+            return False
+
+        # The file is sent in the share queue, after the data shared before it
+        return thread(share_backup_file, (client, file, file_path, text, full, now), key="share")
+    except Exception as e:
+        logger.warning(f"Share backup error: {e}", exc_info=True)
+
+    return False
+
+
+def share_backup_file(client: Client, file: str, file_path: str, text: str, full: bool, now: int) -> bool:
+    # Send the backup file of a file, then add it to the backup chain, run in the share queue
+    try:
+        share_batch_pending(client, ("BACKUP",))
+
+        if glovar.should_hide:
+            channel_id = glovar.hide_channel_id
+        else:
+            channel_id = glovar.exchange_channel_id
+
+        result = send_document(client, channel_id, file_path, None, text)
+        delete_file(file_path)
+
+        # The changes are kept until they are shared
+        if not result:
+            result is False and not glovar.should_hide and exchange_to_hide(client)
+            return False
+
+        # Update the backup chain of the file, the base includes all the changes before it
+        if file not in glovar.delta_list:
+            return True
+        elif full:
+            glovar.backups[file] = {
+                "time": now,
+                "base": [result.chat.id, result.message_id],
+                "deltas": []
+            }
+        else:
+            glovar.backups[file]["deltas"].append([result.chat.id, result.message_id])
+
+        save("backups")
+
+        return delete_file(f"data/{file}.delta.old")
+    except Exception as e:
+        logger.warning(f"Share backup file error: {e}", exc_info=True)
+
+    return False
+
+
+def share_batch(client: Client, receivers: Tuple[str, ...]) -> bool:
+    # Send the batched data in one message, or in one file if the text is too long
+    try:
+        with glovar.locks["batch"]:
+            items = glovar.batches.pop(receivers, [])
+
+        if not items:
+            return True
+
+        if len(items) == 1:
+            return share_data_thread(client, list(receivers), items[0]["action"], items[0]["type"], items[0]["data"])
+
+        text = format_data(
+            sender=glovar.sender,
+            receivers=list(receivers),
+            action="batch",
+            action_type="data",
+            data=items
+        )
+
+        if len(text) <= 4000:
+            return share_data_thread(client, list(receivers), "batch", "data", items)
+
+        return share_data_thread(client, list(receivers), "batch", "file", len(items), content=items)
+    except Exception as e:
+        logger.warning(f"Share batch error: {e}", exc_info=True)
+
+    return False
+
+
+def share_batch_all(client: Client) -> bool:
+    # Send all the batched data now
+    try:
+        for receivers in list(glovar.batches):
+            share_batch(client, receivers)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Share batch all error: {e}", exc_info=True)
+
+    return False
+
+
+def share_batch_pending(client: Client, receivers: Tuple[str, ...]) -> bool:
+    # Send the batched data to any of the receivers, before the data to them that are not batched
+    try:
+        with glovar.locks["batch"]:
+            pending = [r for r in glovar.batches if set(r) & set(receivers)]
+
+        for r in pending:
+            share_batch(client, r)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Share batch pending error: {e}", exc_info=True)
+
+    return False
+
+
 def share_data(client: Client, receivers: List[str], action: str, action_type: str,
-               data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True) -> bool:
-    # Use this function to share data in the channel
+               data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True,
+               content: Any = None) -> bool:
+    # Use this function to share data in the channel, the content is sent as an encrypted pickle file
     try:
+        # The data are batched or sent in the share queue, in the order they are shared
         thread(
-            target=share_data_thread,
-            args=(client, receivers, action, action_type, data, file, encrypt)
+            target=share_data_ordered,
+            args=(client, receivers, action, action_type, data, file, encrypt, content),
+            key="share"
         )
 
         return True
@@ -318,8 +461,37 @@ def share_data(client: Client, receivers: List[str], action: str, action_type: s
     return False
 
 
+def share_data_ordered(client: Client, receivers: List[str], action: str, action_type: str,
+                       data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True,
+                       content: Any = None) -> bool:
+    # Batch the data or send it, run in the share queue
+    try:
+        batch_receivers = tuple(sorted(set(receivers) - {glovar.sender}))
+
+        # Batch the data if all the receivers support it
+        if (not file and content is None and action != "batch" and glovar.batch_window
+                and batch_receivers and all(r in glovar.receivers["batch"] for r in batch_receivers)):
+            with glovar.locks["batch"]:
+                items = glovar.batches.setdefault(batch_receivers, [])
+                items.append({"action": action, "type": action_type, "data": data})
+                first = len(items) == 1
+
+            first and delay(glovar.batch_window, share_batch, [client, batch_receivers], "share")
+
+            return True
+
+        share_batch_pending(client, batch_receivers)
+
+        return share_data_thread(client, receivers, action, action_type, data, file, encrypt, content)
+    except Exception as e:
+        logger.warning(f"Share data ordered error: {e}", exc_info=True)
+
+    return False
+
+
 def share_data_thread(client: Client, receivers: List[str], action: str, action_type: str,
-                      data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True) -> bool:
+                      data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True,
+                      content: Any = None) -> bool:
     # Share data thread
     try:
         if glovar.sender in receivers:
@@ -333,7 +505,7 @@ def share_data_thread(client: Client, receivers: List[str], action: str, action_
         else:
             channel_id = glovar.exchange_channel_id
 
-        if file:
+        if file or content is not None:
             text = format_data(
                 sender=glovar.sender,
                 receivers=receivers,
@@ -342,7 +514,14 @@ def share_data_thread(client: Client, receivers: List[str], action: str, action_
                 data=data
             )
 
-            if encrypt:
+            if content is not None:
+                # Pickle and encrypt the content in one pass, only the encrypted file is written
+                file = ""
+                file_path = get_new_path()
+
+                if not encrypt_data(content, file_path):
+                    return False
+            elif encrypt:
                 # Encrypt the file, save to the tmp directory
                 file_path = get_new_path()
                 crypt_file("encrypt", file, file_path)
@@ -355,7 +534,7 @@ def share_data_thread(client: Client, receivers: List[str], action: str, action_
             # Delete the tmp file
             if result:
                 for f in {file, file_path}:
-                    f.startswith("tmp/") and thread(delete_file, (f,))
+                    f.startswith("tmp/") and delete_file(f)
         else:
             text = format_data(
                 sender=glovar.sender,
@@ -370,7 +549,7 @@ def share_data_thread(client: Client, receivers: List[str], action: str, action_
         if result is False and not glovar.should_hide:
             # Use hide channel instead
             exchange_to_hide(client)
-            thread(share_data, (client, receivers, action, action_type, data, file, encrypt))
+            thread(share_data, (client, receivers, action, action_type, data, file, encrypt, content))
 
         return True
     except Exception as e:
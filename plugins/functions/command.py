@@ -20,6 +20,7 @@ import logging
 
 from pyrogram import Client, Message
 
+from .. import glovar
 from .etc import code, get_text, lang, thread
 from .group import delete_message
 from .telegram import send_message, send_report_message
@@ -57,13 +58,13 @@ def command_error(client: Client, message: Message, action: str, error: str,
         mid = message.message_id
 
         # Generate the text
-        text = (f"{lang('user_id')}{lang('colon')}{code(uid)}\n"
-                f"{lang('action')}{lang('colon')}{code(action)}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                f"{lang('reason')}{lang('colon')}{code(error)}\n")
+        text = (f"{glovar.labels['user_id']}{code(uid)}\n"
+                f"{glovar.labels['action']}{code(action)}\n"
+                f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                f"{glovar.labels['reason']}{code(error)}\n")
 
         if detail:
-            text += f"{lang('detail')}{lang('colon')}{code(detail)}\n"
+            text += f"{glovar.labels['detail']}{code(detail)}\n"
 
         # Send the message
         if report:
@@ -18,10 +18,13 @@
 
 import logging
 from functools import wraps
+from time import perf_counter
+from typing import Hashable
 
 from pyrogram.errors import FloodWait
 
-from .etc import thread, wait_flood
+from .. import glovar
+from .etc import get_key, thread, wait_flood
 
 # Enable logging
 logger = logging.getLogger(__name__)
@@ -36,7 +39,7 @@ def retry(func):
             try:
                 result = func(*args, **kwargs)
             except FloodWait as e:
-                wait_flood(e)
+                wait_flood(e, get_key(func, args))
             except Exception as e:
                 logger.warning(f"Retry error: {e}", exc_info=True)
                 break
@@ -46,11 +49,67 @@ def retry(func):
     return wrapper
 
 
-def threaded(daemon: bool = True):
-    # Run with thread
+def threaded(key: Hashable = None):
+    # Run in the worker pool
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            return thread(func, args, kwargs, daemon)
+            return thread(func, args, kwargs, key)
+        return wrapper
+    return decorator
+
+
+def ready(*files: str):
+    # Wait until the data is loaded, the calls made before that are run in order by another thread
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            events = [glovar.ready[file] for file in files or glovar.file_list]
+
+            with glovar.locks["ready"]:
+                if glovar.ready_calls or not all(event.is_set() for event in events):
+                    glovar.ready_calls.append((events, func, args, kwargs))
+                    len(glovar.ready_calls) == 1 and thread(ready_thread, ())
+                    return None
+
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def ready_thread() -> bool:
+    # Run the calls waiting for the data
+    while True:
+        with glovar.locks["ready"]:
+            events, func, args, kwargs = glovar.ready_calls[0]
+
+        for event in events:
+            event.wait()
+
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Ready thread error: {e}", exc_info=True)
+
+        with glovar.locks["ready"]:
+            glovar.ready_calls.pop(0)
+
+            if not glovar.ready_calls:
+                return True
+
+
+def timed(name: str):
+    # Record the seconds of each call, the function is not wrapped if the metrics are disabled
+    def decorator(func):
+        if not glovar.recorder.enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                glovar.recorder.observe(name, "function", func.__name__, perf_counter() - start)
         return wrapper
     return decorator
@@ -23,15 +23,15 @@ from html import escape
 from json import dumps, loads
 from random import choice, uniform
 from string import ascii_letters, digits
-from threading import Thread, Timer
-from time import localtime, sleep, strftime, time
-from typing import Any, Callable, Dict, List, Optional, Union
+from time import localtime, strftime, time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
 
 from cryptography.fernet import Fernet
-from pyrogram import InlineKeyboardButton, InlineKeyboardMarkup, Message
+from pyrogram import Client, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from pyrogram.errors import FloodWait
 
 from .. import glovar
+from .pool import Defer
 
 # Enable logging
 logger = logging.getLogger(__name__)
@@ -112,14 +112,11 @@ def crypt_str(operation: str, text: str, key: bytes) -> str:
     return result
 
 
-def delay(secs: int, target: Callable, args: list) -> bool:
-    # Call a function with delay
+def delay(secs: int, target: Callable, args: list, key: Hashable = None) -> bool:
+    # Call a function with delay, in the worker pool as thread() does
     try:
-        t = Timer(secs, target, args)
-        t.daemon = True
-        t.start()
-
-        return True
+        return glovar.pool.schedule(secs, target, tuple(args), None,
+                                    key if key is not None else get_key(target, tuple(args)))
     except Exception as e:
         logger.warning(f"Delay error: {e}", exc_info=True)
 
@@ -254,6 +251,23 @@ def get_int(text: str) -> Optional[int]:
     return result
 
 
+def get_key(target: Callable, args: tuple) -> Optional[int]:
+    # Get the key of a Telegram call, the calls to the same chat are run in order
+    result = None
+
+    try:
+        if not target.__module__.endswith(".telegram"):
+            return None
+
+        for i, arg in enumerate(args[:-1]):
+            if isinstance(arg, Client) and isinstance(args[i + 1], int):
+                return args[i + 1]
+    except Exception as e:
+        logger.warning(f"Get key error: {e}", exc_info=True)
+
+    return result
+
+
 def get_list_page(the_list: list, action: str, action_type: str, page: int) -> (list, InlineKeyboardMarkup):
     # Generate a list for elements and markup buttons
     markup = None
@@ -385,46 +399,13 @@ def get_report_record(message: Message) -> Dict[str, str]:
             return record
 
         record_list = message.text.split("\n")
+        colon = lang("colon")
 
+        # Each line is matched once by the labels of all the fields
         for r in record_list:
-            if re.search(f"^{lang('project')}{lang('colon')}", r):
-                record_type = "project"
-            elif re.search(f"^{lang('project_origin')}{lang('colon')}", r):
-                record_type = "origin"
-            elif re.search(f"^{lang('status')}{lang('colon')}", r):
-                record_type = "status"
-            elif re.search(f"^{lang('user_id')}{lang('colon')}", r):
-                record_type = "uid"
-            elif re.search(f"^{lang('level')}{lang('colon')}", r):
-                record_type = "level"
-            elif re.search(f"^{lang('rule')}{lang('colon')}", r):
-                record_type = "rule"
-            elif re.search(f"^{lang('message_type')}{lang('colon')}", r):
-                record_type = "type"
-            elif re.search(f"^{lang('message_game')}{lang('colon')}", r):
-                record_type = "game"
-            elif re.search(f"^{lang('message_lang')}{lang('colon')}", r):
-                record_type = "lang"
-            elif re.search(f"^{lang('message_len')}{lang('colon')}", r):
-                record_type = "length"
-            elif re.search(f"^{lang('message_freq')}{lang('colon')}", r):
-                record_type = "freq"
-            elif re.search(f"^{lang('user_score')}{lang('colon')}", r):
-                record_type = "score"
-            elif re.search(f"^{lang('user_bio')}{lang('colon')}", r):
-                record_type = "bio"
-            elif re.search(f"^{lang('user_name')}{lang('colon')}", r):
-                record_type = "name"
-            elif re.search(f"^{lang('from_name')}{lang('colon')}", r):
-                record_type = "from"
-            elif re.search(f"^{lang('contact')}{lang('colon')}", r):
-                record_type = "contact"
-            elif re.search(f"^{lang('more')}{lang('colon')}", r):
-                record_type = "more"
-            else:
-                record_type = "unknown"
-
-            record[record_type] = r.split(f"{lang('colon')}")[-1]
+            match = glovar.report_pattern.match(r)
+            record_type = match.lastgroup if match else "unknown"
+            record[record_type] = r.split(colon)[-1]
     except Exception as e:
         logger.warning(f"Get report record error: {e}", exc_info=True)
 
@@ -564,27 +545,47 @@ def random_str(i: int) -> str:
     return text
 
 
-def thread(target: Callable, args: tuple, kwargs: dict = None, daemon: bool = True) -> bool:
-    # Call a function using thread
+def thread(target: Callable, args: tuple, kwargs: dict = None, key: Hashable = None) -> bool:
+    # Call a function in the worker pool, the calls with the same key are run in order
+    # A task keyed by a chat is run again if the chat's calls must wait, so it makes no changes before its calls
     result = False
 
     try:
-        t = Thread(target=target, args=args, kwargs=kwargs, daemon=daemon)
-        t.daemon = daemon
-        result = t.start() or True
+        result = glovar.pool.submit(target, args, kwargs, key if key is not None else get_key(target, args))
     except Exception as e:
         logger.warning(f"Thread error: {e}", exc_info=True)
 
     return result
 
 
-def wait_flood(e: FloodWait) -> bool:
-    # Wait flood secs
+def wait_flood(e: FloodWait, cid: Union[int, str] = None) -> bool:
+    # Pause the chat's calls for the flood secs, the next call waits in the limiter
     try:
-        sleep(e.x + uniform(0.5, 1.0))
+        glovar.limiter.pause(cid, e.x + uniform(0.5, 1.0))
+        glovar.recorder.count("flood_waits")
+        glovar.recorder.count("flood_seconds", number=e.x)
 
         return True
     except Exception as e:
         logger.warning(f"Wait flood error: {e}", exc_info=True)
 
     return False
+
+
+def wait_limit(cid: Union[int, str] = None) -> float:
+    # Wait until a call to the chat can be made, a task in the chat's queue is deferred instead
+    result = 0.0
+
+    try:
+        if cid is None or glovar.pool.get_key() != cid:
+            return glovar.limiter.wait(cid)
+
+        # The worker runs the other keys' tasks meanwhile, the chat's task is run again when the chat is ready
+        secs = glovar.limiter.take(cid)
+
+        if secs > 0:
+            raise Defer(secs)
+    except Exception as e:
+        logger.warning(f"Wait limit error: {e}", exc_info=True)
+
+    return result
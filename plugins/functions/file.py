@@ -17,21 +17,96 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from os import remove
+from io import BytesIO
+from lzma import LZMADecompressor, compress as lzma_compress
+from os import fsync, remove, rename, replace
 from os.path import exists
-from pickle import dump
-from shutil import copyfile
+from pickle import Unpickler, UnpicklingError, dump, dumps, load
+from shutil import copyfileobj
+from struct import calcsize, pack, unpack_from
+from threading import Lock
+from time import time
+from typing import Any, BinaryIO, Dict, List, Union
+from zlib import compress as zlib_compress, crc32, decompressobj
 
-from pyAesCrypt import decryptFile, encryptFile
-from pyrogram import Client
+from pyAesCrypt import decryptFile, decryptStream, encryptFile, encryptStream
+from pyrogram import Client, Message
 
 from .. import glovar
-from .etc import random_str, thread
+from .etc import get_text, random_str, thread
 from .telegram import download_media
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
+# The container of the backup data: magic, version, codec, checksum of the body, size of the pickle
+container_header = ">4sBBIQ"
+container_magic = b"079D"
+container_version = 1
+
+# The largest size of the data in a container, a container that claims more is rejected before it is decompressed
+container_size_max = 1024 ** 3
+
+
+class DataUnpickler(Unpickler):
+    # Load the pickled data, only the known data types can be loaded
+
+    classes = {
+        ("builtins", "bool"), ("builtins", "bytes"), ("builtins", "dict"), ("builtins", "float"),
+        ("builtins", "frozenset"), ("builtins", "int"), ("builtins", "list"), ("builtins", "set"),
+        ("builtins", "str"), ("builtins", "tuple"),
+        ("plugins.functions.storage", "ScoreTable")
+    }
+
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) not in self.classes:
+            raise UnpicklingError(f"{module}.{name} is not allowed")
+
+        return super().find_class(module, name)
+
+
+def capture_data(message: Message, now: float) -> bool:
+    # Append an exchange message to the capture, with the file id of its document
+    try:
+        file_id = message.document and message.document.file_id
+
+        return capture_write((now, get_text(message), file_id or None))
+    except Exception as e:
+        logger.warning(f"Capture data error: {e}", exc_info=True)
+
+    return False
+
+
+def capture_file(file_id: str, path: str) -> bool:
+    # Append the bytes of a downloaded document to the capture, after the message of the document
+    # The message is queued on the same key before its data is received, so its record is written first
+    try:
+        with open(path, "rb") as f:
+            return thread(capture_write, ((file_id, f.read()),), None, "capture")
+    except Exception as e:
+        logger.warning(f"Capture file error: {e}", exc_info=True)
+
+    return False
+
+
+def capture_write(record: tuple) -> bool:
+    # Write a record to the capture, a large capture is moved aside as journals are, only the last one is kept
+    try:
+        with glovar.locks["capture"]:
+            journal_write("exchange.capture", record)
+
+            if glovar.journals["exchange.capture"].tell() < glovar.capture_limit * 1024 * 1024:
+                return True
+
+            glovar.journals.pop("exchange.capture").close()
+            replace("data/exchange.capture", "data/exchange.capture.old")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Capture write error: {e}", exc_info=True)
+
+    return False
+
 
 def crypt_file(operation: str, file_in: str, file_out: str) -> bool:
     # Encrypt or decrypt a file
@@ -53,6 +128,23 @@ def crypt_file(operation: str, file_in: str, file_out: str) -> bool:
     return False
 
 
+def crypt_stream(operation: str, stream_in: BinaryIO, stream_out: BinaryIO, length: int = 0) -> bool:
+    # Encrypt or decrypt a stream, the length of the input is needed to decrypt
+    try:
+        buffer = 64 * 1024
+
+        if operation == "decrypt":
+            decryptStream(stream_in, stream_out, glovar.password, buffer, length)
+        else:
+            encryptStream(stream_in, stream_out, glovar.password, buffer)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Crypt stream error: {e}", exc_info=True)
+
+    return False
+
+
 def delete_file(path: str) -> bool:
     # Delete a file
     try:
@@ -66,15 +158,34 @@ def delete_file(path: str) -> bool:
     return False
 
 
-def get_downloaded_path(client: Client, file_id: str, file_ref: str) -> str:
-    # Download file, get it's path on local machine
+def encrypt_data(the_data: Any, path: str, container: bool = False) -> bool:
+    # Pickle the data and encrypt it into a file, only the encrypted file is written
+    try:
+        with BytesIO() as buffer, open(path, "wb") as f:
+            if container:
+                buffer.write(pack_data(the_data))
+            else:
+                dump(the_data, buffer)
+
+            buffer.seek(0)
+            crypt_stream("encrypt", buffer, f)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Encrypt data error: {e}", exc_info=True)
+
+    return False
+
+
+def get_downloaded_path(client: Client, file_id: str, file_ref: str, cid: int = None) -> str:
+    # Download file of a message in the chat, get it's path on local machine
     final_path = ""
     try:
         if not file_id:
             return ""
 
         file_path = get_new_path()
-        final_path = download_media(client, file_id, file_ref, file_path)
+        final_path = download_media(client, file_id, file_ref, file_path, cid)
     except Exception as e:
         logger.warning(f"Get downloaded path error: {e}", exc_info=True)
 
@@ -97,10 +208,139 @@ def get_new_path(extension: str = "") -> str:
     return result
 
 
+def get_save_status(file: str) -> Dict[str, Union[float, int]]:
+    # Get a global variable's save status, call it with the save lock held
+    result = glovar.save_status.get(file)
+
+    if result is None:
+        result = glovar.save_status[file] = {
+            "saved": 0,
+            "coalesced": 0,
+            "latency": 0.0,
+            "latency_max": 0.0
+        }
+
+    return result
+
+
+def journal(file: str, op: str, path: tuple = (), value: Any = None) -> bool:
+    # Append a mutation record to a global variable's journal
+    try:
+        with glovar.locks["journal"]:
+            # The changes since the last backup
+            file in glovar.delta_list and journal_write(f"{file}.delta", (op, path, value))
+
+            if file in glovar.journal_list:
+                journal_write(f"{file}.journal", (op, path, value))
+                glovar.journal_status[file] = glovar.journal_status.get(file, 0) + 1
+                count = glovar.journal_status[file]
+
+        if file not in glovar.journal_list:
+            return save(file)
+
+        # Compact the journal into a snapshot
+        if (op in {"clear", "set", "update"} and not path) or count >= glovar.journal_limit:
+            save(file)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Journal error: {e}", exc_info=True)
+
+    return False
+
+
+def journal_read(path: str) -> List[tuple]:
+    # Read the records of a journal, the torn record at the end is dropped
+    result = []
+
+    try:
+        if not exists(path):
+            return []
+
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    result.append(load(f))
+                except EOFError:
+                    break
+                except Exception as e:
+                    logger.warning(f"Journal read {path} error: {e}", exc_info=True)
+                    break
+    except Exception as e:
+        logger.warning(f"Journal read error: {e}", exc_info=True)
+
+    return result
+
+
+def journal_rotate(file: str, kind: str = "journal") -> bool:
+    # Move the journal aside before a snapshot or a backup is taken
+    try:
+        name = f"{file}.{kind}"
+
+        with glovar.locks["journal"]:
+            f = glovar.journals.pop(name, None)
+            f and f.close()
+
+            if kind == "journal":
+                glovar.journal_status[file] = 0
+
+            if not exists(f"data/{name}"):
+                return True
+
+            if not exists(f"data/{name}.old"):
+                rename(f"data/{name}", f"data/{name}.old")
+                return True
+
+            # The last snapshot or backup failed, keep all records since the one before it
+            with open(f"data/{name}.old", "ab") as f_old, open(f"data/{name}", "rb") as f_new:
+                copyfileobj(f_new, f_old)
+
+            remove(f"data/{name}")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Journal rotate error: {e}", exc_info=True)
+
+    return False
+
+
+def journal_write(name: str, record: tuple) -> bool:
+    # Write a record to a journal file, call it with the journal lock held, or the capture lock for the capture
+    f = glovar.journals.get(name)
+
+    if f is None:
+        f = glovar.journals[name] = open(f"data/{name}", "ab")
+
+    dump(record, f)
+    f.flush()
+
+    return True
+
+
+def pack_data(the_data: Any) -> bytes:
+    # Pack the data into a versioned container: header, checksum and the compressed pickle
+    raw = dumps(the_data, protocol=4)
+
+    if glovar.compress == "lzma":
+        codec = 2
+        body = lzma_compress(raw, preset=glovar.compress_level)
+    else:
+        codec = 1
+        body = zlib_compress(raw, glovar.compress_level)
+
+    return pack(container_header, container_magic, container_version, codec, crc32(body), len(raw)) + body
+
+
 def save(file: str) -> bool:
-    # Save a global variable to a file
+    # Mark a global variable as changed, it will be saved by save_all
     try:
-        thread(save_thread, (file,))
+        with glovar.locks["save"]:
+            status = get_save_status(file)
+
+            if file in glovar.save_pending:
+                status["coalesced"] += 1
+            else:
+                glovar.save_pending.add(file)
 
         return True
     except Exception as e:
@@ -109,19 +349,126 @@ def save(file: str) -> bool:
     return False
 
 
+def save_all() -> bool:
+    # Save all changed global variables
+    try:
+        with glovar.locks["save"]:
+            files = list(glovar.save_pending)
+            glovar.save_pending.clear()
+
+        for file in files:
+            if save_thread(file):
+                continue
+
+            # Try again next time
+            with glovar.locks["save"]:
+                glovar.save_pending.add(file)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Save all error: {e}", exc_info=True)
+
+    return False
+
+
 def save_thread(file: str) -> bool:
     # Save thread
     try:
         if not glovar:
             return True
 
-        with open(f"data/.{file}", "wb") as f:
-            dump(eval(f"glovar.{file}"), f)
+        # The data is still loading, do not overwrite the file with the default data
+        if not glovar.ready[file].is_set():
+            return save(file)
+
+        with glovar.locks["save"]:
+            lock = glovar.save_locks.get(file)
+
+            if lock is None:
+                lock = glovar.save_locks[file] = Lock()
+
+        # Another thread is writing the file, leave one pending write for the next run
+        if not lock.acquire(blocking=False):
+            return save(file)
+
+        try:
+            start = time()
 
-        copyfile(f"data/.{file}", f"data/{file}")
+            if file in glovar.database_list:
+                # Commit the batched changes
+                glovar.database.commit()
+            elif file in glovar.mmap_list:
+                if not journal_rotate(file):
+                    return False
+
+                # Write each id set to its own file
+                data = eval(f"glovar.{file}")
+
+                for ids in (data.values() if isinstance(data, dict) else [data]):
+                    ids.compact()
+            else:
+                if file in glovar.journal_list and not journal_rotate(file):
+                    return False
+
+                # Write the snapshot to a temporary file, then replace the old one atomically
+                with open(f"data/.{file}", "wb") as f:
+                    dump(eval(f"glovar.{file}"), f)
+                    f.flush()
+                    fsync(f.fileno())
+
+                replace(f"data/.{file}", f"data/{file}")
+
+            # The snapshot includes all the rotated records
+            file in glovar.journal_list and delete_file(f"data/{file}.journal.old")
+
+            # Update the status
+            latency = time() - start
+            glovar.recorder.observe("save", "file", file, latency)
+
+            with glovar.locks["save"]:
+                status = get_save_status(file)
+                status["saved"] += 1
+                status["latency"] = latency
+                status["latency_max"] = max(status["latency_max"], latency)
+        finally:
+            lock.release()
 
         return True
     except Exception as e:
         logger.error(f"Save thread error: {e}", exc_info=True)
 
     return False
+
+
+def unpack_data(raw: bytes) -> Any:
+    # Unpack the data of a container, the data of the old backups is a plain pickle
+    if raw[:len(container_magic)] != container_magic:
+        return DataUnpickler(BytesIO(raw)).load()
+
+    _, version, codec, checksum, size = unpack_from(container_header, raw)
+    body = memoryview(raw)[calcsize(container_header):]
+
+    # Verify the data before it is loaded
+    if version > container_version:
+        raise ValueError(f"Container version {version} is not supported")
+
+    if crc32(body) != checksum:
+        raise ValueError("Container checksum mismatch")
+
+    if size > container_size_max:
+        raise ValueError(f"Container size {size} is too large")
+
+    # Decompress no more than the size, so a small body can not expand without a limit
+    if codec == 2:
+        decompressor = LZMADecompressor()
+        raw = decompressor.decompress(body, max_length=size + 1)
+    elif codec == 1:
+        decompressor = decompressobj()
+        raw = decompressor.decompress(body, size + 1)
+    else:
+        raise ValueError(f"Container codec {codec} is not supported")
+
+    if len(raw) != size or not decompressor.eof:
+        raise ValueError("Container size mismatch")
+
+    return DataUnpickler(BytesIO(raw)).load()
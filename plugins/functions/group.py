@@ -21,6 +21,7 @@ from typing import Optional
 
 from pyrogram import Client, Message
 
+from .. import glovar
 from .etc import thread
 from .telegram import delete_messages, get_messages
 
@@ -34,6 +35,9 @@ def delete_message(client: Client, gid: int, mid: int) -> bool:
         if not gid and mid:
             return True
 
+        # The cached message is not served while it is being deleted
+        glovar.message_cache.discard((gid, mid))
+
         mids = [mid]
         thread(delete_messages, (client, gid, mids))
 
@@ -44,15 +48,23 @@ def delete_message(client: Client, gid: int, mid: int) -> bool:
     return False
 
 
-def get_message(client: Client, gid: int, mid: int) -> Optional[Message]:
-    # Get a single message
+def get_message(client: Client, gid: int, mid: int, cache: bool = False) -> Optional[Message]:
+    # Get a single message, the cached message is used if it is fetched recently
     result = None
     try:
+        result = cache and glovar.message_cache.get((gid, mid))
+
+        if result:
+            return result
+
         mids = [mid]
         result = get_messages(client, gid, mids)
 
         if result:
             result = result[0]
+
+        if result and cache:
+            glovar.message_cache.set((gid, mid), result)
     except Exception as e:
         logger.warning(f"Get message error: {e}", exc_info=True)
 
@@ -19,23 +19,92 @@
 
 import logging
 from copy import deepcopy
+from threading import RLock
+from typing import Any
 
 from .. import glovar
-from .file import save
+from .file import journal, save
+from .storage import ScoreTable
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
+def clear_data(file: str, key: str = None) -> bool:
+    # Clear a global variable, or one of its lists, in place
+    try:
+        data = eval(f"glovar.{file}")
+
+        if key:
+            data[key].clear()
+            journal(file, "clear", (key,))
+        else:
+            data.clear()
+            journal(file, "clear")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Clear data {file} {key} error: {e}", exc_info=True)
+
+    return False
+
+
+def get_user_lock(uid: int) -> RLock:
+    # Get the lock of a user's scores
+    return glovar.user_locks[uid % len(glovar.user_locks)]
+
+
 def init_user_id(uid: int) -> bool:
     # Init user data
     try:
-        if glovar.user_ids.get(uid) is None:
-            glovar.user_ids[uid] = deepcopy(glovar.default_user_status)
-            save("user_ids")
+        with get_user_lock(uid):
+            if glovar.user_ids.get(uid) is None:
+                glovar.user_ids[uid] = deepcopy(glovar.default_user_status)
+                journal("user_ids", "set", (uid,), glovar.user_ids[uid])
 
         return True
     except Exception as e:
         logger.warning(f"Init user id {uid} error: {e}", exc_info=True)
 
     return False
+
+
+def replace_data(file: str, the_data: Any) -> bool:
+    # Replace a global variable's content in place, the storage objects are kept
+    try:
+        data = eval(f"glovar.{file}")
+
+        # Check the shape of the data before the global variable is replaced
+        if file in {"bad_ids", "except_ids", "watch_ids"}:
+            shaped = (isinstance(the_data, dict)
+                      and all(key in data and isinstance(value, (dict, set)) for key, value in the_data.items()))
+        elif file == "white_ids":
+            shaped = isinstance(the_data, set)
+        else:
+            shaped = isinstance(the_data, (dict, ScoreTable))
+
+        if not shaped:
+            logger.warning(f"Replace data {file} error: invalid data {type(the_data).__name__}")
+            return False
+
+        if file not in glovar.journal_list + glovar.database_list:
+            exec(f"glovar.{file} = the_data")
+            return save(file)
+
+        if file in {"bad_ids", "except_ids", "watch_ids"}:
+            for key in data:
+                data[key].clear()
+                data[key].update(the_data.get(key) or ())
+                journal(file, "clear", (key,))
+                journal(file, "update", (key,), the_data.get(key) or ())
+        else:
+            data.clear()
+            data.update(the_data)
+            journal(file, "clear")
+            journal(file, "update", (), the_data)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Replace data {file} error: {e}", exc_info=True)
+
+    return False
@@ -0,0 +1,124 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module is imported by glovar, so it must not import glovar or pyrogram
+
+import logging
+from threading import Lock
+from time import sleep, time
+from typing import Dict, Hashable, List, Union
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+
+class Limiter:
+    # Token buckets of all the calls and of each chat's calls, FloodWait pauses a chat or all the calls
+
+    def __init__(self, rate: float, rate_chat: float, burst: int):
+        self.lock = Lock()
+        self.rate = rate
+        self.rate_chat = rate_chat
+        self.burst = burst
+        self.buckets: Dict[Hashable, List[float]] = {}
+        self.paused: Dict[Hashable, float] = {}
+        self.status: Dict[str, Union[float, int]] = {
+            "calls": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "floods": 0
+        }
+
+    def get_status(self) -> Dict[str, Union[float, int, Dict[Hashable, float]]]:
+        # Get a copy of the status, with the seconds left of each pause
+        with self.lock:
+            now = time()
+            result: Dict[str, Union[float, int, Dict[Hashable, float]]] = dict(self.status)
+            result["paused"] = {key: round(until - now, 1) for key, until in self.paused.items() if until > now}
+
+        return result
+
+    def pause(self, cid: Hashable = None, secs: float = 0.0) -> None:
+        # Pause a chat's calls, or all the calls if the chat is None
+        with self.lock:
+            now = time()
+
+            for key in [key for key, until in self.paused.items() if until <= now]:
+                self.paused.pop(key)
+
+            self.paused[cid] = max(self.paused.get(cid, 0.0), now + secs)
+            self.status["floods"] += 1
+
+    def refill(self, key: Hashable, rate: float, capacity: float, now: float) -> List[float]:
+        # Refill a bucket, call it with the lock held
+        bucket = self.buckets.get(key)
+
+        if bucket is None:
+            bucket = self.buckets[key] = [capacity, now]
+
+            # Drop the full buckets of the idle chats
+            if len(self.buckets) > 10000:
+                for k in [k for k, b in self.buckets.items() if now - b[1] > capacity / rate and k is not None]:
+                    self.buckets.pop(k, None)
+
+                self.buckets[key] = bucket
+
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+
+        return bucket
+
+    def take(self, cid: Hashable = None) -> float:
+        # Take a token of all the calls and of the chat's calls, or get the seconds until they can be taken
+        with self.lock:
+            now = time()
+            secs = max(self.paused.get(None, 0.0), cid is not None and self.paused.get(cid, 0.0)) - now
+
+            if secs > 0:
+                return secs
+
+            buckets = [self.refill(None, self.rate, max(self.rate, 1), now)]
+            cid is not None and buckets.append(self.refill(cid, self.rate_chat, self.burst, now))
+            secs = max((1 - bucket[0]) / rate for bucket, rate in zip(buckets, [self.rate, self.rate_chat]))
+
+            if secs > 0:
+                return secs
+
+            for bucket in buckets:
+                bucket[0] -= 1
+
+            self.status["calls"] += 1
+
+        return 0.0
+
+    def wait(self, cid: Hashable = None) -> float:
+        # Wait until a call to the chat can be made, return the seconds waited
+        waited = 0.0
+        secs = self.take(cid)
+
+        while secs > 0:
+            sleep(secs)
+            waited += secs
+            secs = self.take(cid)
+
+        if waited:
+            with self.lock:
+                self.status["waits"] += 1
+                self.status["wait_time"] += waited
+
+        return waited
@@ -54,8 +54,9 @@ def action_delete(client: Client, key: str, reason: str = None) -> bool:
             delete_message(client, cid, mid)
             delete_message(client, cid, rid)
         elif r_message and not r_message.empty:
-            # Delete the evidence
+            # Delete the evidence, the cached message replies to it
             delete_message(client, cid, rid)
+            glovar.message_cache.discard((cid, mid))
             edit_evidence(
                 client=client,
                 message=message,
@@ -223,6 +224,7 @@ def action_rollback(client: Client, key: str) -> bool:
         message = glovar.actions[key]["message"]
         receiver = glovar.actions[key]["sender"]
         the_type = glovar.actions[key]["type"]
+        chain = glovar.actions[key].get("chain")
 
         # Check MANAGE itself
         if receiver == "MANAGE":
@@ -231,7 +233,8 @@ def action_rollback(client: Client, key: str) -> bool:
                 message=message,
                 data={
                     "admin_id": aid,
-                    "type": the_type
+                    "type": the_type,
+                    "chain": chain
                 }
             )
             return True
@@ -286,12 +289,12 @@ def answer_action(client: Client, action_type: str, uid: int, mid: int, key: str
 
         # Edit the original report message
         action = glovar.actions[key]["action"]
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang(f'action_{action}'))}\n"
-                f"{lang('status')}{lang('colon')}{code(lang(f'status_{action_type}'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(uid)}\n"
+                f"{glovar.labels['action']}{code(lang(f'action_{action}'))}\n"
+                f"{glovar.labels['status']}{code(lang(f'status_{action_type}'))}\n")
 
         if reason:
-            text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+            text += f"{glovar.labels['reason']}{code(reason)}\n"
 
         thread(edit_message_text, (client, glovar.manage_group_id, mid, text))
 
@@ -345,10 +348,10 @@ def answer_check(client: Client, action_type: str, uid: int, mid: int, key: str)
         if not text:
             return True
 
-        prefix_text = f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
+        prefix_text = f"{glovar.labels['admin']}{mention_id(uid)}\n"
 
         if m:
-            prefix_text += f"{lang('triggered_by')}{lang('colon')}{m}\n"
+            prefix_text += f"{glovar.labels['triggered_by']}{m}\n"
         
         text = prefix_text + text
         thread(edit_message_text, (client, glovar.manage_group_id, mid, text))
@@ -383,11 +386,11 @@ def answer_leave(client: Client, action_type: str, uid: int, mid: int, key: str,
         reason = reason or glovar.records[key]["reason"]
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang(f'action_{action_type}'))}\n"
-                f"{lang('project')}{lang('colon')}{code(project)}\n"
-                f"{lang('group_name')}{lang('colon')}{general_link(name, link)}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(uid)}\n"
+                f"{glovar.labels['action']}{code(lang(f'action_{action_type}'))}\n"
+                f"{glovar.labels['project']}{code(project)}\n"
+                f"{glovar.labels['group_name']}{general_link(name, link)}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n")
 
         # Proceed
         if action_type == "approve":
@@ -407,13 +410,13 @@ def answer_leave(client: Client, action_type: str, uid: int, mid: int, key: str,
             if reason in {"permissions", "user"}:
                 reason = lang(f"reason_{reason}")
 
-            text += (f"{lang('status')}{lang('colon')}{code(lang('leave_approve'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang(reason))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('leave_approve'))}\n"
+                     f"{glovar.labels['reason']}{code(lang(reason))}\n")
         else:
-            text += f"{lang('status')}{lang('colon')}{code(lang('leave_reject'))}\n"
+            text += f"{glovar.labels['status']}{code(lang('leave_reject'))}\n"
 
             if reason not in {"permissions", "user"}:
-                text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+                text += f"{glovar.labels['reason']}{code(reason)}\n"
 
         # Edit the original report message
         thread(edit_message_text, (client, glovar.manage_group_id, mid, text))
@@ -445,26 +448,26 @@ def list_page_ids(aid: int, action_type: str, page: int) -> (str, InlineKeyboard
     markup = None
     try:
         # Prefix
-        text = f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
+        text = f"{glovar.labels['admin']}{mention_id(aid)}\n"
 
         # Generate
         if action_type in {"bad", "except"}:
             # Action text
-            text += f"{lang('action')}{lang('colon')}{code(lang(f'list_{action_type}'))}\n"
+            text += f"{glovar.labels['action']}{code(lang(f'list_{action_type}'))}\n"
 
             # Generate the page
             the_list = eval(f"glovar.{action_type}_ids")["channels"]
 
             if the_list:
                 page_list, markup = get_list_page(the_list, "list", action_type, page)
-                text += (f"{lang('result')}{lang('colon')}" + "-" * 24 + "\n\n" +
+                text += (f"{glovar.labels['result']}" + "-" * 24 + "\n\n" +
                          f"\n".join("\t" * 4 + code(the_id) for the_id in page_list))
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('reason_none'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('reason_none'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
     except Exception as e:
         logger.warning(f"List page ids error: {e}", exc_info=True)
 
@@ -0,0 +1,199 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module is imported by glovar, so it must not import glovar or pyrogram
+
+import logging
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# The upper bounds of the histogram buckets, in seconds
+buckets: List[float] = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0]
+
+# A metric is keyed by its name, and its label's name and value
+Key = Tuple[str, str, str]
+
+
+class Recorder:
+    # Counters and histograms of the calls, and the gauges of the status getters
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.lock = Lock()
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, List[float]] = {}
+        self.collectors: List[Tuple[str, Callable[[], dict], Optional[str]]] = []
+        self.server: Optional[HTTPServer] = None
+
+    def add_collector(self, name: str, getter: Callable[[], dict], label: str = None) -> None:
+        # Add a status getter, the keys of its result are the label's values if the label is given
+        self.collectors.append((name, getter, label))
+
+    def count(self, name: str, label: str = "", value: Any = "", number: float = 1) -> None:
+        # Add a number to a counter
+        if not self.enabled:
+            return
+
+        key = (name, label, str(value))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + number
+
+    def get_gauges(self) -> Dict[Key, float]:
+        # Get the numbers of the status getters
+        result: Dict[Key, float] = {}
+
+        for name, getter, label in self.collectors:
+            try:
+                status = getter()
+
+                for key, value in (status.items() if label else [(None, status)]):
+                    for k, v in value.items():
+                        if isinstance(v, dict):
+                            for kk, vv in v.items():
+                                result[(f"{name}_{k}", "key", str(kk))] = float(vv)
+                        else:
+                            result[(f"{name}_{k}", label or "", "" if key is None else str(key))] = float(v)
+            except Exception as e:
+                logger.warning(f"Get gauges of {name} error: {e}", exc_info=True)
+
+        return result
+
+    def get_status(self) -> Dict[str, Dict[Key, Union[float, Dict[str, float]]]]:
+        # Get a copy of the counters, and the count, sum and max of each histogram
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: {"count": h[-3], "sum": h[-2], "max": h[-1]} for key, h in self.histograms.items()}
+
+        return {
+            "counters": counters,
+            "histograms": histograms
+        }
+
+    def get_text(self) -> str:
+        # Get all the metrics in the Prometheus text format
+        lines = []
+        typed = set()
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(h)) for key, h in self.histograms.items())
+
+        for (name, label, value), number in sorted(self.get_gauges().items()):
+            add_type(lines, typed, f"manage_{name}", "gauge")
+            lines.append(f"manage_{name}{get_labels(label, value)} {number}")
+
+        for (name, label, value), number in counters:
+            add_type(lines, typed, f"manage_{name}_total", "counter")
+            lines.append(f"manage_{name}_total{get_labels(label, value)} {number}")
+
+        for (name, label, value), h in histograms:
+            add_type(lines, typed, f"manage_{name}_seconds", "histogram")
+            cumulative = 0
+
+            for bound, number in zip(buckets + ["+Inf"], h):
+                cumulative += number
+                lines.append(f"manage_{name}_seconds_bucket{get_labels(label, value, bound)} {cumulative}")
+
+            lines.append(f"manage_{name}_seconds_sum{get_labels(label, value)} {h[-2]}")
+            lines.append(f"manage_{name}_seconds_count{get_labels(label, value)} {h[-3]}")
+
+        return "\n".join(lines) + "\n"
+
+    def observe(self, name: str, label: str, value: Any, secs: float) -> None:
+        # Add the seconds of a call to a histogram
+        if not self.enabled:
+            return
+
+        key = (name, label, str(value))
+
+        with self.lock:
+            h = self.histograms.get(key)
+
+            # The count of each bucket and of +Inf, then the count, sum and max of all
+            if h is None:
+                h = self.histograms[key] = [0] * (len(buckets) + 1) + [0, 0.0, 0.0]
+
+            h[bisect_left(buckets, secs)] += 1
+            h[-3] += 1
+            h[-2] += secs
+            h[-1] = max(h[-1], secs)
+
+    def serve(self, port: int) -> bool:
+        # Serve the metrics on the local port
+        try:
+            recorder = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+
+                    body = recorder.get_text().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format: str, *args: Any) -> None:
+                    logger.debug(f"Metrics {self.address_string()} {format % args}")
+
+            self.server = Server(("127.0.0.1", port), Handler)
+            Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+
+            return True
+        except Exception as e:
+            logger.warning(f"Serve metrics error: {e}", exc_info=True)
+
+        return False
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    # Each request is handled in its own thread
+    daemon_threads = True
+
+
+def add_type(lines: List[str], typed: Set[str], name: str, the_type: str) -> None:
+    # Add the type line before the first sample of a metric, the samples of a metric are in a row
+    if name in typed:
+        return
+
+    typed.add(name)
+    lines.append(f"# TYPE {name} {the_type}")
+
+
+def get_labels(label: str, value: str, bound: Union[float, str] = None) -> str:
+    # Get the labels of a sample
+    labels = []
+
+    if label:
+        value = value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        labels.append(f"{label}=\"{value}\"")
+
+    if bound is not None:
+        labels.append(f"le=\"{bound}\"")
+
+    return labels and "{" + ",".join(labels) + "}" or ""
@@ -0,0 +1,210 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module is imported by glovar, so it must not import glovar or pyrogram
+
+import logging
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from threading import Condition, Lock, Thread, local
+from time import time
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Union
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+
+class Defer(BaseException):
+    # Raised by a task to be run again after some seconds, the later tasks of its key wait for it
+    # It is not an Exception, so the except clauses of the task let it through
+
+    def __init__(self, secs: float):
+        super().__init__(secs)
+        self.secs = secs
+
+
+class Pool:
+    # A bounded pool of worker threads, the tasks with the same key are run in order
+
+    def __init__(self, workers: int, limit: int):
+        self.workers = workers
+        self.limit = limit
+        self.lock = Lock()
+        self.work = Condition(self.lock)
+        self.space = Condition(self.lock)
+        self.alarm = Condition(self.lock)
+        self.local = local()
+        self.counter = count()
+        self.queues: Dict[Hashable, Deque[tuple]] = {}
+        self.ready: Deque[Hashable] = deque()
+        self.timers: List[tuple] = []
+        self.threads: List[Thread] = []
+        self.status: Dict[str, Union[float, int]] = {
+            "busy": 0,
+            "queued": 0,
+            "queued_max": 0,
+            "scheduled": 0,
+            "deferred": 0,
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "blocked": 0,
+            "overflow": 0
+        }
+
+    def get_key(self) -> Optional[Hashable]:
+        # Get the key of the task run by this thread
+        return getattr(self.local, "key", None)
+
+    def get_status(self) -> Dict[str, Union[float, int]]:
+        # Get a copy of the status
+        with self.lock:
+            result = dict(self.status)
+            result["keys"] = len(self.queues)
+            result["workers"] = len(self.threads) and self.workers
+
+        return result
+
+    def run(self, target: Callable, args: tuple, kwargs: dict) -> float:
+        # Run a task, return the seconds to wait before it is run again if it is deferred
+        try:
+            target(*args, **kwargs)
+        except Defer as e:
+            return max(e.secs, 0.001)
+        except Exception as e:
+            logger.warning(f"Pool run {getattr(target, '__name__', target)} error: {e}", exc_info=True)
+
+            with self.lock:
+                self.status["failed"] += 1
+
+        return 0.0
+
+    def schedule(self, secs: float, target: Callable, args: tuple = (), kwargs: dict = None,
+                 key: Hashable = None) -> bool:
+        # Submit a task after some seconds
+        with self.lock:
+            self.start()
+            heappush(self.timers, (time() + secs, next(self.counter), (target, args, kwargs), key))
+            self.status["scheduled"] = len(self.timers)
+            self.alarm.notify()
+
+        return True
+
+    def start(self) -> None:
+        # Start the threads on first use, call it with the lock held
+        if self.threads:
+            return
+
+        for i in range(self.workers):
+            self.threads.append(Thread(target=self.work_thread, name=f"pool-{i}", daemon=True))
+
+        self.threads.append(Thread(target=self.timer_thread, name="pool-timer", daemon=True))
+
+        for t in self.threads:
+            t.start()
+
+    def submit(self, target: Callable, args: tuple = (), kwargs: dict = None, key: Hashable = None) -> bool:
+        # Submit a task, wait while the queue is full
+        with self.lock:
+            self.start()
+
+            # A worker or the timer must not wait for the workers, the limit is soft for their tasks
+            if getattr(self.local, "worker", False):
+                self.status["overflow"] += self.status["queued"] >= self.limit
+            else:
+                while self.status["queued"] >= self.limit:
+                    self.status["blocked"] += 1
+                    self.space.wait()
+
+            key = object() if key is None else key
+            queue = self.queues.get(key)
+
+            if queue is None:
+                queue = self.queues[key] = deque()
+                self.ready.append(key)
+                self.work.notify()
+
+            queue.append((target, args, kwargs or {}))
+            self.status["queued"] += 1
+            self.status["queued_max"] = max(self.status["queued_max"], self.status["queued"])
+            self.status["submitted"] += 1
+
+        return True
+
+    def timer_thread(self) -> None:
+        # Submit the scheduled tasks when they are due
+        # Only this thread makes the deferred keys ready again, so it must not wait for space, the limit is soft
+        self.local.worker = True
+
+        while True:
+            with self.lock:
+                while not self.timers or self.timers[0][0] > time():
+                    self.alarm.wait(self.timers[0][0] - time() if self.timers else None)
+
+                _, _, task, key = heappop(self.timers)
+                self.status["scheduled"] = len(self.timers)
+
+                # The deferred key is ready again
+                if task is None:
+                    self.ready.append(key)
+                    self.work.notify()
+                    continue
+
+            self.submit(*task, key)
+
+    def work_thread(self) -> None:
+        # Run the tasks of the ready keys
+        self.local.worker = True
+
+        while True:
+            with self.lock:
+                while not self.ready:
+                    self.work.wait()
+
+                key = self.ready.popleft()
+                target, args, kwargs = self.queues[key].popleft()
+                self.status["queued"] -= 1
+                self.status["busy"] += 1
+                self.space.notify()
+
+            self.local.key = key
+            secs = self.run(target, args, kwargs)
+            self.local.key = None
+
+            with self.lock:
+                self.status["busy"] -= 1
+
+                # The task is put back at the head of the key's queue, the key is ready again after the seconds
+                if secs:
+                    self.queues[key].appendleft((target, args, kwargs))
+                    self.status["queued"] += 1
+                    self.status["deferred"] += 1
+                    heappush(self.timers, (time() + secs, next(self.counter), None, key))
+                    self.status["scheduled"] = len(self.timers)
+                    self.alarm.notify()
+                    continue
+
+                self.status["completed"] += 1
+
+                # The key's next task is run after this one
+                if self.queues[key]:
+                    self.ready.append(key)
+                    self.work.notify()
+                else:
+                    self.queues.pop(key)
@@ -17,24 +17,32 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-import pickle
 from json import loads
-from typing import Any
+from os.path import getsize
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
+from time import time
+from zlib import crc32
+from typing import Any, Callable, Dict, List, Tuple
 
 from pyrogram import Client, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from .. import glovar
 from .channel import share_data
+from .decorators import timed
 from .etc import button_data, code, crypt_str, general_link, get_int, get_now, get_text, lang, mention_id
 from .etc import random_str, thread
-from .file import crypt_file, delete_file, get_downloaded_path, get_new_path, save
-from .ids import init_user_id
+from .file import capture_file, crypt_stream, delete_file, get_downloaded_path, journal, save, unpack_data
+from .group import get_message
+from .ids import clear_data, get_user_lock, init_user_id, replace_data
 from .telegram import send_message
+from .timers import expire_record
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
+@timed("receive")
 def receive_add_bad(data: dict) -> bool:
     # Receive bad users or channels that other bots shared
     try:
@@ -45,8 +53,7 @@ def receive_add_bad(data: dict) -> bool:
         # Receive bad user
         if the_type == "user":
             glovar.bad_ids["users"].add(the_id)
-
-        save("bad_ids")
+            journal("bad_ids", "add", ("users",), the_id)
 
         return True
     except Exception as e:
@@ -55,6 +62,7 @@ def receive_add_bad(data: dict) -> bool:
     return False
 
 
+@timed("receive")
 def receive_clear_data(client: Client, data_type: str, data: dict) -> bool:
     # Receive clear data command
     glovar.locks["message"].acquire()
@@ -65,46 +73,32 @@ def receive_clear_data(client: Client, data_type: str, data: dict) -> bool:
 
         # Clear bad data
         if data_type == "bad":
-            if the_type == "channels":
-                glovar.bad_ids["channels"] = set()
-            elif the_type == "users":
-                glovar.bad_ids["users"] = set()
-
-            save("bad_ids")
+            if the_type in {"channels", "users"}:
+                clear_data("bad_ids", the_type)
 
         # Clear except data
         if data_type == "except":
             if the_type == "channels":
-                glovar.except_ids["channels"] = set()
-
-            save("except_ids")
+                clear_data("except_ids", "channels")
 
         # Clear user data
         if data_type == "user":
             if the_type == "all":
-                glovar.user_ids = {}
-
-            save("user_ids")
+                clear_data("user_ids")
 
         # Clear watch data
         if data_type == "watch":
             if the_type == "all":
-                glovar.watch_ids = {
-                    "ban": {},
-                    "delete": {}
-                }
-            elif the_type == "ban":
-                glovar.watch_ids["ban"] = {}
-            elif the_type == "delete":
-                glovar.watch_ids["delete"] = {}
-
-            save("watch_ids")
+                clear_data("watch_ids", "ban")
+                clear_data("watch_ids", "delete")
+            elif the_type in {"ban", "delete"}:
+                clear_data("watch_ids", the_type)
 
         # Send debug message
-        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('clear'))}\n"
-                f"{lang('more')}{lang('colon')}{code(f'{data_type} {the_type}')}\n")
+        text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('clear'))}\n"
+                f"{glovar.labels['more']}{code(f'{data_type} {the_type}')}\n")
         thread(send_message, (client, glovar.debug_channel_id, text))
     except Exception as e:
         logger.warning(f"Receive clear data: {e}", exc_info=True)
@@ -114,6 +108,7 @@ def receive_clear_data(client: Client, data_type: str, data: dict) -> bool:
     return False
 
 
+@timed("receive")
 def receive_config_show(client: Client, message: Message, data: dict) -> bool:
     # Receive config show reply
     try:
@@ -132,41 +127,100 @@ def receive_config_show(client: Client, message: Message, data: dict) -> bool:
     return False
 
 
+@timed("receive")
+def receive_data(client: Client, message: Message, sender: str, action: str, action_type: str, data: Any) -> bool:
+    # Receive one exchange data with the handler declared in receive_handlers
+    try:
+        handler = receive_handlers.get((sender, action, action_type))
+
+        # The sender has no permission, or the data is not for MANAGE
+        if not handler:
+            return False
+
+        function, arguments, lock = handler
+        values = {
+            "client": client,
+            "message": message,
+            "sender": sender,
+            "data": data
+        }
+
+        if not lock:
+            return function(*(values[argument] for argument in arguments))
+
+        with glovar.locks["receive"]:
+            return function(*(values[argument] for argument in arguments))
+    except Exception as e:
+        logger.warning(f"Receive data error: {e}", exc_info=True)
+
+    return False
+
+
+@timed("receive")
+def receive_delta_data(client: Client, message: Message, chain: dict) -> Any:
+    # Rebuild the data from the base backup and the delta backups in order
+    data = None
+    try:
+        messages = [get_message(client, cid, mid) for cid, mid in [chain["base"]] + chain["deltas"]]
+        messages.append(message)
+
+        if not all(messages):
+            return None
+
+        data = receive_file_data(client, messages[0])
+
+        for m in messages[1:]:
+            records = receive_file_data(client, m)
+
+            if data is None or records is None:
+                return None
+
+            for record in records:
+                data = glovar.replay(data, *record)
+    except Exception as e:
+        logger.warning(f"Receive delta data error: {e}", exc_info=True)
+
+    return data
+
+
+@timed("receive")
 def receive_file_data(client: Client, message: Message, decrypt: bool = True) -> Any:
     # Receive file's data from exchange channel
     data = None
+    path = ""
     try:
         if not message.document:
             return None
 
         file_id = message.document.file_id
         file_ref = message.document.file_ref
-        path = get_downloaded_path(client, file_id, file_ref)
+        path = get_downloaded_path(client, file_id, file_ref, message.chat.id)
 
         if not path:
             return None
 
-        if decrypt:
-            # Decrypt the file, save to the tmp directory
-            path_decrypted = get_new_path()
-            crypt_file("decrypt", path, path_decrypted)
-            path_final = path_decrypted
-        else:
-            # Read the file directly
-            path_decrypted = ""
-            path_final = path
+        # The replay gets the document from the capture, it is not downloaded again
+        glovar.capture and capture_file(file_id, path)
 
-        with open(path_final, "rb") as f:
-            data = pickle.load(f)
+        # Decrypt the file in one pass into a buffer, it is kept in memory unless it is large
+        with open(path, "rb") as f, SpooledTemporaryFile(max_size=16 * 1024 * 1024, dir="tmp") as buffer:
+            # A failed or truncated decryption leaves a partial buffer, it is not unpacked
+            if decrypt and not crypt_stream("decrypt", f, buffer, getsize(path)):
+                return None
+            elif not decrypt:
+                copyfileobj(f, buffer)
 
-        for f in {path, path_decrypted}:
-            thread(delete_file, (f,))
+            buffer.seek(0)
+            data = unpack_data(buffer.read())
     except Exception as e:
         logger.warning(f"Receive file error: {e}", exc_info=True)
+    finally:
+        delete_file(path)
 
     return data
 
 
+@timed("receive")
 def receive_flood_reply(client: Client, data: dict) -> bool:
     # Receive flood reply
     result = False
@@ -184,21 +238,21 @@ def receive_flood_reply(client: Client, data: dict) -> bool:
 
         # Generate the report text
         if not invalid:
-            text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                    f"{lang('action')}{lang('colon')}{code(lang('手动清理炸群成员'))}\n"
-                    f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                    f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n")
+            text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                    f"{glovar.labels['action']}{code(lang('手动清理炸群成员'))}\n"
+                    f"{glovar.labels['group_id']}{code(gid)}\n"
+                    f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n")
         else:
-            text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                    f"{lang('action')}{lang('colon')}{code(lang('手动清理炸群成员'))}\n"
-                    f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                    f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                    f"{lang('reason')}{lang('colon')}{code(lang('无效的群组'))}\n")
+            text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                    f"{glovar.labels['action']}{code(lang('手动清理炸群成员'))}\n"
+                    f"{glovar.labels['group_id']}{code(gid)}\n"
+                    f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                    f"{glovar.labels['reason']}{code(lang('无效的群组'))}\n")
 
         if not force and alert:
-            text += (f"{lang('开始时间')}{lang('colon')}{code(begin)}\n"
-                     f"{lang('结束时间')}{lang('colon')}{code(end)}\n"
-                     f"{lang('警告')}{lang('colon')}{code(lang('此时间段内进行了数据重置操作，因此开始时间被自动修改'))}\n")
+            text += (f"{glovar.labels['开始时间']}{code(begin)}\n"
+                     f"{glovar.labels['结束时间']}{code(end)}\n"
+                     f"{glovar.labels['警告']}{code(lang('此时间段内进行了数据重置操作，因此开始时间被自动修改'))}\n")
 
         # Send the report message
         thread(send_message, (client, glovar.manage_group_id, text, mid))
@@ -210,6 +264,7 @@ def receive_flood_reply(client: Client, data: dict) -> bool:
     return result
 
 
+@timed("receive")
 def receive_invite_result(client: Client, data: dict) -> bool:
     # Receive invite result
     result = False
@@ -225,13 +280,13 @@ def receive_invite_result(client: Client, data: dict) -> bool:
         reason = data.get("reason")
 
         # Generate the report text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('邀请机器人'))}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('status')}{lang('colon')}{code(status_text)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('邀请机器人'))}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['status']}{code(status_text)}\n")
 
         if reason:
-            text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+            text += f"{glovar.labels['reason']}{code(reason)}\n"
 
         # Refresh admin lists
         status and "AIO" not in bots and share_data(
@@ -252,6 +307,7 @@ def receive_invite_result(client: Client, data: dict) -> bool:
     return result
 
 
+@timed("receive")
 def receive_leave_info(client: Client, project: str, data: dict) -> bool:
     # Info left group
     try:
@@ -261,10 +317,10 @@ def receive_leave_info(client: Client, project: str, data: dict) -> bool:
         link = data["group_link"]
 
         # Send the report message
-        text = (f"{lang('project')}{lang('colon')}{code(project)}\n"
-                f"{lang('group_name')}{lang('colon')}{general_link(name, link)}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('leave_auto'))}\n")
+        text = (f"{glovar.labels['project']}{code(project)}\n"
+                f"{glovar.labels['group_name']}{general_link(name, link)}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['status']}{code(lang('leave_auto'))}\n")
         thread(send_message, (client, glovar.manage_group_id, text))
 
         return True
@@ -274,6 +330,30 @@ def receive_leave_info(client: Client, project: str, data: dict) -> bool:
     return False
 
 
+@timed("receive")
+def receive_leave_report(client: Client, key: str, text: str, markup: InlineKeyboardMarkup) -> bool:
+    # Send the report message of a leave request, then save its message id in the record
+    try:
+        record = glovar.records.get(key)
+
+        if not record:
+            return True
+
+        result = send_message(client, glovar.manage_group_id, text, None, markup)
+
+        # Save data
+        record["mid"] = result and result.message_id
+        save("records")
+        expire_record(client, key)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Receive leave report error: {e}", exc_info=True)
+
+    return False
+
+
+@timed("receive")
 def receive_leave_request(client: Client, project: str, data: dict) -> bool:
     # Request leave group
     try:
@@ -305,11 +385,11 @@ def receive_leave_request(client: Client, project: str, data: dict) -> bool:
             reason = lang(f"reason_{reason}")
 
         # Generate the report message's text
-        text = (f"{lang('project')}{lang('colon')}{code(project)}\n"
-                f"{lang('group_name')}{lang('colon')}{general_link(name, link)}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('leave_request'))}\n"
-                f"{lang('reason')}{lang('colon')}{code(reason)}\n")
+        text = (f"{glovar.labels['project']}{code(project)}\n"
+                f"{glovar.labels['group_name']}{general_link(name, link)}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['status']}{code(lang('leave_request'))}\n"
+                f"{glovar.labels['reason']}{code(reason)}\n")
 
         # Generate the report message's markup
         data_approve = button_data("leave", "approve", key)
@@ -329,12 +409,8 @@ def receive_leave_request(client: Client, project: str, data: dict) -> bool:
             ]
         )
 
-        # Send the report message
-        result = send_message(client, glovar.manage_group_id, text, None, markup)
-
-        # Save data
-        glovar.records[key]["mid"] = result and result.message_id
-        save("records")
+        # Send the report message in the queue of the manage group
+        thread(receive_leave_report, (client, key, text, markup), None, glovar.manage_group_id)
 
         return True
     except Exception as e:
@@ -343,6 +419,7 @@ def receive_leave_request(client: Client, project: str, data: dict) -> bool:
     return False
 
 
+@timed("receive")
 def receive_join_info(client: Client, data: dict) -> bool:
     # Info joined group
     result = False
@@ -357,10 +434,10 @@ def receive_join_info(client: Client, data: dict) -> bool:
         glovar.joined_ids.add(gid)
 
         # Generate the text
-        text = (f"{lang('project')}{lang('colon')}{code('USER')}\n"
-                f"{lang('group_name')}{lang('colon')}{general_link(name, link)}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('已加入该群组'))}\n")
+        text = (f"{glovar.labels['project']}{code('USER')}\n"
+                f"{glovar.labels['group_name']}{general_link(name, link)}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['status']}{code(lang('已加入该群组'))}\n")
 
         # Generate the markup
         # data_approve = button_data("joined", "leave", gid)
@@ -391,6 +468,7 @@ def receive_join_info(client: Client, data: dict) -> bool:
     return result
 
 
+@timed("receive")
 def receive_remove_white(data: int) -> bool:
     # Receive removed withe users
     try:
@@ -402,7 +480,7 @@ def receive_remove_white(data: int) -> bool:
 
         # White ids
         glovar.white_ids.discard(uid)
-        save("white_ids")
+        journal("white_ids", "discard", (), uid)
 
         return True
     except Exception as e:
@@ -411,25 +489,30 @@ def receive_remove_white(data: int) -> bool:
     return False
 
 
+@timed("receive")
 def receive_rollback(client: Client, message: Message, data: dict) -> bool:
     # Receive rollback data
     try:
         # Basic data
         aid = data["admin_id"]
         the_type = data["type"]
-        the_data = receive_file_data(client, message)
+        chain = data.get("chain")
+
+        if chain:
+            the_data = receive_delta_data(client, message, chain)
+        else:
+            the_data = receive_file_data(client, message)
 
         if not the_data:
             return True
 
-        exec(f"glovar.{the_type} = the_data")
-        save(the_type)
+        replace_data(the_type, the_data)
 
         # Send debug message
-        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('rollback'))}\n"
-                f"{lang('more')}{lang('colon')}{code(the_type)}\n")
+        text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('rollback'))}\n"
+                f"{glovar.labels['more']}{code(the_type)}\n")
         thread(send_message, (client, glovar.debug_channel_id, text))
     except Exception as e:
         logger.warning(f"Receive rollback error: {e}", exc_info=True)
@@ -437,6 +520,59 @@ def receive_rollback(client: Client, message: Message, data: dict) -> bool:
     return False
 
 
+@timed("receive")
+def receive_shard(client: Client, message: Message, sender: str, item: dict, shard: int, queued: float) -> bool:
+    # Receive one exchange data in its shard, the data of the same subject are received in order
+    try:
+        lag = time() - queued
+
+        with glovar.locks["shard"]:
+            status = glovar.shard_status[shard]
+            status["queued"] -= 1
+            status["lag"] = lag
+            status["lag_max"] = max(status["lag_max"], lag)
+
+        receive_data(client, message, sender, item["action"], item["type"], item["data"])
+
+        with glovar.locks["shard"]:
+            glovar.shard_status[shard]["processed"] += 1
+
+        return True
+    except Exception as e:
+        logger.warning(f"Receive shard error: {e}", exc_info=True)
+
+    return False
+
+
+@timed("receive")
+def receive_sharded(client: Client, message: Message, sender: str, item: dict) -> bool:
+    # Put an exchange data in the shard of its subject
+    try:
+        data = item["data"]
+        subject = None
+
+        if isinstance(data, dict):
+            subject = next((data[key] for key in ("id", "user_id", "group_id", "key") if data.get(key)), None)
+        elif isinstance(data, int):
+            subject = data
+
+        if subject is None:
+            subject = f"{sender} {item['action']} {item['type']}"
+
+        shard = crc32(str(subject).encode()) % glovar.receive_shards
+
+        with glovar.locks["shard"]:
+            status = glovar.shard_status.setdefault(shard, {"queued": 0, "processed": 0, "lag": 0.0, "lag_max": 0.0})
+            status["queued"] += 1
+
+        return thread(receive_shard, (client, message, sender, item, shard, time()), None, ("receive", shard))
+    except Exception as e:
+        logger.warning(f"Receive sharded error: {e}", exc_info=True)
+
+    return False
+
+
+@timed("receive")
 def receive_status_reply(client: Client, message: Message, sender: str, data: dict) -> bool:
     # Receive status reply
     try:
@@ -448,12 +584,12 @@ def receive_status_reply(client: Client, message: Message, sender: str, data: di
         if not status:
             return True
 
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('action_status'))}\n"
-                f"{lang('project')}{lang('colon')}{code(sender)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_status'))}\n"
+                f"{glovar.labels['project']}{code(sender)}\n")
 
         for name in status:
-            text += f"{name}{lang('colon')}{code(status[name])}\n"
+            text += f"{name}{glovar.lang['colon']}{code(status[name])}\n"
 
         thread(send_message, (client, glovar.manage_group_id, text, mid))
     except Exception as e:
@@ -462,6 +598,7 @@ def receive_status_reply(client: Client, message: Message, sender: str, data: di
     return False
 
 
+@timed("receive")
 def receive_text_data(message: Message) -> dict:
     # Receive text's data from exchange channel
     data = {}
@@ -478,30 +615,30 @@ def receive_text_data(message: Message) -> dict:
     return data
 
 
+@timed("receive")
 def receive_user_score(project: str, data: dict) -> bool:
-    # Receive and update user's score
-    glovar.locks["message"].acquire()
+    # Receive and update user's score, the score is journaled in the same order as it is changed
     try:
         # Basic data
         project = project.lower()
         uid = data["id"]
+        score = data["score"]
 
-        if not init_user_id(uid):
-            return True
+        with get_user_lock(uid):
+            if not init_user_id(uid):
+                return True
 
-        score = data["score"]
-        glovar.user_ids[uid][project] = score
-        save("user_ids")
+            glovar.user_ids[uid][project] = score
+            journal("user_ids", "set", (uid, project), score)
 
         return True
     except Exception as e:
         logger.warning(f"Receive user score error: {e}", exc_info=True)
-    finally:
-        glovar.locks["message"].release()
 
     return False
 
 
+@timed("receive")
 def receive_watch_user(data: dict) -> bool:
     # Receive watch users that other bots shared
     try:
@@ -515,14 +652,12 @@ def receive_watch_user(data: dict) -> bool:
         until = get_int(until)
 
         # Add to list
-        if the_type == "ban":
-            glovar.watch_ids["ban"][uid] = until
-        elif the_type == "delete":
-            glovar.watch_ids["delete"][uid] = until
+        if the_type in {"ban", "delete"}:
+            glovar.watch_ids[the_type][uid] = until
         else:
             return False
 
-        save("watch_ids")
+        journal("watch_ids", "set", (the_type, uid), until)
 
         return True
     except Exception as e:
@@ -531,6 +666,7 @@ def receive_watch_user(data: dict) -> bool:
     return False
 
 
+@timed("receive")
 def receive_white_users(client: Client, message: Message) -> bool:
     # Receive white users
     try:
@@ -539,9 +675,47 @@ def receive_white_users(client: Client, message: Message) -> bool:
         if not the_data:
             return True
 
-        glovar.white_ids = the_data
-        save("white_ids")
+        # The file is received without the lock
+        with glovar.locks["receive"]:
+            replace_data("white_ids", the_data)
     except Exception as e:
         logger.warning(f"Receive white users error: {e}", exc_info=True)
 
     return False
+
+
+# The exchange data that MANAGE receives, the permissions are declared here,
+# the handlers that receive files, or only change one subject's data, do not need the receive lock
+receive_table: Dict[Tuple[str, str], Tuple[Callable, Tuple[str, ...], bool, List[str]]] = {
+    ("add", "bad"): (receive_add_bad, ("data",), False,
+                     ["CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "USER"]),
+    ("add", "watch"): (receive_watch_user, ("data",), False,
+                       ["CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "WATCH"]),
+    ("add", "white"): (receive_white_users, ("client", "message"), False,
+                       ["AVATAR"]),
+    ("config", "show"): (receive_config_show, ("client", "message", "data"), False,
+                         ["CAPTCHA", "CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "TIP", "USER", "WARN"]),
+    ("flood", "reply"): (receive_flood_reply, ("client", "data"), True,
+                         ["CAPTCHA"]),
+    ("invite", "result"): (receive_invite_result, ("client", "data"), True,
+                           ["USER"]),
+    ("join", "info"): (receive_join_info, ("client", "data"), True,
+                       ["USER"]),
+    ("leave", "info"): (receive_leave_info, ("client", "sender", "data"), True,
+                        ["CAPTCHA", "CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "TIP", "USER", "WARN"]),
+    ("leave", "request"): (receive_leave_request, ("client", "sender", "data"), True,
+                           ["CAPTCHA", "CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "TIP", "USER", "WARN"]),
+    ("remove", "white"): (receive_remove_white, ("data",), False,
+                          ["AVATAR"]),
+    ("status", "reply"): (receive_status_reply, ("client", "message", "sender", "data"), False,
+                          ["AVATAR", "NOSPAM", "REGEX", "USER", "WATCH"]),
+    ("update", "score"): (receive_user_score, ("sender", "data"), False,
+                          ["CAPTCHA", "CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "WARN"])
+}
+
+# The handlers keyed by (sender, action, action_type)
+receive_handlers: Dict[Tuple[str, str, str], Tuple[Callable, Tuple[str, ...], bool]] = {
+    (sender, action, action_type): (function, arguments, lock)
+    for (action, action_type), (function, arguments, lock, senders) in receive_table.items()
+    for sender in senders
+}
@@ -0,0 +1,587 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module is imported by glovar, so it must not import glovar or pyrogram
+
+import logging
+import sqlite3
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping, MutableSet
+from heapq import heapify, heappop, heappush, merge
+from mmap import ACCESS_READ, mmap
+from os import fsync, replace
+from os.path import exists, getsize
+from threading import RLock
+from time import time
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+
+class Database:
+    # A SQLite database shared by all threads, changes are committed in batches by commit()
+
+    def __init__(self, path: str, projects: List[str]):
+        self.lock = RLock()
+        self.projects = list(projects)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta "
+                                    "(name TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS ids "
+                                    "(name TEXT, id INTEGER, PRIMARY KEY (name, id)) WITHOUT ROWID")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS users "
+                                    f"(uid INTEGER PRIMARY KEY, {', '.join(f'{p} REAL' for p in self.projects)})")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS watches "
+                                    "(name TEXT, uid INTEGER, until INTEGER, PRIMARY KEY (name, uid)) WITHOUT ROWID")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS watches_until ON watches (name, until)")
+
+            # Add the columns of new projects
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(users)")}
+
+            for project in self.projects:
+                if project not in columns:
+                    self.connection.execute(f"ALTER TABLE users ADD COLUMN {project} REAL DEFAULT 0.0")
+
+            self.connection.commit()
+
+    def commit(self) -> None:
+        # Commit the pending transaction
+        with self.lock:
+            self.connection.commit()
+
+    def execute(self, sql: str, parameters: Iterable = ()) -> List[tuple]:
+        # Execute a statement and fetch all the rows
+        with self.lock:
+            return self.connection.execute(sql, tuple(parameters)).fetchall()
+
+    def executemany(self, sql: str, parameters: Iterable[Iterable]) -> None:
+        # Execute a statement for each parameters
+        with self.lock:
+            self.connection.executemany(sql, parameters)
+
+    def get_meta(self, name: str) -> str:
+        # Get a meta value
+        rows = self.execute("SELECT value FROM meta WHERE name = ?", (name,))
+        return rows[0][0] if rows else ""
+
+    def set_meta(self, name: str, value: str) -> None:
+        # Set a meta value
+        self.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+
+class SQLiteSet(MutableSet):
+    # A set of ids stored in the ids table
+
+    def __init__(self, database: Database, name: str):
+        self.database = database
+        self.name = name
+
+    def __contains__(self, the_id: object) -> bool:
+        return bool(self.database.execute("SELECT 1 FROM ids WHERE name = ? AND id = ?", (self.name, the_id)))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self.database.execute("SELECT id FROM ids WHERE name = ? ORDER BY id",
+                                                             (self.name,))])
+
+    def __len__(self) -> int:
+        return self.database.execute("SELECT COUNT(*) FROM ids WHERE name = ?", (self.name,))[0][0]
+
+    def __reduce__(self) -> tuple:
+        # Pickle as a plain set, for backups
+        return set, (list(self),)
+
+    def add(self, the_id: int) -> None:
+        self.database.execute("INSERT OR IGNORE INTO ids (name, id) VALUES (?, ?)", (self.name, the_id))
+
+    def clear(self) -> None:
+        self.database.execute("DELETE FROM ids WHERE name = ?", (self.name,))
+
+    def discard(self, the_id: int) -> None:
+        self.database.execute("DELETE FROM ids WHERE name = ? AND id = ?", (self.name, the_id))
+
+    def update(self, ids: Iterable[int]) -> None:
+        self.database.executemany("INSERT OR IGNORE INTO ids (name, id) VALUES (?, ?)",
+                                  ((self.name, the_id) for the_id in ids))
+
+
+class SQLiteScores(MutableMapping):
+    # A user's scores, a row of the users table, changes are written through
+
+    def __init__(self, database: Database, uid: int):
+        self.database = database
+        self.uid = uid
+
+    def __delitem__(self, project: str) -> None:
+        raise TypeError("Project scores cannot be deleted")
+
+    def __getitem__(self, project: str) -> float:
+        if project not in self.database.projects:
+            raise KeyError(project)
+
+        rows = self.database.execute(f"SELECT {project} FROM users WHERE uid = ?", (self.uid,))
+        return rows[0][0] or 0.0 if rows else 0.0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.database.projects)
+
+    def __len__(self) -> int:
+        return len(self.database.projects)
+
+    def __reduce__(self) -> tuple:
+        return dict, (list(self.items()),)
+
+    def __setitem__(self, project: str, score: float) -> None:
+        if project not in self.database.projects:
+            raise KeyError(project)
+
+        self.database.execute(f"UPDATE users SET {project} = ? WHERE uid = ?", (score, self.uid))
+
+    def items(self) -> List[Tuple[str, float]]:
+        return list(zip(self.database.projects, self.values()))
+
+    def values(self) -> List[float]:
+        rows = self.database.execute(f"SELECT {', '.join(self.database.projects)} FROM users WHERE uid = ?",
+                                     (self.uid,))
+        return [score or 0.0 for score in rows[0]] if rows else [0.0] * len(self.database.projects)
+
+
+class SQLiteUsers(MutableMapping):
+    # User scores stored in the users table, keyed by uid
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    def __contains__(self, uid: object) -> bool:
+        return bool(self.database.execute("SELECT 1 FROM users WHERE uid = ?", (uid,)))
+
+    def __delitem__(self, uid: int) -> None:
+        if uid not in self:
+            raise KeyError(uid)
+
+        self.database.execute("DELETE FROM users WHERE uid = ?", (uid,))
+
+    def __getitem__(self, uid: int) -> SQLiteScores:
+        if uid not in self:
+            raise KeyError(uid)
+
+        return SQLiteScores(self.database, uid)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self.database.execute("SELECT uid FROM users ORDER BY uid")])
+
+    def __len__(self) -> int:
+        return self.database.execute("SELECT COUNT(*) FROM users")[0][0]
+
+    def __reduce__(self) -> tuple:
+        # Pickle as a plain dict, for backups
+        projects = self.database.projects
+        rows = self.database.execute(f"SELECT uid, {', '.join(projects)} FROM users ORDER BY uid")
+        return dict, ([(row[0], dict(zip(projects, row[1:]))) for row in rows],)
+
+    def __setitem__(self, uid: int, scores: Dict[str, float]) -> None:
+        self.update({uid: scores})
+
+    def clear(self) -> None:
+        self.database.execute("DELETE FROM users")
+
+    def update(self, users: Dict[int, Dict[str, float]] = None, **_) -> None:
+        projects = self.database.projects
+        self.database.executemany(f"INSERT OR REPLACE INTO users (uid, {', '.join(projects)}) "
+                                  f"VALUES (?, {', '.join('?' for _ in projects)})",
+                                  ([uid] + [(users[uid] or {}).get(p, 0.0) for p in projects] for uid in users or {}))
+
+
+class SQLiteWatches(MutableMapping):
+    # Watch expiry timestamps stored in the watches table, keyed by uid
+
+    def __init__(self, database: Database, name: str):
+        self.database = database
+        self.name = name
+
+    def __delitem__(self, uid: int) -> None:
+        if uid not in self:
+            raise KeyError(uid)
+
+        self.database.execute("DELETE FROM watches WHERE name = ? AND uid = ?", (self.name, uid))
+
+    def __getitem__(self, uid: int) -> int:
+        rows = self.database.execute("SELECT until FROM watches WHERE name = ? AND uid = ?", (self.name, uid))
+
+        if not rows:
+            raise KeyError(uid)
+
+        return rows[0][0]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self.database.execute("SELECT uid FROM watches WHERE name = ? ORDER BY uid",
+                                                             (self.name,))])
+
+    def __len__(self) -> int:
+        return self.database.execute("SELECT COUNT(*) FROM watches WHERE name = ?", (self.name,))[0][0]
+
+    def __reduce__(self) -> tuple:
+        # Pickle the active watches as a plain dict
+        return dict, (list(self.database.execute("SELECT uid, until FROM watches WHERE name = ? AND until > ?",
+                                                 (self.name, time()))),)
+
+    def __setitem__(self, uid: int, until: int) -> None:
+        self.update({uid: until})
+
+    def clear(self) -> None:
+        self.database.execute("DELETE FROM watches WHERE name = ?", (self.name,))
+
+    def prune(self, now: float) -> int:
+        # Drop the watches expired before now, return the count
+        count = self.database.execute("SELECT COUNT(*) FROM watches WHERE name = ? AND until <= ?",
+                                      (self.name, now))[0][0]
+        count and self.database.execute("DELETE FROM watches WHERE name = ? AND until <= ?", (self.name, now))
+
+        return count
+
+    def update(self, watches: Dict[int, int] = None, **_) -> None:
+        self.database.executemany("INSERT OR REPLACE INTO watches (name, uid, until) VALUES (?, ?, ?)",
+                                  ((self.name, uid, watches[uid]) for uid in watches or {}))
+
+
+class ScoreRow(MutableMapping):
+    # A user's scores in a ScoreTable, changes are written through
+
+    def __init__(self, table: "ScoreTable", uid: int):
+        self.table = table
+        self.uid = uid
+
+    def __delitem__(self, project: str) -> None:
+        raise TypeError("Project scores cannot be deleted")
+
+    def __getitem__(self, project: str) -> float:
+        return self.table.columns[project][self.table.index[self.uid]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.projects)
+
+    def __len__(self) -> int:
+        return len(self.table.projects)
+
+    def __reduce__(self) -> tuple:
+        return dict, (list(self.items()),)
+
+    def __setitem__(self, project: str, score: float) -> None:
+        with self.table.lock:
+            self.table.columns[project][self.table.index[self.uid]] = score
+
+    def items(self) -> List[Tuple[str, float]]:
+        return list(zip(self.table.projects, self.values()))
+
+    def values(self) -> List[float]:
+        with self.table.lock:
+            row = self.table.index[self.uid]
+            return [self.table.columns[project][row] for project in self.table.projects]
+
+
+class ScoreTable(MutableMapping):
+    # User scores stored as a uid index and a float32 column per project, keyed by uid
+
+    def __init__(self, projects: Iterable[str]):
+        self.lock = RLock()
+        self.projects = list(projects)
+        self.index: Dict[int, int] = {}
+        self.uids = array("q")
+        self.columns = {project: array("f") for project in self.projects}
+        self.free: List[int] = []
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self.index
+
+    def __delitem__(self, uid: int) -> None:
+        with self.lock:
+            row = self.index.pop(uid)
+            self.uids[row] = 0
+
+            for project in self.projects:
+                self.columns[project][row] = 0.0
+
+            self.free.append(row)
+
+    def __getitem__(self, uid: int) -> ScoreRow:
+        if uid not in self.index:
+            raise KeyError(uid)
+
+        return ScoreRow(self, uid)
+
+    def __getstate__(self) -> dict:
+        # The raw buffers are copied as they are, no per user objects are created
+        with self.lock:
+            return {
+                "projects": list(self.projects),
+                "uids": self.uids.tobytes(),
+                "columns": {project: self.columns[project].tobytes() for project in self.projects},
+                "free": list(self.free)
+            }
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.index))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __setitem__(self, uid: int, scores: Dict[str, float]) -> None:
+        with self.lock:
+            row = self.index.get(uid)
+
+            if row is None and self.free:
+                row = self.free.pop()
+                self.uids[row] = uid
+            elif row is None:
+                row = len(self.uids)
+                self.uids.append(uid)
+
+                for project in self.projects:
+                    self.columns[project].append(0.0)
+
+            self.index[uid] = row
+
+            for project in self.projects:
+                self.columns[project][row] = (scores or {}).get(project, 0.0)
+
+    def __setstate__(self, state: dict) -> None:
+        self.lock = RLock()
+        self.projects = state["projects"]
+        self.uids = array("q")
+        self.uids.frombytes(state["uids"])
+        self.columns = {}
+
+        for project in self.projects:
+            self.columns[project] = array("f")
+            self.columns[project].frombytes(state["columns"][project])
+
+        self.free = state["free"]
+        free = set(self.free)
+        self.index = {uid: row for row, uid in enumerate(self.uids) if row not in free}
+
+    def add_project(self, project: str) -> None:
+        # Add a column for a new project
+        with self.lock:
+            if project in self.columns:
+                return
+
+            self.projects.append(project)
+            self.columns[project] = array("f", bytes(4 * len(self.uids)))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.index = {}
+            self.uids = array("q")
+            self.columns = {project: array("f") for project in self.projects}
+            self.free = []
+
+
+class IdSet(MutableSet):
+    # A set of ids stored in a memory-mapped file of sorted int64, changes are kept in memory until compact()
+    # The state is a tuple of the mapped ids, the added ids and the removed ids, it is replaced in one assignment,
+    # so the readers that do not lock see the old state or the new state, but never a mix of them
+
+    def __init__(self, path: str):
+        self.lock = RLock()
+        self.path = path
+        self.state: Tuple[memoryview, Set[int], Set[int]] = (memoryview(array("q")), set(), set())
+        self.generation = 0
+        self.load()
+
+    def __contains__(self, the_id: object) -> bool:
+        base, added, removed = self.state
+
+        if the_id in removed:
+            return False
+
+        if the_id in added:
+            return True
+
+        return self.in_base(base, the_id)
+
+    def __iter__(self) -> Iterator[int]:
+        with self.lock:
+            base, added, removed = self.state
+            added = sorted(added)
+            removed = set(removed)
+
+        return merge((the_id for the_id in base if the_id not in removed), added)
+
+    def __len__(self) -> int:
+        with self.lock:
+            base, added, removed = self.state
+            return len(base) - len(removed) + len(added)
+
+    def __reduce__(self) -> tuple:
+        # Pickle as a plain set, for backups
+        return set, (list(self),)
+
+    @staticmethod
+    def in_base(base: memoryview, the_id: object) -> bool:
+        # Binary search in the sorted ids
+        if not isinstance(the_id, int):
+            return False
+
+        i = bisect_left(base, the_id)
+        return i < len(base) and base[i] == the_id
+
+    def add(self, the_id: int) -> None:
+        with self.lock:
+            base, added, removed = self.state
+
+            if the_id in removed:
+                removed.discard(the_id)
+            elif not self.in_base(base, the_id):
+                added.add(the_id)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.state = (memoryview(array("q")), set(), set())
+            self.generation += 1
+
+    def compact(self) -> None:
+        # Write all the ids to the file, then map it again
+        with self.lock:
+            base, added, removed = self.state
+            added = set(added)
+            removed = set(removed)
+            generation = self.generation
+
+        # The set is not locked while writing, changes made meanwhile are kept below
+        ids = array("q", merge((the_id for the_id in base if the_id not in removed), sorted(added)))
+
+        with open(f"{self.path}.tmp", "wb") as f:
+            ids.tofile(f)
+            f.flush()
+            fsync(f.fileno())
+
+        replace(f"{self.path}.tmp", self.path)
+
+        with self.lock:
+            # The set was cleared, the file will be written again next time
+            if generation != self.generation:
+                return
+
+            new_base = self.map()
+            _, now_added, now_removed = self.state
+            new_added = {the_id for the_id in now_added if not self.in_base(new_base, the_id)}
+            new_removed = {the_id for the_id in now_removed if self.in_base(new_base, the_id)}
+
+            # Keep the changes made while writing, now against the new file
+            for the_id in (added ^ now_added) | (removed ^ now_removed):
+                in_set = the_id in self
+                in_base = self.in_base(new_base, the_id)
+                in_set and not in_base and new_added.add(the_id)
+                not in_set and in_base and new_removed.add(the_id)
+
+            self.state = (new_base, new_added, new_removed)
+
+    def discard(self, the_id: int) -> None:
+        with self.lock:
+            base, added, removed = self.state
+
+            if the_id in added:
+                added.discard(the_id)
+            elif self.in_base(base, the_id):
+                removed.add(the_id)
+
+    def load(self) -> None:
+        # Map the file if it exists
+        with self.lock:
+            self.state = (self.map(), set(), set())
+
+    def map(self) -> memoryview:
+        # Map the file read-only, the pages are loaded by the OS when they are searched
+        if not exists(self.path) or not getsize(self.path):
+            return memoryview(array("q"))
+
+        with open(self.path, "rb") as f:
+            return memoryview(mmap(f.fileno(), 0, access=ACCESS_READ)).cast("q")
+
+    def update(self, ids: Iterable[int]) -> None:
+        with self.lock:
+            for the_id in ids:
+                self.add(the_id)
+
+
+class WatchMap(MutableMapping):
+    # Watches of users by the expiry time, the expired watches are dropped in expiry order by prune()
+
+    def __init__(self, watches: Dict[int, int] = None):
+        self.lock = RLock()
+        self.data: Dict[int, int] = {}
+        self.heap: List[Tuple[int, int]] = []
+        self.update(watches or {})
+
+    def __delitem__(self, uid: int) -> None:
+        # The heap entry is dropped when it expires
+        with self.lock:
+            del self.data[uid]
+
+    def __getitem__(self, uid: int) -> int:
+        return self.data[uid]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.data))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __reduce__(self) -> tuple:
+        # Pickle the active watches as a plain dict
+        now = time()
+
+        with self.lock:
+            return dict, ([(uid, until) for uid, until in self.data.items() if until > now],)
+
+    def __setitem__(self, uid: int, until: int) -> None:
+        with self.lock:
+            self.data[uid] = until
+            heappush(self.heap, (until, uid))
+
+            # Rebuild the heap if most of it is replaced entries
+            if len(self.heap) > 2 * len(self.data) + 1024:
+                self.heap = [(until, uid) for uid, until in self.data.items()]
+                heapify(self.heap)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data = {}
+            self.heap = []
+
+    def prune(self, now: float) -> int:
+        # Drop the watches expired before now, return the count
+        count = 0
+
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                until, uid = heappop(self.heap)
+
+                # The entry was replaced or removed
+                if self.data.get(uid) != until:
+                    continue
+
+                del self.data[uid]
+                count += 1
+
+        return count
@@ -25,21 +25,24 @@ from pyrogram.errors import ChatAdminRequired, ButtonDataInvalid, ChannelInvalid
 from pyrogram.errors import PeerIdInvalid, QueryIdInvalid, UsernameInvalid, UsernameNotOccupied
 
 from .. import glovar
-from .decorators import retry
-from .etc import delay, get_int, wait_flood
+from .decorators import retry, timed
+from .etc import delay, get_int, wait_flood, wait_limit
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
-def answer_callback(client: Client, callback_query_id: str, text: str, show_alert: bool = False) -> Optional[bool]:
-    # Answer the callback
+@timed("telegram")
+def answer_callback(client: Client, callback_query_id: str, text: str, show_alert: bool = False,
+                    cid: int = None) -> Optional[bool]:
+    # Answer the callback of a message in the chat
     result = None
     try:
         flood_wait = True
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.answer_callback_query(
                     callback_query_id=callback_query_id,
                     text=text,
@@ -47,7 +50,7 @@ def answer_callback(client: Client, callback_query_id: str, text: str, show_aler
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except QueryIdInvalid:
                 return False
     except Exception as e:
@@ -56,6 +59,7 @@ def answer_callback(client: Client, callback_query_id: str, text: str, show_aler
     return result
 
 
+@timed("telegram")
 def delete_messages(client: Client, cid: int, mids: Iterable[int]) -> Optional[bool]:
     # Delete some messages
     result = None
@@ -69,10 +73,15 @@ def delete_messages(client: Client, cid: int, mids: Iterable[int]) -> Optional[b
                 while flood_wait:
                     flood_wait = False
                     try:
+                        wait_limit(cid)
                         result = client.delete_messages(chat_id=cid, message_ids=mids)
                     except FloodWait as e:
                         flood_wait = True
-                        wait_flood(e)
+                        wait_flood(e, cid)
+
+                # The cached messages are deleted
+                for mid in mids:
+                    glovar.message_cache.discard((cid, mid))
             except Exception as e:
                 logger.warning(f"Delete message {mids} in {cid} for loop error: {e}", exc_info=True)
     except Exception as e:
@@ -81,24 +90,27 @@ def delete_messages(client: Client, cid: int, mids: Iterable[int]) -> Optional[b
     return result
 
 
-def download_media(client: Client, file_id: str, file_ref: str, file_path: str) -> Optional[str]:
-    # Download a media file
+@timed("telegram")
+def download_media(client: Client, file_id: str, file_ref: str, file_path: str, cid: int = None) -> Optional[str]:
+    # Download a media file of a message in the chat
     result = None
     try:
         flood_wait = True
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.download_media(message=file_id, file_ref=file_ref, file_name=file_path)
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
     except Exception as e:
         logger.warning(f"Download media {file_id} to {file_path} error: {e}", exc_info=True)
 
     return result
 
 
+@timed("telegram")
 def edit_message_reply_markup(client: Client, cid: int, mid: int,
                               markup: InlineKeyboardMarkup = None) -> Union[bool, Message, None]:
     # Edit the message's reply markup
@@ -108,6 +120,7 @@ def edit_message_reply_markup(client: Client, cid: int, mid: int,
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.edit_message_reply_markup(
                     chat_id=cid,
                     message_id=mid,
@@ -115,17 +128,21 @@ def edit_message_reply_markup(client: Client, cid: int, mid: int,
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except ButtonDataInvalid:
                 logger.warning(f"Edit message {mid} reply markup in {cid} - invalid markup: {markup}")
             except (ChatAdminRequired, PeerIdInvalid, ChannelInvalid, ChannelPrivate):
                 return False
+
+        # The cached message is outdated
+        glovar.message_cache.discard((cid, mid))
     except Exception as e:
         logger.warning(f"Edit message {mid} reply markup in {cid} error: {e}", exc_info=True)
 
     return result
 
 
+@timed("telegram")
 def edit_message_text(client: Client, cid: int, mid: int, text: str,
                       markup: InlineKeyboardMarkup = None) -> Union[bool, Message, None]:
     # Edit the message's text
@@ -138,6 +155,7 @@ def edit_message_text(client: Client, cid: int, mid: int, text: str,
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.edit_message_text(
                     chat_id=cid,
                     message_id=mid,
@@ -148,17 +166,21 @@ def edit_message_text(client: Client, cid: int, mid: int, text: str,
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except ButtonDataInvalid:
                 logger.warning(f"Edit message {mid} text in {cid} - invalid markup: {markup}")
             except (ChatAdminRequired, PeerIdInvalid, ChannelInvalid, ChannelPrivate):
                 return False
+
+        # The cached message is outdated
+        glovar.message_cache.discard((cid, mid))
     except Exception as e:
         logger.warning(f"Edit message {mid} in {cid} error: {e}", exc_info=True)
 
     return result
 
 
+@timed("telegram")
 def get_chat(client: Client, cid: Union[int, str]) -> Union[Chat, ChatPreview, None]:
     # Get a chat
     result = None
@@ -167,10 +189,11 @@ def get_chat(client: Client, cid: Union[int, str]) -> Union[Chat, ChatPreview, N
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.get_chat(chat_id=cid)
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except (PeerIdInvalid, ChannelInvalid, ChannelPrivate):
                 return None
     except Exception as e:
@@ -179,6 +202,7 @@ def get_chat(client: Client, cid: Union[int, str]) -> Union[Chat, ChatPreview, N
     return result
 
 
+@timed("telegram")
 def get_messages(client: Client, cid: int, mids: Iterable[int]) -> List[Message]:
     # Get some messages
     result = []
@@ -187,16 +211,18 @@ def get_messages(client: Client, cid: int, mids: Iterable[int]) -> List[Message]
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.get_messages(chat_id=cid, message_ids=mids)
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
     except Exception as e:
         logger.warning(f"Get messages {mids} in {cid} error: {e}", exc_info=True)
 
     return result
 
 
+@timed("telegram")
 def resolve_peer(client: Client, pid: Union[int, str]) -> Union[bool, InputPeerChannel, InputPeerUser, None]:
     # Get an input peer by id
     result = None
@@ -205,10 +231,11 @@ def resolve_peer(client: Client, pid: Union[int, str]) -> Union[bool, InputPeerC
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(pid)
                 result = client.resolve_peer(pid)
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, pid)
             except (PeerIdInvalid, UsernameInvalid, UsernameNotOccupied):
                 return False
     except Exception as e:
@@ -217,6 +244,7 @@ def resolve_peer(client: Client, pid: Union[int, str]) -> Union[bool, InputPeerC
     return result
 
 
+@timed("telegram")
 def resolve_username(client: Client, username: str, cache: bool = True) -> (str, int):
     # Resolve peer by username
     peer_type = ""
@@ -253,6 +281,7 @@ def resolve_username(client: Client, username: str, cache: bool = True) -> (str,
     return peer_type, peer_id
 
 
+@timed("telegram")
 def send_document(client: Client, cid: int, document: str, file_ref: str = None, caption: str = "", mid: int = None,
                   markup: InlineKeyboardMarkup = None) -> Union[bool, Message, None]:
     # Send a document to a chat
@@ -262,6 +291,7 @@ def send_document(client: Client, cid: int, document: str, file_ref: str = None,
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.send_document(
                     chat_id=cid,
                     document=document,
@@ -273,7 +303,7 @@ def send_document(client: Client, cid: int, document: str, file_ref: str = None,
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except ButtonDataInvalid:
                 logger.warning(f"Send document {document} to {cid} - invalid markup: {markup}")
             except (ChatAdminRequired, PeerIdInvalid, ChannelInvalid, ChannelPrivate):
@@ -284,6 +314,7 @@ def send_document(client: Client, cid: int, document: str, file_ref: str = None,
     return result
 
 
+@timed("telegram")
 def send_message(client: Client, cid: int, text: str, mid: int = None,
                  markup: InlineKeyboardMarkup = None) -> Union[bool, Message, None]:
     # Send a message to a chat
@@ -296,6 +327,7 @@ def send_message(client: Client, cid: int, text: str, mid: int = None,
         while flood_wait:
             flood_wait = False
             try:
+                wait_limit(cid)
                 result = client.send_message(
                     chat_id=cid,
                     text=text,
@@ -306,7 +338,7 @@ def send_message(client: Client, cid: int, text: str, mid: int = None,
                 )
             except FloodWait as e:
                 flood_wait = True
-                wait_flood(e)
+                wait_flood(e, cid)
             except ButtonDataInvalid:
                 logger.warning(f"Send message to {cid} - invalid markup: {markup}")
             except (ChatAdminRequired, PeerIdInvalid, ChannelInvalid, ChannelPrivate):
@@ -317,6 +349,7 @@ def send_message(client: Client, cid: int, text: str, mid: int = None,
     return result
 
 
+@timed("telegram")
 @retry
 def send_report_message(secs: int, client: Client, cid: int, text: str, mid: int = None,
                         markup: InlineKeyboardMarkup = None) -> Optional[bool]:
@@ -327,6 +360,7 @@ def send_report_message(secs: int, client: Client, cid: int, text: str, mid: int
         if not text.strip():
             return None
 
+        wait_limit(cid)
         result = client.send_message(
             chat_id=cid,
             text=text,
@@ -17,38 +17,36 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from time import sleep
 
 from pyrogram import Client
 
 from .. import glovar
-from .channel import share_data
-from .etc import code, general_link, get_now, lang, thread
+from .channel import share_backup, share_data
+from .decorators import ready
+from .etc import code, delay, general_link, get_now, lang, thread
 from .file import save
+from .ids import clear_data
 from .telegram import edit_message_reply_markup, send_message
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
+@ready()
 def backup_files(client: Client) -> bool:
     # Backup data files to BACKUP
     try:
         for file in glovar.file_list:
+            # The backup chains themselves are not shared
+            if file == "backups":
+                continue
+
             # Check
-            if not eval(f"glovar.{file}"):
+            if file not in glovar.delta_list and not eval(f"glovar.{file}"):
                 continue
 
-            # Share
-            share_data(
-                client=client,
-                receivers=["BACKUP"],
-                action="backup",
-                action_type="data",
-                data=file,
-                file=f"data/{file}"
-            )
-            sleep(5)
+            # Share all the files at the same time, the calls are rate limited
+            thread(share_backup, (client, file), key=("backup", file))
 
         return True
     except Exception as e:
@@ -57,60 +55,110 @@ def backup_files(client: Client) -> bool:
     return False
 
 
-def interval_hour_01(client: Client) -> bool:
-    # Execute every hour
+def expire_markups(client: Client) -> bool:
+    # Remove the buttons of the expired records, the edits made at the same time are sent together
     try:
-        # Basic data
-        now = get_now()
-        cid = glovar.manage_group_id
+        with glovar.locks["expire"]:
+            mids = glovar.expired_mids
+            glovar.expired_mids = []
 
-        # Clear old action sessions
-        for key in list(glovar.records):
-            action = glovar.records[key]
-            time = action["time"]
+        for mid in mids:
+            edit_message_reply_markup(client, glovar.manage_group_id, mid, None)
 
-            if now - time < 3600:
-                continue
+        return True
+    except Exception as e:
+        logger.warning(f"Expire markups error: {e}", exc_info=True)
 
-            mid = action["mid"]
-            lock = action["lock"]
+    return False
 
-            if not lock:
-                thread(edit_message_reply_markup, (client, cid, mid, None))
 
-            glovar.actions.pop(key, {})
-            glovar.records.pop(key, {})
+def expire_record(client: Client, key: str) -> bool:
+    # Expire a record at its deadline, the TTL depends on the kind of the record
+    try:
+        record = glovar.records.get(key)
+
+        if not record:
+            return True
 
+        if record.get("the_id") is not None:
+            ttl = glovar.ttl_check
+        elif record.get("group_id") is not None:
+            ttl = glovar.ttl_leave
+        else:
+            ttl = glovar.ttl_action
+
+        # Wait for the deadline
+        now = get_now()
+        deadline = record["time"] + ttl
+
+        if now < deadline:
+            return delay(deadline - now, expire_record, [client, key])
+
+        glovar.actions.pop(key, {})
+        glovar.records.pop(key, {})
         save("records")
 
+        if record["lock"] or not record["mid"]:
+            return True
+
+        with glovar.locks["expire"]:
+            first = not glovar.expired_mids
+            glovar.expired_mids.append(record["mid"])
+
+        first and delay(1, expire_markups, [client])
+
         return True
     except Exception as e:
-        logger.warning(f"Interval hour 01 error: {e}", exc_info=True)
+        logger.warning(f"Expire record {key} error: {e}", exc_info=True)
 
     return False
 
 
-def reset_data(client: Client) -> bool:
-    # Reset user data every month
+@ready("records")
+def expire_records(client: Client) -> bool:
+    # Schedule the expiry of the loaded records
     try:
-        glovar.bad_ids["users"] = set()
-        save("bad_ids")
+        for key in list(glovar.records):
+            expire_record(client, key)
+
+        return True
+    except Exception as e:
+        logger.warning(f"Expire records error: {e}", exc_info=True)
+
+    return False
+
+
+@ready("watch_ids")
+def interval_min_01() -> bool:
+    # Execute every minute
+    try:
+        # Drop the expired watches
+        now = get_now()
+        count = sum(glovar.watch_ids[the_type].prune(now) for the_type in list(glovar.watch_ids))
+        count and save("watch_ids")
 
-        glovar.user_ids = {}
-        save("user_ids")
+        return True
+    except Exception as e:
+        logger.warning(f"Interval min 01 error: {e}", exc_info=True)
+
+    return False
 
-        glovar.watch_ids = {
-            "ban": {},
-            "delete": {}
-        }
-        save("watch_ids")
+
+@ready()
+def reset_data(client: Client) -> bool:
+    # Reset user data every month
+    try:
+        clear_data("bad_ids", "users")
+        clear_data("user_ids")
+        clear_data("watch_ids", "ban")
+        clear_data("watch_ids", "delete")
 
         glovar.records = {}
         save("records")
 
         # Send debug message
-        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('reset'))}\n")
+        text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{glovar.labels['action']}{code(lang('reset'))}\n")
         thread(send_message, (client, glovar.debug_channel_id, text))
 
         return True
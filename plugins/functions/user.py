@@ -24,8 +24,10 @@ from .. import glovar
 from .channel import forward_evidence, send_debug, share_data
 from .etc import button_data, code, general_link, get_int, get_now, get_subject, italic, lang, mention_id, message_link
 from .etc import random_str, thread
-from .file import save
+from .file import journal, save
+from .ids import get_user_lock
 from .telegram import get_chat, resolve_username, send_message
+from .timers import expire_record
 
 # Enable logging
 logger = logging.getLogger(__name__)
@@ -41,15 +43,15 @@ def add_channel(client: Client, the_type: str, the_id: int, aid: int, reason: st
             "except": "bad"
         }
 
-        result += (f"{lang('action')}{lang('colon')}{code(lang(f'add_{the_type}'))}\n"
-                   f"{lang('channel_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang(f'add_{the_type}'))}\n"
+                   f"{glovar.labels['channel_id']}{code(the_id)}\n")
 
         if the_id not in eval(f"glovar.{the_type}_ids")["channels"] or force:
             # Local
             eval(f"glovar.{the_type}_ids")["channels"].add(the_id)
-            save(f"{the_type}_ids")
+            journal(f"{the_type}_ids", "add", ("channels",), the_id)
             eval(f"glovar.{opposite[the_type]}_ids")["channels"].discard(the_id)
-            save(f"{opposite[the_type]}_ids")
+            journal(f"{opposite[the_type]}_ids", "discard", ("channels",), the_id)
 
             # Share
             share_data(
@@ -64,7 +66,7 @@ def add_channel(client: Client, the_type: str, the_id: int, aid: int, reason: st
             )
 
             # Send debug message
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
             send_debug(
                 client=client,
                 aid=aid,
@@ -73,8 +75,8 @@ def add_channel(client: Client, the_type: str, the_id: int, aid: int, reason: st
                 reason=reason
             )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang(f'in_{the_type}'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang(f'in_{the_type}'))}\n")
     except Exception as e:
         logger.warning(f"Add channel error: {e}", exc_info=True)
 
@@ -117,9 +119,9 @@ def check_subject(client: Client, message: Message, m: str = "") -> bool:
         # No Valid ID
         if not the_id:
             if not message.forward_date:
-                text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                        f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                        f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+                text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                        f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                        f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
 
             thread(send_message, (client, cid, text, mid, markup))
             return True
@@ -138,31 +140,32 @@ def check_subject(client: Client, message: Message, m: str = "") -> bool:
             "the_id": the_id
         }
 
-        text = f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
+        text = f"{glovar.labels['admin']}{mention_id(aid)}\n"
 
         if m:
-            text += f"{lang('triggered_by')}{lang('colon')}{m}\n"
+            text += f"{glovar.labels['triggered_by']}{m}\n"
 
         if the_id > 0:
             is_bad = the_id in glovar.bad_ids["users"]
             is_white = the_id in glovar.white_ids
             is_watch_ban = now < glovar.watch_ids["ban"].get(the_id, 0)
             is_watch_delete = now < glovar.watch_ids["delete"].get(the_id, 0)
-            total_score = sum(glovar.user_ids.get(the_id, glovar.default_user_status).values())
+            scores = dict(glovar.user_ids.get(the_id, glovar.default_user_status).items())
+            total_score = sum(scores.values())
 
-            text += (f"{lang('user_id')}{lang('colon')}{code(the_id)}\n"
-                     f"{lang('blacklist')}{lang('colon')}{code(is_bad)}\n"
-                     f"{lang('whitelist')}{lang('colon')}{code(is_white)}\n")
+            text += (f"{glovar.labels['user_id']}{code(the_id)}\n"
+                     f"{glovar.labels['blacklist']}{code(is_bad)}\n"
+                     f"{glovar.labels['whitelist']}{code(is_white)}\n")
 
             if glovar.query and glovar.query != "[DATA EXPUNGED]":
                 text += f"{glovar.query.format(the_id)}\n"
 
-            text += (f"{lang('ban_watch')}{lang('colon')}{code(is_watch_ban)}\n"
-                     f"{lang('delete_watch')}{lang('colon')}{code(is_watch_delete)}\n"
-                     f"{lang('score_total')}{lang('colon')}{code(f'{total_score:.1f}')}\n")
+            text += (f"{glovar.labels['ban_watch']}{code(is_watch_ban)}\n"
+                     f"{glovar.labels['delete_watch']}{code(is_watch_delete)}\n"
+                     f"{glovar.labels['score_total']}{code(f'{total_score:.1f}')}\n")
 
             for project in glovar.default_user_status:
-                project_score = glovar.user_ids.get(the_id, glovar.default_user_status)[project]
+                project_score = scores.get(project, 0)
 
                 if not project_score:
                     continue
@@ -219,14 +222,14 @@ def check_subject(client: Client, message: Message, m: str = "") -> bool:
             is_bad = the_id in glovar.bad_ids["channels"]
             is_except = the_id in glovar.except_ids["channels"]
 
-            text += f"{lang('channel_id')}{lang('colon')}{code(the_id)}\n"
+            text += f"{glovar.labels['channel_id']}{code(the_id)}\n"
 
             if id_text and id_text != str(the_id):
                 chat = get_chat(client, id_text)
-                text += f"{lang('restricted_channel')}{lang('colon')}{code(bool(chat and chat.restrictions))}\n"
+                text += f"{glovar.labels['restricted_channel']}{code(bool(chat and chat.restrictions))}\n"
 
-            text += (f"{lang('blacklist')}{lang('colon')}{code(is_bad)}\n"
-                     f"{lang('whitelist')}{lang('colon')}{code(is_except)}\n")
+            text += (f"{glovar.labels['blacklist']}{code(is_bad)}\n"
+                     f"{glovar.labels['whitelist']}{code(is_except)}\n")
 
             bad_data = button_data("check", "bad", key)
             except_data = button_data("check", "except", key)
@@ -256,6 +259,7 @@ def check_subject(client: Client, message: Message, m: str = "") -> bool:
         result = send_message(client, cid, text, mid, markup)
         glovar.records[key]["mid"] = result and result.message_id
         save("records")
+        expire_record(client, key)
 
         return True
     except Exception as e:
@@ -270,21 +274,23 @@ def remove_bad_user(client: Client, the_id: int, aid: int, debug: bool = False,
     result = ""
     try:
         # Generate the report message's text
-        result += (f"{lang('action')}{lang('colon')}{code(lang('action_unban'))}\n"
-                   f"{lang('user_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang('action_unban'))}\n"
+                   f"{glovar.labels['user_id']}{code(the_id)}\n")
 
         # Proceed
         if the_id in glovar.bad_ids["users"] or force:
             # Local
             glovar.bad_ids["users"].discard(the_id)
-            save("bad_ids")
+            journal("bad_ids", "discard", ("users",), the_id)
 
             glovar.watch_ids["ban"].pop(the_id, 0)
+            journal("watch_ids", "pop", ("ban", the_id))
             glovar.watch_ids["delete"].pop(the_id, 0)
-            save("watch_ids")
+            journal("watch_ids", "pop", ("delete", the_id))
 
-            glovar.user_ids.pop(the_id, {})
-            save("user_ids")
+            with get_user_lock(the_id):
+                glovar.user_ids.pop(the_id, {})
+                journal("user_ids", "pop", (the_id,))
 
             # Share
             share_data(
@@ -299,7 +305,7 @@ def remove_bad_user(client: Client, the_id: int, aid: int, debug: bool = False,
             )
 
             # Text
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
 
             # Send debug message
             if debug:
@@ -311,8 +317,8 @@ def remove_bad_user(client: Client, the_id: int, aid: int, debug: bool = False,
                     reason=reason
                 )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang('no_bad'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang('no_bad'))}\n")
     except Exception as e:
         logger.warning(f"Remove bad object error: {e}", exc_info=True)
 
@@ -325,14 +331,14 @@ def remove_channel(client: Client, the_type: str, the_id: int, aid: int, reason:
     result = ""
     try:
         # Generate the report message's text
-        result += (f"{lang('action')}{lang('colon')}{code(lang(f'remove_{the_type}'))}\n"
-                   f"{lang('channel_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang(f'remove_{the_type}'))}\n"
+                   f"{glovar.labels['channel_id']}{code(the_id)}\n")
 
         # Proceed
         if the_id in eval(f"glovar.{the_type}_ids")["channels"] or force:
             # Local
             eval(f"glovar.{the_type}_ids")["channels"].discard(the_id)
-            save(f"{the_type}_ids")
+            journal(f"{the_type}_ids", "discard", ("channels",), the_id)
 
             # Share
             share_data(
@@ -347,7 +353,7 @@ def remove_channel(client: Client, the_type: str, the_id: int, aid: int, reason:
             )
 
             # Text
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
 
             # Send debug message
             send_debug(
@@ -358,8 +364,8 @@ def remove_channel(client: Client, the_type: str, the_id: int, aid: int, reason:
                 reason=reason
             )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang(f'no_{the_type}'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang(f'no_{the_type}'))}\n")
     except Exception as e:
         logger.warning(f"Remove channel error: {e}", exc_info=True)
 
@@ -372,14 +378,15 @@ def remove_score(client: Client, the_id: int, aid: int = None, reason: str = Non
     result = ""
     try:
         # Generate the report message's text
-        result += (f"{lang('action')}{lang('colon')}{code(lang('action_forgive'))}\n"
-                   f"{lang('user_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang('action_forgive'))}\n"
+                   f"{glovar.labels['user_id']}{code(the_id)}\n")
 
         # Proceed
         if (glovar.user_ids.get(the_id, {}) and sum(glovar.user_ids[the_id].values())) or force:
             # Local
-            glovar.user_ids.pop(the_id, {})
-            save("user_ids")
+            with get_user_lock(the_id):
+                glovar.user_ids.pop(the_id, {})
+                journal("user_ids", "pop", (the_id,))
 
             # Share
             share_data(
@@ -391,7 +398,7 @@ def remove_score(client: Client, the_id: int, aid: int = None, reason: str = Non
             )
 
             # Text
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
 
             # Send debug message
             send_debug(
@@ -402,8 +409,8 @@ def remove_score(client: Client, the_id: int, aid: int = None, reason: str = Non
                 reason=reason
             )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang('no_score'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang('no_score'))}\n")
     except Exception as e:
         logger.warning(f"Remove score error: {e}", exc_info=True)
 
@@ -416,15 +423,16 @@ def remove_watch_user(client: Client, the_id: int, debug: bool = False, aid: int
     result = ""
     try:
         # Generate the report message's text
-        result += (f"{lang('action')}{lang('colon')}{code(lang('action_unwatch'))}\n"
-                   f"{lang('user_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang('action_unwatch'))}\n"
+                   f"{glovar.labels['user_id']}{code(the_id)}\n")
 
         # Proceed
         if glovar.watch_ids["ban"].get(the_id, 0) or glovar.watch_ids["delete"].get(the_id, 0) or force:
             # Local
             glovar.watch_ids["ban"].pop(the_id, 0)
+            journal("watch_ids", "pop", ("ban", the_id))
             glovar.watch_ids["delete"].pop(the_id, 0)
-            save("watch_ids")
+            journal("watch_ids", "pop", ("delete", the_id))
 
             # Share
             share_data(
@@ -436,7 +444,7 @@ def remove_watch_user(client: Client, the_id: int, debug: bool = False, aid: int
             )
 
             # Text
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
 
             # Send debug message
             if debug:
@@ -448,8 +456,8 @@ def remove_watch_user(client: Client, the_id: int, debug: bool = False, aid: int
                     reason=reason
                 )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang('no_watch'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang('no_watch'))}\n")
     except Exception as e:
         logger.warning(f"Remove watch user error: {e}", exc_info=True)
 
@@ -462,14 +470,14 @@ def remove_white_user(client: Client, the_id: int, debug: bool = False, aid: int
     result = ""
     try:
         # Generate the report message's text
-        result += (f"{lang('action')}{lang('colon')}{code(lang('action_unwhite'))}\n"
-                   f"{lang('user_id')}{lang('colon')}{code(the_id)}\n")
+        result += (f"{glovar.labels['action']}{code(lang('action_unwhite'))}\n"
+                   f"{glovar.labels['user_id']}{code(the_id)}\n")
 
         # Proceed
         if the_id in glovar.white_ids or force:
             # Local
             glovar.white_ids.discard(the_id)
-            save("white_ids")
+            journal("white_ids", "discard", (), the_id)
 
             # Share
             share_data(
@@ -481,7 +489,7 @@ def remove_white_user(client: Client, the_id: int, debug: bool = False, aid: int
             )
 
             # Text
-            result += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
+            result += f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
 
             # Send debug message
             if debug:
@@ -493,8 +501,8 @@ def remove_white_user(client: Client, the_id: int, debug: bool = False, aid: int
                     reason=reason
                 )
         else:
-            result += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                       f"{lang('reason')}{lang('colon')}{code(lang('no_white'))}\n")
+            result += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                       f"{glovar.labels['reason']}{code(lang('no_white'))}\n")
     except Exception as e:
         logger.warning(f"Remove white user error: {e}", exc_info=True)
 
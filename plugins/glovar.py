@@ -18,15 +18,23 @@
 
 import logging
 import pickle
+import re
 from configparser import RawConfigParser
-from os import mkdir
+from glob import glob
+from os import _exit, mkdir, remove, rename
 from os.path import exists
 from shutil import rmtree
-from threading import Lock
-from typing import Dict, List, Set, Union
+from threading import Event, Lock, RLock
+from typing import Any, BinaryIO, Dict, List, Optional, Pattern, Set, Tuple, Union
 
 from pyrogram import Message
 
+from .functions.cache import Cache
+from .functions.limiter import Limiter
+from .functions.metrics import Recorder
+from .functions.pool import Pool
+from .functions.storage import Database, IdSet, ScoreTable, SQLiteSet, SQLiteUsers, SQLiteWatches, WatchMap
+
 # Enable logging
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -61,11 +69,34 @@ watch_channel_id: int = 0
 # [custom]
 aio: Union[bool, str] = ""
 backup: Union[bool, str] = ""
+backup_base: int = 7
+batch_receivers: List[str] = []
+batch_window: float = 1.0
+cache_size: int = 1000
+cache_ttl: float = 60.0
+capture: Union[bool, str] = "False"
+capture_limit: int = 100
+compress: str = "zlib"
+compress_level: int = 6
 date_reset: str = ""
+journal_limit: int = 100000
+metrics: Union[bool, str] = "False"
+metrics_port: int = 0
 per_page: int = 0
+pool_limit: int = 1000
+pool_workers: int = 8
 project_link: str = ""
 project_name: str = ""
 query: str = ""
+rate_burst: int = 5
+rate_chat: float = 1.0
+rate_global: float = 30.0
+receive_shards: int = 8
+save_interval: int = 5
+storage: str = "pickle"
+ttl_action: int = 3600
+ttl_check: int = 3600
+ttl_leave: int = 3600
 zh_cn: Union[bool, str] = ""
 
 # [encrypt]
@@ -100,11 +131,36 @@ try:
     aio = eval(aio)
     backup = config["custom"].get("backup", backup)
     backup = eval(backup)
+    backup_base = int(config["custom"].get("backup_base", str(backup_base)))
+    batch_receivers = config["custom"].get("batch_receivers", " ".join(batch_receivers)).upper().split()
+    batch_window = float(config["custom"].get("batch_window", str(batch_window)))
+    cache_size = int(config["custom"].get("cache_size", str(cache_size)))
+    cache_ttl = float(config["custom"].get("cache_ttl", str(cache_ttl)))
+    capture = config["custom"].get("capture", capture)
+    capture = eval(capture)
+    capture_limit = int(config["custom"].get("capture_limit", str(capture_limit)))
+    compress = config["custom"].get("compress", compress)
+    compress_level = int(config["custom"].get("compress_level", str(compress_level)))
     date_reset = config["custom"].get("date_reset", date_reset)
+    journal_limit = int(config["custom"].get("journal_limit", str(journal_limit)))
+    metrics = config["custom"].get("metrics", metrics)
+    metrics = eval(metrics)
+    metrics_port = int(config["custom"].get("metrics_port", str(metrics_port)))
     per_page = int(config["custom"].get("per_page", str(per_page)))
+    pool_limit = int(config["custom"].get("pool_limit", str(pool_limit)))
+    pool_workers = int(config["custom"].get("pool_workers", str(pool_workers)))
     project_link = config["custom"].get("project_link", project_link)
     project_name = config["custom"].get("project_name", project_name)
     query = config["custom"].get("query", query)
+    rate_burst = int(config["custom"].get("rate_burst", str(rate_burst)))
+    rate_chat = float(config["custom"].get("rate_chat", str(rate_chat)))
+    rate_global = float(config["custom"].get("rate_global", str(rate_global)))
+    receive_shards = int(config["custom"].get("receive_shards", str(receive_shards)))
+    save_interval = int(config["custom"].get("save_interval", str(save_interval)))
+    storage = config["custom"].get("storage", storage)
+    ttl_action = int(config["custom"].get("ttl_action", str(ttl_action)))
+    ttl_check = int(config["custom"].get("ttl_check", str(ttl_check)))
+    ttl_leave = int(config["custom"].get("ttl_leave", str(ttl_leave)))
     zh_cn = config["custom"].get("zh_cn", zh_cn)
     zh_cn = eval(zh_cn)
 
@@ -131,10 +187,32 @@ if (bot_token in {"", "[DATA EXPUNGED]"}
         or watch_channel_id == 0
         or aio not in {False, True}
         or backup not in {False, True}
+        or backup_base <= 0
+        or batch_window < 0
+        or cache_size <= 0
+        or cache_ttl <= 0
+        or capture not in {False, True}
+        or capture_limit <= 0
+        or compress not in {"lzma", "zlib"}
+        or compress_level not in range(10)
         or date_reset in {"", "[DATA EXPUNGED]"}
+        or journal_limit <= 0
+        or metrics not in {False, True}
+        or metrics_port not in range(65536)
         or per_page == 0
+        or pool_limit <= 0
+        or pool_workers <= 0
         or project_link in {"", "[DATA EXPUNGED]"}
         or project_name in {"", "[DATA EXPUNGED]"}
+        or rate_burst <= 0
+        or rate_chat <= 0
+        or rate_global <= 0
+        or receive_shards <= 0
+        or save_interval <= 0
+        or storage not in {"pickle", "sqlite"}
+        or ttl_action <= 0
+        or ttl_check <= 0
+        or ttl_leave <= 0
         or zh_cn not in {False, True}
         or key in {b"", b"[DATA EXPUNGED]", "", "[DATA EXPUNGED]"}
         or password in {"", "[DATA EXPUNGED]"}):
@@ -189,6 +267,13 @@ lang: Dict[str, str] = {
     "reason_permissions": (zh_cn and "权限缺失") or "Missing Permissions",
     "reason_user": (zh_cn and "缺失 USER") or "Missing USER",
     "refresh": (zh_cn and "刷新群管列表") or "Refresh Admin Lists",
+    # Metrics
+    "metrics_cache": (zh_cn and "消息缓存") or "Message Cache",
+    "metrics_limiter": (zh_cn and "调用限速") or "Rate Limiter",
+    "metrics_pool": (zh_cn and "工作线程") or "Worker Pool",
+    "metrics_save": (zh_cn and "数据保存") or "Data Saves",
+    "metrics_shard": (zh_cn and "接收分片") or "Receive Shards",
+    "metrics_timing": (zh_cn and "耗时统计") or "Timings",
     # Manage
     "approve": (zh_cn and "批准") or "Approve",
     "proceed": (zh_cn and "处理") or "Proceed",
@@ -224,6 +309,7 @@ lang: Dict[str, str] = {
     "action_contact": (zh_cn and "移除联系方式") or "Remove Contact",
     "action_status": (zh_cn and "查询状态") or "Request the Status",
     "action_now": (zh_cn and "立即备份") or "Backup Now",
+    "action_metrics": (zh_cn and "查看运行指标") or "Show Metrics",
 
     "status_error": (zh_cn and "已解明") or "Explained",
     "status_bad": (zh_cn and "已收录") or "Contained",
@@ -325,6 +411,45 @@ lang: Dict[str, str] = {
     "watch_user": (zh_cn and "敏感追踪") or "Watched User"
 }
 
+# The fields of the report record and their labels, a line is matched by the first label
+report_fields: Dict[str, str] = {
+    "project": "project",
+    "origin": "project_origin",
+    "status": "status",
+    "uid": "user_id",
+    "level": "level",
+    "rule": "rule",
+    "type": "message_type",
+    "game": "message_game",
+    "lang": "message_lang",
+    "length": "message_len",
+    "freq": "message_freq",
+    "score": "user_score",
+    "bio": "user_bio",
+    "name": "user_name",
+    "from": "from_name",
+    "contact": "contact",
+    "more": "more"
+}
+
+report_pattern: Pattern = re.compile(
+    "^(?:"
+    + "|".join(f"(?P<{field}>{re.escape(lang.get(label, label))})" for field, label in report_fields.items())
+    + f"){re.escape(lang['colon'])}"
+)
+
+# The labels of the texts, the colon is joined
+labels: Dict[str, str] = {key: f"{value}{lang['colon']}" for key, value in lang.items()}
+
+# The untranslated texts are their own labels
+labels.update({text: f"{text}{lang['colon']}" for text in ["命令发送时间", "哈希值", "开始时间", "提交时间", "本地修改",
+                                                           "机器人", "消息发送时间", "结束时间", "警告", "转发源消息时间"]})
+
+# The optional fields of the evidence report and their labels, in the order of the report
+evidence_fields: List[Tuple[str, str]] = [(field, labels[report_fields[field]])
+                                          for field in ["type", "game", "lang", "length", "freq", "score", "bio",
+                                                        "name", "from", "contact", "more"]]
+
 # Init
 
 all_commands: List[str] = [
@@ -350,6 +475,7 @@ all_commands: List[str] = [
     "leave",
     "list",
     "ls",
+    "metrics",
     "now",
     "page",
     "refresh",
@@ -393,6 +519,20 @@ actions: Dict[str, Dict[str, Union[bool, int, str, Dict[str, str], Message]]] =
 #     }
 # }
 
+batches: Dict[Tuple[str, ...], List[dict]] = {}
+# batches = {
+#     ("CAPTCHA", "CLEAN"): [
+#         {
+#             "action": "add",
+#             "type": "bad",
+#             "data": {
+#                 "id": 12345678,
+#                 "type": "user"
+#             }
+#         }
+#     ]
+# }
+
 default_user_status: Dict[str, float] = {
     "captcha": 0.0,
     "clean": 0.0,
@@ -406,20 +546,53 @@ default_user_status: Dict[str, float] = {
 }
 
 locks: Dict[str, Lock] = {
+    "batch": Lock(),
     "callback": Lock(),
+    "capture": Lock(),
+    "expire": Lock(),
+    "journal": Lock(),
     "message": Lock(),
-    "receive": Lock()
+    "ready": Lock(),
+    "receive": Lock(),
+    "save": Lock(),
+    "shard": Lock()
 }
 
+expired_mids: List[int] = []
+# expired_mids = [123]
+
 joined_ids: Set[int] = set()
 # joined_ids = {-10012345678}
 
+journals: Dict[str, BinaryIO] = {}
+# journals = {
+#     "user_ids.journal": BufferedWriter,
+#     "user_ids.delta": BufferedWriter
+# }
+
+journal_status: Dict[str, int] = {}
+# journal_status = {
+#     "user_ids": 123
+# }
+
+limiter: Limiter = Limiter(rate_global, rate_chat, rate_burst)
+
 media_group_ids: Set[int] = set()
 # media_group_ids = {12556677123456789}
 
+message_cache: Cache = Cache(cache_size, cache_ttl)
+
+pool: Pool = Pool(pool_workers, pool_limit)
+
+ready_calls: List[tuple] = []
+# ready_calls = [
+#     ([Event()], process_data, (client, message), {})
+# ]
+
 receivers: Dict[str, List[str]] = {
     "bad": ["ANALYZE", "APPLY", "AVATAR", "CAPTCHA", "CLEAN", "LANG", "LONG", "MANAGE",
             "NOFLOOD", "NOPORN", "NOSPAM", "RECHECK", "TICKET", "TIP", "USER", "WARN", "WATCH"],
+    "batch": batch_receivers,
     "config": ["CAPTCHA", "CLEAN", "LANG", "LONG", "NOFLOOD", "NOPORN", "NOSPAM", "RECHECK", "TIP", "USER", "WARN"],
     "except": ["CLEAN", "LANG", "NOFLOOD", "NOPORN", "NOSPAM", "RECHECK", "WATCH"],
     "leave": ["CAPTCHA", "CLEAN", "LANG", "LONG",
@@ -437,10 +610,43 @@ receivers: Dict[str, List[str]] = {
               "MANAGE", "NOFLOOD", "NOPORN", "NOSPAM", "USER", "WATCH"]
 }
 
+recorder: Recorder = Recorder(metrics)
+
+save_locks: Dict[str, Lock] = {}
+# save_locks = {
+#     "user_ids": Lock()
+# }
+
+save_pending: Set[str] = set()
+# save_pending = {"user_ids"}
+
+save_status: Dict[str, Dict[str, Union[float, int]]] = {}
+# save_status = {
+#     "user_ids": {
+#         "saved": 12,
+#         "coalesced": 3456,
+#         "latency": 0.25,
+#         "latency_max": 1.5
+#     }
+# }
+
 sender: str = "MANAGE"
 
+shard_status: Dict[int, Dict[str, Union[float, int]]] = {}
+# shard_status = {
+#     3: {
+#         "queued": 2,
+#         "processed": 1234,
+#         "lag": 0.05,
+#         "lag_max": 3.5
+#     }
+# }
+
 should_hide: bool = False
 
+# A user's scores are changed and journaled in the lock of the user, the users share the locks by id
+user_locks: List[RLock] = [RLock() for _ in range(64)]
+
 usernames: Dict[str, Dict[str, Union[int, str]]] = {}
 # usernames = {
 #     "SCP_079": {
@@ -540,28 +746,245 @@ records: Dict[str, Dict[str, Union[bool, int, str]]] = {}
 #     }
 # }
 
+backups: Dict[str, Dict[str, Union[int, List[List[int]]]]] = {}
+# backups = {
+#     "user_ids": {
+#         "time": 15112345678,
+#         "base": [-10012345678, 123],
+#         "deltas": [[-10012345678, 124], [-10012345678, 125]]
+#     }
+# }
+
 # Load data
 file_list: List[str] = ["bad_ids", "except_ids", "user_ids", "watch_ids", "white_ids",
-                        "records"]
+                        "records", "backups"]
+
+# Mutations of these files are also written to data/{file}.delta, they are shared to BACKUP as delta backups
+delta_list: List[str] = ["bad_ids", "except_ids", "user_ids", "watch_ids", "white_ids"]
+
+# Mutations of these files are written to data/{file}.journal
+journal_list: List[str] = ["bad_ids", "except_ids", "user_ids", "watch_ids", "white_ids"]
+
+# These files are stored in data/database.db instead, if the storage is sqlite
+database: Optional[Database] = None
+database_list: List[str] = []
+migrated = ""
+
+# The id sets of these files are memory-mapped from data/{file}.{key}.ids, if the storage is pickle
+ids_list: List[str] = ["bad_ids", "except_ids", "white_ids"]
+mmap_list: List[str] = ids_list
+
+# The pickles are not converted to id files, they are migrated to the database as they are
+if storage == "sqlite":
+    database = Database("data/database.db", list(default_user_status))
+    database_list = journal_list
+    journal_list = []
+    migrated = database.get_meta("migrated")
+    mmap_list = []
+
+
+def replay(data: Any, op: str, path: tuple, value: Any) -> Any:
+    # Apply a journal record to the data, return the data
+    if op == "set" and not path:
+        return value
+
+    target = data
+
+    if op in {"set", "pop"}:
+        for key in path[:-1]:
+            target = target[key]
+    else:
+        for key in path:
+            target = target[key]
+
+    if op == "set":
+        target[path[-1]] = value
+    elif op == "pop":
+        target.pop(path[-1], None)
+    elif op == "add":
+        target.add(value)
+    elif op == "discard":
+        target.discard(value)
+    elif op == "clear":
+        target.clear()
+    elif op == "update":
+        target.update(value)
+
+    return data
+
+
+def load_migrated() -> bool:
+    # Move the migrated files aside after the commit, the pickle storage does not load the old data again
+    for file in database_list:
+        paths = [f"data/{file}", f"data/.{file}", f"data/{file}.journal", f"data/{file}.journal.old"]
+        paths += glob(f"data/{file}.ids") + glob(f"data/{file}.*.ids")
+
+        for path in paths:
+            exists(path) and rename(path, f"{path}.migrated")
+
+    return True
+
+
+def load_ids(file: str, data: Any) -> Any:
+    # Map the id sets of the data, the keys are kept
+    if isinstance(data, dict):
+        return {key: IdSet(f"data/{file}.{key}.ids") for key in data}
+
+    return IdSet(f"data/{file}.ids")
+
+
+def load_file(file: str) -> Any:
+    # Load a global variable's data, return the data
+    data = globals()[file]
+
+    # The data has been migrated to the database
+    if file in database_list and migrated:
+        return data_sqlite[file]
+
+    # The id sets are mapped, nothing is read until they are searched, the id files are migrated as well
+    mapped = file in ids_list and not exists(f"data/{file}") and not exists(f"data/.{file}")
 
-for file in file_list:
     try:
         try:
-            if exists(f"data/{file}") or exists(f"data/.{file}"):
+            if mapped:
+                data = load_ids(file, data)
+            elif exists(f"data/{file}") or exists(f"data/.{file}"):
                 with open(f"data/{file}", 'rb') as f:
-                    locals()[f"{file}"] = pickle.load(f)
+                    data = pickle.load(f)
             else:
                 with open(f"data/{file}", 'wb') as f:
-                    pickle.dump(eval(f"{file}"), f)
+                    pickle.dump(data, f)
         except Exception as e:
             logger.error(f"Load data {file} error: {e}", exc_info=True)
 
             with open(f"data/.{file}", 'rb') as f:
-                locals()[f"{file}"] = pickle.load(f)
+                data = pickle.load(f)
     except Exception as e:
         logger.critical(f"Load data {file} backup error: {e}", exc_info=True)
         raise SystemExit("[DATA CORRUPTION]")
 
+    # Convert the old pickle file once, it is removed after the id files are written
+    if file in mmap_list and not mapped:
+        data_ids = load_ids(file, data)
+
+        if isinstance(data, dict):
+            pairs = [(data_ids[key], data[key]) for key in data]
+        else:
+            pairs = [(data_ids, data)]
+
+        for ids, the_ids in pairs:
+            ids.clear()
+            ids.update(the_ids)
+            ids.compact()
+
+        exists(f"data/{file}") and remove(f"data/{file}")
+        exists(f"data/.{file}") and remove(f"data/.{file}")
+        data = data_ids
+
+    if file in journal_list + database_list:
+        data = load_journal(file, data)
+
+    # Use the compact score table, the old dict-of-dicts data is converted
+    if file == "user_ids" and storage == "pickle" and not isinstance(data, ScoreTable):
+        data_table = ScoreTable(default_user_status)
+        data_table.update(data)
+        data = data_table
+    elif file == "user_ids" and storage == "pickle":
+        for project in default_user_status:
+            data.add_project(project)
+
+    # Index the watches by the expiry time
+    if file == "watch_ids" and storage == "pickle":
+        data = {key: WatchMap(data[key]) for key in data}
+
+    # One-shot migration to the database
+    if file in database_list:
+        if isinstance(data_sqlite[file], dict):
+            for key in data_sqlite[file]:
+                data_sqlite[file][key].update(data.get(key, ()))
+        else:
+            data_sqlite[file].update(data)
+
+        data = data_sqlite[file]
+
+    return data
+
+
+def load_journal(file: str, data: Any) -> Any:
+    # Replay the journal, the old one is left by an unfinished snapshot
+    for path in [f"data/{file}.journal.old", f"data/{file}.journal"]:
+        if not exists(path):
+            continue
+
+        with open(path, "r+b") as f:
+            while True:
+                offset = f.tell()
+
+                # Drop the torn record written by a crash, new records will be appended after it
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    f.truncate(offset)
+                    break
+                except Exception as e:
+                    logger.error(f"Load journal {path} error: {e}", exc_info=True)
+                    f.truncate(offset)
+                    break
+
+                try:
+                    data = replay(data, *record)
+                except Exception as e:
+                    logger.warning(f"Replay journal {path} record {record} error: {e}", exc_info=True)
+
+    return data
+
+
+def load_all() -> bool:
+    # Load all the data in the background, each file is ready as soon as it is loaded
+    try:
+        for file in file_list:
+            globals()[file] = load_file(file)
+            ready[file].set()
+
+        if storage == "sqlite" and not migrated:
+            database.set_meta("migrated", "pickle")
+            database.commit()
+            load_migrated()
+
+        return True
+    except SystemExit as e:
+        logger.critical(f"Load all error: {e}")
+    except Exception as e:
+        logger.critical(f"Load all error: {e}", exc_info=True)
+
+    # The bot must not run with the default data
+    _exit(1)
+
+    return False
+
+
+# Database objects, used if the storage is sqlite
+data_sqlite: Dict[str, Any] = {}
+
+if storage == "sqlite":
+    data_sqlite = {
+        "bad_ids": {key: SQLiteSet(database, f"bad_ids.{key}") for key in bad_ids},
+        "except_ids": {key: SQLiteSet(database, f"except_ids.{key}") for key in except_ids},
+        "user_ids": SQLiteUsers(database),
+        "watch_ids": {key: SQLiteWatches(database, f"watch_ids.{key}") for key in watch_ids},
+        "white_ids": SQLiteSet(database, "white_ids")
+    }
+
+# Readiness of the data
+ready: Dict[str, Event] = {file: Event() for file in file_list}
+
+# The gauges of the metrics
+recorder.add_collector("cache", message_cache.get_status)
+recorder.add_collector("limiter", limiter.get_status)
+recorder.add_collector("pool", pool.get_status)
+recorder.add_collector("save", lambda: {file: dict(status) for file, status in save_status.items()}, "file")
+recorder.add_collector("shard", lambda: {shard: dict(status) for shard, status in shard_status.items()}, "shard")
+
 # Start program
 copyright_text = (f"SCP-079-{sender} v{version}, Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>\n"
                   "Licensed under the terms of the GNU General Public License v3 or later (GPLv3+)\n")
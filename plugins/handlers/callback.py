@@ -22,6 +22,7 @@ from json import loads
 from pyrogram import Client, CallbackQuery
 
 from .. import glovar
+from ..functions.decorators import ready, timed
 from ..functions.etc import get_admin, get_now, thread
 from ..functions.filters import manage_group
 from ..functions.manage import answer_action, answer_check, answer_leave, list_page_ids
@@ -32,6 +33,8 @@ logger = logging.getLogger(__name__)
 
 
 @Client.on_callback_query(manage_group)
+@ready()
+@timed("handler")
 def answer(client: Client, callback_query: CallbackQuery) -> bool:
     # Answer the callback query
 
@@ -81,7 +84,7 @@ def answer(client: Client, callback_query: CallbackQuery) -> bool:
             text, markup = list_page_ids(aid, action_type, page)
             edit_message_text(client, cid, mid, text, markup)
 
-        thread(answer_callback, (client, callback_query.id, ""))
+        thread(answer_callback, (client, callback_query.id, "", False, cid), None, cid)
 
         return True
     except Exception as e:
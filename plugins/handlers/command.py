@@ -25,6 +25,7 @@ from pyrogram import Client, Filters, Message
 from .. import glovar
 from ..functions.channel import format_data, share_data
 from ..functions.command import command_error, get_command, get_command_context, get_command_type
+from ..functions.decorators import ready, timed
 from ..functions.etc import code, general_link, get_admin, get_callback_data, get_int, get_now, get_readable_time
 from ..functions.etc import get_subject, italic, lang, message_link, thread, mention_id
 from ..functions.filters import from_user, manage_group, test_group
@@ -42,6 +43,8 @@ logger = logging.getLogger(__name__)
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["action"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready("records")
+@timed("handler")
 def action_command(client: Client, message: Message) -> bool:
     # Deal with report messages
     try:
@@ -53,7 +56,7 @@ def action_command(client: Client, message: Message) -> bool:
         rid = r_message and r_message.message_id
 
         # Generate the report message's text
-        text = f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
+        text = f"{glovar.labels['admin']}{mention_id(uid)}\n"
 
         # Proceed
         the_type, reason = get_command_context(message)
@@ -67,17 +70,17 @@ def action_command(client: Client, message: Message) -> bool:
                 if callback_data_list and callback_data_list[0]["t"] in {"proceed", "delete"}:
                     key = callback_data_list[0]["d"]
                     thread(answer_action, (client, the_type, uid, rid, key, reason))
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-                             f"{lang('see')}{lang('colon')}{general_link(rid, message_link(r_message))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
+                             f"{glovar.labels['see']}{general_link(rid, message_link(r_message))}\n")
                 else:
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                             f"{lang('reason')}{lang('colon')}{code(lang('command_reply'))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                             f"{glovar.labels['reason']}{code(lang('command_reply'))}\n")
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_permission'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_permission'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -92,6 +95,8 @@ def action_command(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["check"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready()
+@timed("handler")
 def check(client: Client, message: Message) -> bool:
     # Check a user's status
     try:
@@ -119,6 +124,8 @@ def check(client: Client, message: Message) -> bool:
                                                                        "clear_watch_delete"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready()
+@timed("handler")
 def clear(client: Client, message: Message) -> bool:
     # Clear data
     try:
@@ -132,8 +139,8 @@ def clear(client: Client, message: Message) -> bool:
         receivers = get_command_type(message).upper()
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('clear'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('clear'))}\n")
 
         # Proceed
         if receivers:
@@ -179,13 +186,13 @@ def clear(client: Client, message: Message) -> bool:
                 )
 
                 # Text
-                text += f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n"
+                text += f"{glovar.labels['status']}{code(lang('status_commanded'))}\n"
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -200,6 +207,7 @@ def clear(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["config"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def config(client: Client, message: Message) -> bool:
     # Let other bots show config of a group
     try:
@@ -212,8 +220,8 @@ def config(client: Client, message: Message) -> bool:
         gid = get_int(id_text)
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('config_show'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('config_show'))}\n")
 
         # Proceed
         if receiver in glovar.receivers["config"] and gid < 0:
@@ -228,10 +236,10 @@ def config(client: Client, message: Message) -> bool:
                     "group_id": gid
                 }
             )
-            text += f"{lang('status')}{lang('colon')}{code(lang('status_requested'))}\n"
+            text += f"{glovar.labels['status']}{code(lang('status_requested'))}\n"
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -246,6 +254,7 @@ def config(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["flood", "flood_force"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def flood(client: Client, message: Message) -> bool:
     # Manually kick flood users
     result = False
@@ -297,11 +306,11 @@ def flood(client: Client, message: Message) -> bool:
         )
 
         # Generate the report text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('手动清除炸群成员'))}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('开始时间')}{lang('colon')}{code(begin)}\n"
-                f"{lang('结束时间')}{lang('colon')}{code(end)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('手动清除炸群成员'))}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['开始时间']}{code(begin)}\n"
+                f"{glovar.labels['结束时间']}{code(end)}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -316,6 +325,7 @@ def flood(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["hide"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def hide(client: Client, message: Message) -> bool:
     # Let bots hide
     try:
@@ -326,8 +336,8 @@ def hide(client: Client, message: Message) -> bool:
         command_type = get_command_type(message)
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('transfer_channel'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('transfer_channel'))}\n")
 
         # Proceed
         if command_type and command_type in {"off", "on"}:
@@ -353,18 +363,18 @@ def hide(client: Client, message: Message) -> bool:
 
             # Generate the report message's text
             data_text = (lambda x: lang("enabled") if x else lang("disabled"))(data)
-            text += (f"{lang('emergency_channel')}{lang('colon')}{code(data_text)}\n"
-                     f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n")
+            text += (f"{glovar.labels['emergency_channel']}{code(data_text)}\n"
+                     f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n")
 
             # Send debug message
-            debug_text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                          f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                          f"{lang('action')}{lang('colon')}{code(lang('transfer_channel'))}\n"
-                          f"{lang('emergency_channel')}{lang('colon')}{code(data_text)}\n")
+            debug_text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                          f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                          f"{glovar.labels['action']}{code(lang('transfer_channel'))}\n"
+                          f"{glovar.labels['emergency_channel']}{code(data_text)}\n")
             thread(send_message, (client, glovar.debug_channel_id, debug_text))
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -379,6 +389,8 @@ def hide(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["leave"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready("records")
+@timed("handler")
 def leave(client: Client, message: Message) -> bool:
     # Let other bots leave a group
     try:
@@ -390,11 +402,11 @@ def leave(client: Client, message: Message) -> bool:
         rid = r_message and r_message.message_id
 
         # Generate the report message's text
-        text = f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
+        text = f"{glovar.labels['admin']}{mention_id(aid)}\n"
 
         # Proceed
         if message.reply_to_message:
-            text += f"{lang('action')}{lang('colon')}{code(lang('leave_handle'))}\n"
+            text += f"{glovar.labels['action']}{code(lang('leave_handle'))}\n"
             action_type, reason = get_command_context(message)
 
             if action_type in {"approve", "reject"} and r_message and r_message.from_user.is_self:
@@ -403,16 +415,16 @@ def leave(client: Client, message: Message) -> bool:
                 if callback_data_list and callback_data_list[0]["t"] in {"approve"}:
                     action_key = callback_data_list[0]["d"]
                     thread(answer_leave, (client, action_type, aid, rid, action_key, reason))
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-                             f"{lang('see')}{lang('colon')}{general_link(rid, message_link(r_message))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
+                             f"{glovar.labels['see']}{general_link(rid, message_link(r_message))}\n")
                 else:
-                    text += (f"{lang('status')}{lang('colon')}{code('status_failed')}\n"
-                             f"{lang('reason')}{lang('colon')}{code(lang('command_reply'))}\n")
+                    text += (f"{glovar.labels['status']}{code('status_failed')}\n"
+                             f"{glovar.labels['reason']}{code(lang('command_reply'))}\n")
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
         else:
-            text += f"{lang('action')}{lang('colon')}{code(lang('leave_manual'))}\n"
+            text += f"{glovar.labels['action']}{code(lang('leave_manual'))}\n"
             id_text, reason, _ = get_subject(message)
 
             # Check force
@@ -438,17 +450,17 @@ def leave(client: Client, message: Message) -> bool:
                             "reason": reason
                         }
                     )
-                    text += (f"{lang('group_id')}{lang('colon')}{code(the_id)}\n"
-                             f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n")
+                    text += (f"{glovar.labels['group_id']}{code(the_id)}\n"
+                             f"{glovar.labels['status']}{code(lang('status_commanded'))}\n")
 
                     if reason:
-                        text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+                        text += f"{glovar.labels['reason']}{code(reason)}\n"
                 else:
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                             f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                             f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -463,6 +475,8 @@ def leave(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["list", "ls"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready()
+@timed("handler")
 def list_ids(client: Client, message: Message) -> bool:
     # List IDs
     try:
@@ -493,6 +507,8 @@ def list_ids(client: Client, message: Message) -> bool:
                                                                        "remove_watch",
                                                                        "remove_white"], glovar.prefix)
                    & manage_group & from_user)
+@ready()
+@timed("handler")
 def modify_subject(client: Client, message: Message) -> bool:
     # Add or remove user and channel
     try:
@@ -511,7 +527,7 @@ def modify_subject(client: Client, message: Message) -> bool:
             reason = re.sub("force$", "", reason).strip()
 
         # Generate the report message's text
-        text = f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
+        text = f"{glovar.labels['admin']}{mention_id(uid)}\n"
 
         # Proceed
         if id_text:
@@ -552,23 +568,23 @@ def modify_subject(client: Client, message: Message) -> bool:
                     text += result
 
                     if reason and result and lang("status_succeeded") in result:
-                        text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
+                        text += f"{glovar.labels['reason']}{code(reason)}\n"
                 else:
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                             f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                             f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_permission'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_permission'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         if from_check:
             thread(edit_message_text, (client, cid, r_message.message_id, text))
-            text = (f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
-                    f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-                    f"{lang('see')}{lang('colon')}{general_link(rid, message_link(r_message))}\n")
+            text = (f"{glovar.labels['admin']}{mention_id(uid)}\n"
+                    f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
+                    f"{glovar.labels['see']}{general_link(rid, message_link(r_message))}\n")
             thread(send_message, (client, cid, text, mid))
         else:
             thread(send_message, (client, cid, text, mid))
@@ -580,9 +596,79 @@ def modify_subject(client: Client, message: Message) -> bool:
     return False
 
 
+@Client.on_message(Filters.incoming & Filters.group & Filters.command(["metrics"], glovar.prefix)
+                   & manage_group
+                   & from_user)
+@timed("handler")
+def metrics(client: Client, message: Message) -> bool:
+    # Show the status of the queues, and where the time is spent
+    result = False
+
+    try:
+        # Basic data
+        cid = message.chat.id
+        aid = message.from_user.id
+        mid = message.message_id
+
+        # Generate the report message's text
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_metrics'))}\n")
+
+        # The status of the pool, the limiter and the cache
+        limiter_status = glovar.limiter.get_status()
+        limiter_status["paused"] = len(limiter_status["paused"])
+        sections = [
+            ("metrics_pool", glovar.pool.get_status()),
+            ("metrics_limiter", limiter_status),
+            ("metrics_cache", glovar.message_cache.get_status())
+        ]
+
+        # The shards in total, and the saves of each file
+        with glovar.locks["shard"]:
+            shards = [dict(status) for status in glovar.shard_status.values()]
+
+        sections.append(("metrics_shard", {
+            "queued": sum(status["queued"] for status in shards),
+            "processed": sum(status["processed"] for status in shards),
+            "lag_max": max([status["lag_max"] for status in shards] or [0.0])
+        }))
+
+        with glovar.locks["save"]:
+            sections.append(("metrics_save", {file: f"{status['saved']} / {status['latency_max']:.3f}"
+                                              for file, status in glovar.save_status.items()}))
+
+        # The functions that take the most time in total, as count / sum / max
+        if glovar.recorder.enabled:
+            histograms = glovar.recorder.get_status()["histograms"]
+            slowest = sorted(histograms.items(), key=lambda item: item[1]["sum"], reverse=True)[:10]
+            sections.append(("metrics_timing", {f"{name}.{value}": f"{h['count']} / {h['sum']:.3f} / {h['max']:.3f}"
+                                                for (name, _, value), h in slowest}))
+
+        for section, status in sections:
+            text += f"{glovar.labels[section]}\n"
+
+            for key, value in status.items():
+                value = round(value, 3) if isinstance(value, float) else value
+                text += "\t" * 4 + f"{italic(key)}    {code(value)}\n"
+
+        if not glovar.recorder.enabled:
+            text += f"{glovar.labels['metrics_timing']}{code(lang('disabled'))}\n"
+
+        # Send the report message
+        thread(send_message, (client, cid, text, mid))
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Metrics error: {e}", exc_info=True)
+
+    return result
+
+
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["now"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready()
+@timed("handler")
 def backup_now(client: Client, message: Message) -> bool:
     # Backup now
     try:
@@ -593,8 +679,8 @@ def backup_now(client: Client, message: Message) -> bool:
         receivers = get_command_type(message).upper()
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('action_now'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_now'))}\n")
 
         # Proceed
         if receivers:
@@ -618,13 +704,13 @@ def backup_now(client: Client, message: Message) -> bool:
                 )
 
                 # Text
-                text += f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n"
+                text += f"{glovar.labels['status']}{code(lang('status_commanded'))}\n"
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -639,6 +725,8 @@ def backup_now(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["page"], glovar.prefix)
                    & manage_group
                    & from_user)
+@ready()
+@timed("handler")
 def page_command(client: Client, message: Message) -> bool:
     # Change page
     try:
@@ -651,8 +739,8 @@ def page_command(client: Client, message: Message) -> bool:
         rid = r_message and r_message.message_id
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(uid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('action_page'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(uid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_page'))}\n")
 
         # Proceed
         if the_type in {"previous", "next"} and r_message and r_message.from_user.is_self:
@@ -667,17 +755,17 @@ def page_command(client: Client, message: Message) -> bool:
                     page = callback_data_list[i]["d"]
                     page_text, markup = list_page_ids(aid, action_type, page)
                     thread(edit_message_text, (client, cid, rid, page_text, markup))
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-                             f"{lang('see')}{lang('colon')}{general_link(rid, message_link(r_message))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_succeeded'))}\n"
+                             f"{glovar.labels['see']}{general_link(rid, message_link(r_message))}\n")
                 else:
-                    text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                             f"{lang('reason')}{lang('colon')}{code(lang('command_reply'))}\n")
+                    text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                             f"{glovar.labels['reason']}{code(lang('command_reply'))}\n")
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_permission'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_permission'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_usage'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -692,6 +780,7 @@ def page_command(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["refresh"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def refresh(client: Client, message: Message) -> bool:
     # Refresh admins
     try:
@@ -702,8 +791,8 @@ def refresh(client: Client, message: Message) -> bool:
         receivers = get_command_type(message).upper()
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('refresh'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('refresh'))}\n")
 
         # Proceed
         if receivers:
@@ -720,13 +809,13 @@ def refresh(client: Client, message: Message) -> bool:
                     action_type="refresh",
                     data=aid
                 )
-                text += f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n"
+                text += f"{glovar.labels['status']}{code(lang('status_commanded'))}\n"
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -741,6 +830,7 @@ def refresh(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["remove_contact"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def remove_contact(client: Client, message: Message) -> bool:
     # Let NOSPAM remove a contact
     try:
@@ -751,8 +841,8 @@ def remove_contact(client: Client, message: Message) -> bool:
         command_type = get_command_type(message).lower()
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('action_contact'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_contact'))}\n")
 
         # Proceed
         if command_type:
@@ -766,19 +856,19 @@ def remove_contact(client: Client, message: Message) -> bool:
                     "type": "contact"
                 }
             )
-            text += f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n"
+            text += f"{glovar.labels['status']}{code(lang('status_commanded'))}\n"
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
 
         # Send debug message
-        debug_text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                      f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                      f"{lang('action')}{lang('colon')}{code(lang('action_contact'))}\n"
-                      f"{lang('contact')}{lang('colon')}{code(f'{command_type[0]}███{command_type[-1]}')}\n")
+        debug_text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                      f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                      f"{glovar.labels['action']}{code(lang('action_contact'))}\n"
+                      f"{glovar.labels['contact']}{code(f'{command_type[0]}███{command_type[-1]}')}\n")
         thread(send_message, (client, glovar.debug_channel_id, debug_text))
 
     except Exception as e:
@@ -790,6 +880,7 @@ def remove_contact(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["status"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def status(client: Client, message: Message) -> bool:
     # Check bots' status
     try:
@@ -800,8 +891,8 @@ def status(client: Client, message: Message) -> bool:
         receivers = get_command_type(message).upper()
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('action_status'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('action_status'))}\n")
 
         # Proceed
         if receivers:
@@ -821,13 +912,13 @@ def status(client: Client, message: Message) -> bool:
                         "message_id": mid
                     }
                 )
-                text += f"{lang('status')}{lang('colon')}{code(lang('status_requested'))}\n"
+                text += f"{glovar.labels['status']}{code(lang('status_requested'))}\n"
             else:
-                text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                         f"{lang('reason')}{lang('colon')}{code(lang('command_para'))}\n")
+                text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                         f"{glovar.labels['reason']}{code(lang('command_para'))}\n")
         else:
-            text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
-                     f"{lang('reason')}{lang('colon')}{code(lang('command_lack'))}\n")
+            text += (f"{glovar.labels['status']}{code(lang('status_failed'))}\n"
+                     f"{glovar.labels['reason']}{code(lang('command_lack'))}\n")
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -842,6 +933,7 @@ def status(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["time"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def time(client: Client, message: Message) -> bool:
     # Show the message's timestamp
     result = False
@@ -859,12 +951,12 @@ def time(client: Client, message: Message) -> bool:
                                  lang("请用命令回复一条有效的消息"), False)
 
         # Generate the report text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('查看消息时间'))}\n"
-                f"{lang('消息发送时间')}{lang('colon')}{code(r_message.date)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('查看消息时间'))}\n"
+                f"{glovar.labels['消息发送时间']}{code(r_message.date)}\n")
 
         if r_message.forward_date:
-            text += f"{lang('转发源消息时间')}{lang('colon')}{code(r_message.forward_date)}\n"
+            text += f"{glovar.labels['转发源消息时间']}{code(r_message.forward_date)}\n"
 
         # Send the report message
         thread(send_message, (client, cid, text, mid))
@@ -894,6 +986,7 @@ def time(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["invite"], glovar.prefix)
                    & manage_group
                    & from_user)
+@timed("handler")
 def invite(client: Client, message: Message) -> bool:
     # Check bots' status
     result = False
@@ -943,22 +1036,22 @@ def invite(client: Client, message: Message) -> bool:
         )
 
         # Generate the report text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('邀请机器人'))}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('status_commanded'))}\n"
-                f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                f"{lang('机器人')}{lang('colon')}" + code("-") * 16 + "\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang('邀请机器人'))}\n"
+                f"{glovar.labels['status']}{code(lang('status_commanded'))}\n"
+                f"{glovar.labels['group_id']}{code(gid)}\n"
+                f"{glovar.labels['机器人']}" + code("-") * 16 + "\n")
         text += "\n".join("\t" * 4 + italic(b) for b in bots)
 
         # Send the report text
         thread(send_message, (client, cid, text, mid))
 
         # Send debug message
-        debug_text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
-                      f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
-                      f"{lang('action')}{lang('colon')}{code(lang('邀请机器人'))}\n"
-                      f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
-                      f"{lang('机器人')}{lang('colon')}{code(' / '.join(bots))}\n")
+        debug_text = (f"{glovar.labels['project']}{general_link(glovar.project_name, glovar.project_link)}\n"
+                      f"{glovar.labels['admin_project']}{mention_id(aid)}\n"
+                      f"{glovar.labels['action']}{code(lang('邀请机器人'))}\n"
+                      f"{glovar.labels['group_id']}{code(gid)}\n"
+                      f"{glovar.labels['机器人']}{code(' / '.join(bots))}\n")
         thread(send_message, (client, glovar.debug_channel_id, debug_text))
 
         result = True
@@ -971,6 +1064,7 @@ def invite(client: Client, message: Message) -> bool:
 @Client.on_message(Filters.incoming & Filters.group & Filters.command(["version"], glovar.prefix)
                    & test_group
                    & from_user)
+@timed("handler")
 def version(client: Client, message: Message) -> bool:
     # Check the program's version
     result = False
@@ -997,13 +1091,13 @@ def version(client: Client, message: Message) -> bool:
         command_date = get_readable_time(message.date, "%Y/%m/%d %H:%M:%S")
 
         # Generate the text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n\n"
-                f"{lang('project')}{lang('colon')}{code(glovar.sender)}\n"
-                f"{lang('version')}{lang('colon')}{code(glovar.version)}\n"
-                f"{lang('本地修改')}{lang('colon')}{code(git_change)}\n"
-                f"{lang('哈希值')}{lang('colon')}{general_link(git_hash, get_hash_link)}\n"
-                f"{lang('提交时间')}{lang('colon')}{code(git_date)}\n"
-                f"{lang('命令发送时间')}{lang('colon')}{code(command_date)}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n\n"
+                f"{glovar.labels['project']}{code(glovar.sender)}\n"
+                f"{glovar.labels['version']}{code(glovar.version)}\n"
+                f"{glovar.labels['本地修改']}{code(git_change)}\n"
+                f"{glovar.labels['哈希值']}{general_link(git_hash, get_hash_link)}\n"
+                f"{glovar.labels['提交时间']}{code(git_date)}\n"
+                f"{glovar.labels['命令发送时间']}{code(command_date)}\n")
 
         # Send the report message
         result = send_message(client, cid, text, mid)
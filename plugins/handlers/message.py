@@ -19,22 +19,22 @@
 import logging
 import re
 from copy import deepcopy
+from time import time
 
 from pyrogram import Client, Filters, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from .. import glovar
 from ..functions.channel import forward_evidence
+from ..functions.decorators import ready, timed
 from ..functions.etc import code, button_data, general_link, get_now, get_report_record, get_text, lang, random_str
 from ..functions.etc import thread, mention_id, message_link
-from ..functions.file import save
+from ..functions.file import capture_data, save
 from ..functions.filters import aio, exchange_channel, error_channel, from_user, hide_channel, is_exchange_channel
 from ..functions.filters import is_error_channel, logging_channel, manage_group, watch_channel
 from ..functions.group import get_message
-from ..functions.receive import receive_add_bad, receive_config_show, receive_flood_reply, receive_invite_result
-from ..functions.receive import receive_leave_info, receive_leave_request, receive_join_info, receive_remove_white
-from ..functions.receive import receive_status_reply, receive_text_data, receive_user_score, receive_watch_user
-from ..functions.receive import receive_white_users
+from ..functions.receive import receive_file_data, receive_sharded, receive_text_data
 from ..functions.telegram import send_message
+from ..functions.timers import expire_record
 from ..functions.user import check_subject
 
 # Enable logging
@@ -46,6 +46,8 @@ logger = logging.getLogger(__name__)
                    & manage_group
                    & (exchange_channel | error_channel | logging_channel | watch_channel)
                    & from_user)
+@ready()
+@timed("handler")
 def action_ask(client: Client, message: Message) -> bool:
     # Ask how to deal with the report message
     try:
@@ -55,7 +57,7 @@ def action_ask(client: Client, message: Message) -> bool:
         aid = message.from_user.id
         fid = message.forward_from_message_id
         channel_id = message.forward_from_chat.id
-        report_message = get_message(client, channel_id, fid)
+        report_message = get_message(client, channel_id, fid, True)
         r_message = report_message.reply_to_message
         report_text = get_text(report_message)
         record = get_report_record(report_message)
@@ -74,7 +76,7 @@ def action_ask(client: Client, message: Message) -> bool:
             data_action_type = data["type"]
 
             if data_action == "backup":
-                if data_action_type == "data":
+                if data_action_type in {"data", "delta"}:
                     action = "rollback"
 
         # Recall ERROR
@@ -82,7 +84,7 @@ def action_ask(client: Client, message: Message) -> bool:
             action = "recall"
 
         # Actions about LOGGING
-        elif re.search(f"^{lang('project')}{lang('colon')}", report_text):
+        elif re.search(f"^{glovar.labels['project']}", report_text):
             if record["status"] == lang("status_redact"):
                 action = ""
             elif record["project"] in glovar.receivers["except"]:
@@ -129,12 +131,18 @@ def action_ask(client: Client, message: Message) -> bool:
         if action == "rollback":
             data = receive_text_data(report_message)
             glovar.actions[key]["sender"] = data["from"]
-            glovar.actions[key]["type"] = data["data"]
+
+            # The delta backup is applied to its base and the deltas before it
+            if data["type"] == "delta":
+                glovar.actions[key]["type"] = data["data"]["file"]
+                glovar.actions[key]["chain"] = data["data"]
+            else:
+                glovar.actions[key]["type"] = data["data"]
 
         # Generate the report message's text
-        text = (f"{lang('admin')}{lang('colon')}{mention_id(aid)}\n"
-                f"{lang('action')}{lang('colon')}{code(lang(f'action_{action}'))}\n"
-                f"{lang('status')}{lang('colon')}{code(lang('status_wait'))}\n")
+        text = (f"{glovar.labels['admin']}{mention_id(aid)}\n"
+                f"{glovar.labels['action']}{code(lang(f'action_{action}'))}\n"
+                f"{glovar.labels['status']}{code(lang('status_wait'))}\n")
 
         # Generate the report message's markup
         data_proceed = button_data(action, "proceed", key)
@@ -187,6 +195,7 @@ def action_ask(client: Client, message: Message) -> bool:
                     glovar.records[key][item] = deepcopy(glovar.actions[key][item])
 
             save("records")
+            expire_record(client, key)
         else:
             glovar.actions.pop(key, {})
                 
@@ -201,6 +210,8 @@ def action_ask(client: Client, message: Message) -> bool:
                    & ~Filters.command(glovar.all_commands, glovar.prefix)
                    & manage_group & ~error_channel & ~exchange_channel & ~logging_channel & ~watch_channel
                    & from_user)
+@ready()
+@timed("handler")
 def check_forwarded(client: Client, message: Message) -> bool:
     # Check forwarded messages
     try:
@@ -238,6 +249,7 @@ def check_forwarded(client: Client, message: Message) -> bool:
 
 @Client.on_message(Filters.incoming & Filters.channel & ~Filters.command(glovar.all_commands, glovar.prefix)
                    & hide_channel, group=-1)
+@timed("handler")
 def exchange_emergency(client: Client, message: Message) -> bool:
     # Sent emergency channel transfer request
     try:
@@ -269,9 +281,9 @@ def exchange_emergency(client: Client, message: Message) -> bool:
 
         project_text = general_link(glovar.project_name, glovar.project_link)
         hide_text = (lambda x: lang("enabled") if x else "disabled")(glovar.should_hide)
-        text = (f"{lang('project')}{lang('colon')}{project_text}\n"
-                f"{lang('action')}{lang('colon')}{code(lang('transfer_channel'))}\n"
-                f"{lang('emergency_channel')}{lang('colon')}{code(hide_text)}\n")
+        text = (f"{glovar.labels['project']}{project_text}\n"
+                f"{glovar.labels['action']}{code(lang('transfer_channel'))}\n"
+                f"{glovar.labels['emergency_channel']}{code(hide_text)}\n")
         thread(send_message, (client, glovar.debug_channel_id, text))
 
         return True
@@ -284,12 +296,12 @@ def exchange_emergency(client: Client, message: Message) -> bool:
 @Client.on_message((Filters.incoming | aio) & Filters.channel & ~Filters.forwarded
                    & ~Filters.command(glovar.all_commands, glovar.prefix)
                    & exchange_channel)
+@ready()
+@timed("handler")
 def process_data(client: Client, message: Message) -> bool:
     # Process the data in exchange channel
     result = False
 
-    glovar.locks["receive"].acquire()
-
     try:
         data = receive_text_data(message)
 
@@ -302,257 +314,26 @@ def process_data(client: Client, message: Message) -> bool:
         action_type = data["type"]
         data = data["data"]
 
-        # This will look awkward,
-        # seems like it can be simplified,
-        # but this is to ensure that the permissions are clear,
-        # so it is intentionally written like this
-        if glovar.sender in receivers:
-
-            if sender == "AVATAR":
-
-                if action == "add":
-                    if action_type == "white":
-                        receive_white_users(client, message)
-
-                elif action == "remove":
-                    if action_type == "white":
-                        receive_remove_white(data)
-
-                elif action == "status":
-                    if action_type == "reply":
-                        receive_status_reply(client, message, sender, data)
-
-            elif sender == "CAPTCHA":
-
-                if action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "flood":
-                    if action_type == "reply":
-                        receive_flood_reply(client, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                if action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "CLEAN":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "LANG":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "LONG":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "NOFLOOD":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "NOPORN":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "NOSPAM":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "status":
-                    if action_type == "reply":
-                        receive_status_reply(client, message, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "REGEX":
-
-                if action == "status":
-                    if action_type == "reply":
-                        receive_status_reply(client, message, sender, data)
-
-            elif sender == "TIP":
-                if action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-            elif sender == "USER":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "invite":
-                    if action_type == "result":
-                        receive_invite_result(client, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "join":
-                    if action_type == "info":
-                        receive_join_info(client, data)
+        # Record the message for the replay, in the order of arrival
+        glovar.capture and thread(capture_data, (message, time()), None, "capture")
 
-                elif action == "status":
-                    if action_type == "reply":
-                        receive_status_reply(client, message, sender, data)
-
-            elif sender == "WARN":
-
-                if action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, message, data)
-
-                elif action == "leave":
-                    if action_type == "info":
-                        receive_leave_info(client, sender, data)
-                    elif action_type == "request":
-                        receive_leave_request(client, sender, data)
-
-                elif action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "WATCH":
+        if glovar.sender not in receivers:
+            return True
 
-                if action == "add":
-                    if action_type == "watch":
-                        receive_watch_user(data)
+        # Unpack the batched data
+        if action == "batch" and action_type == "data":
+            items = data
+        elif action == "batch" and action_type == "file":
+            items = receive_file_data(client, message)
+        else:
+            items = [{"action": action, "type": action_type, "data": data}]
 
-                elif action == "status":
-                    if action_type == "reply":
-                        receive_status_reply(client, message, sender, data)
+        # The data of different subjects are received in parallel
+        for item in items or []:
+            receive_sharded(client, message, sender, item)
 
         result = True
     except Exception as e:
         logger.warning(f"Process data error: {e}", exc_info=True)
-    finally:
-        glovar.locks["receive"].release()
 
     return result
@@ -0,0 +1,140 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Run it in the root directory: python -m unittest discover tests
+
+import sys
+import unittest
+from os.path import abspath, dirname
+from threading import Event, Lock
+from time import sleep, time
+from typing import Hashable, List
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from plugins.functions.limiter import Limiter
+from plugins.functions.pool import Defer, Pool
+
+
+def wait_for(pool: Pool, completed: int, secs: float = 5.0) -> bool:
+    # Wait until the pool has completed some tasks
+    until = time() + secs
+
+    while time() < until:
+        if pool.get_status()["completed"] >= completed:
+            return True
+
+        sleep(0.01)
+
+    return False
+
+
+class PoolTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.lock = Lock()
+        self.done: List[Hashable] = []
+
+    def record(self, name: Hashable) -> None:
+        with self.lock:
+            self.done.append(name)
+
+    def test_defer_keeps_order(self) -> None:
+        # The later tasks of a deferred key wait for it, the other keys go on
+        pool = Pool(2, 100)
+        deferred = [False]
+
+        def first() -> None:
+            if not deferred[0]:
+                deferred[0] = True
+                raise Defer(0.2)
+
+            self.record("a1")
+
+        pool.submit(first, (), None, "a")
+        pool.submit(self.record, ("a2",), None, "a")
+        pool.submit(self.record, ("b1",), None, "b")
+
+        self.assertTrue(wait_for(pool, 3))
+        self.assertEqual(self.done, ["b1", "a1", "a2"])
+        self.assertEqual(pool.get_status()["deferred"], 1)
+
+    def test_full_queue_with_deferred_key(self) -> None:
+        # A due scheduled task does not block the timer while the queue is full of a deferred key's tasks
+        pool = Pool(2, 5)
+        deferred = [False]
+
+        def first() -> None:
+            if not deferred[0]:
+                deferred[0] = True
+                raise Defer(0.5)
+
+            self.record(0)
+
+        pool.submit(first, (), None, "a")
+
+        for i in range(1, 5):
+            pool.submit(self.record, (i,), None, "a")
+
+        pool.schedule(0.1, self.record, ("later",))
+
+        self.assertTrue(wait_for(pool, 6))
+        self.assertEqual([name for name in self.done if name != "later"], [0, 1, 2, 3, 4])
+        self.assertIn("later", self.done)
+        self.assertEqual(pool.get_status()["queued"], 0)
+
+    def test_worker_submit_past_limit(self) -> None:
+        # A worker's submissions past the limit are queued in order, the worker does not wait for itself
+        pool = Pool(1, 2)
+        started = Event()
+
+        def spawn() -> None:
+            started.set()
+
+            for i in range(5):
+                pool.submit(self.record, (i,), None, "b")
+
+        pool.submit(spawn, (), None, "a")
+
+        self.assertTrue(started.wait(5))
+        self.assertTrue(wait_for(pool, 6))
+        self.assertEqual(self.done, [0, 1, 2, 3, 4])
+        self.assertGreater(pool.get_status()["overflow"], 0)
+
+
+class LimiterTest(unittest.TestCase):
+
+    def test_take_burst(self) -> None:
+        # A chat takes its burst at once, then gets the seconds until its next token
+        limiter = Limiter(1000.0, 1.0, 3)
+
+        self.assertEqual([limiter.take(1) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertGreater(limiter.take(1), 0.5)
+        self.assertEqual(limiter.take(2), 0.0)
+
+    def test_pause(self) -> None:
+        # A paused chat waits for the pause, the other chats do not
+        limiter = Limiter(1000.0, 1000.0, 5)
+        limiter.pause(1, 10)
+
+        self.assertGreater(limiter.take(1), 9)
+        self.assertEqual(limiter.take(2), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# SCP-079-MANAGE - One ring to rule them all
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-MANAGE.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Run it in the root directory: python -m unittest discover tests
+
+import sys
+import unittest
+from os.path import abspath, dirname, join
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import sleep
+from typing import List
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from plugins.functions.storage import IdSet
+
+
+class YieldingIdSet(IdSet):
+    # Each search gives the other threads a turn, so the readers run between the steps of compact()
+
+    @staticmethod
+    def in_base(base: memoryview, the_id: object) -> bool:
+        sleep(0)
+        return IdSet.in_base(base, the_id)
+
+
+class IdSetTest(unittest.TestCase):
+
+    def test_compact_while_reading(self) -> None:
+        # The ids added before compact() are found while it maps the new file and moves the changes onto it
+        with TemporaryDirectory() as path:
+            ids = YieldingIdSet(join(path, "bad_ids"))
+            ids.update(range(0, 2000, 2))
+            ids.compact()
+
+            rounds = [0]
+            stop = Event()
+            missing: List[int] = []
+
+            def read_thread() -> None:
+                while not stop.is_set():
+                    added = rounds[0]
+
+                    for the_id in range(2000 + max(added - 2, 0) * 100, 2000 + added * 100, 2):
+                        the_id not in ids and missing.append(the_id)
+
+            threads = [Thread(target=read_thread, daemon=True) for _ in range(4)]
+
+            for t in threads:
+                t.start()
+
+            # Each round adds new ids and removes an old id, then writes them to the file
+            for i in range(100):
+                ids.update(range(2000 + i * 100, 2100 + i * 100, 2))
+                ids.discard(i * 2)
+                rounds[0] = i + 1
+                ids.compact()
+
+            stop.set()
+
+            for t in threads:
+                t.join()
+
+            self.assertEqual(missing, [])
+            self.assertEqual(len(ids), 900 + 100 * 50)
+            self.assertEqual(list(ids), list(range(200, 2000 + 100 * 100, 2)))
+
+    def test_compact_keeps_changes(self) -> None:
+        # The changes made while the file is written are kept against the new file
+        with TemporaryDirectory() as path:
+            ids = IdSet(join(path, "bad_ids"))
+            ids.update([1, 2, 3])
+            ids.compact()
+            ids.discard(2)
+            ids.add(4)
+            ids.compact()
+            ids.discard(4)
+            ids.add(2)
+
+            self.assertEqual(sorted(ids), [1, 2, 3])
+            self.assertEqual(len(ids), 3)
+            self.assertNotIn(4, ids)
+
+
+if __name__ == "__main__":
+    unittest.main()